@@ -8,9 +8,9 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         auth_header = request.headers.get("Authorization")
-        logger.info(f"Authorization 헤더: {auth_header}")
-        
+
         if not auth_header:
+            logger.warning(f"Authorization 헤더 없는 요청: {request.method} {request.path}")
             return jsonify({"error": "Authorization 헤더가 필요합니다."}), 401
         
         # 토큰을 데코레이터된 함수에 전달
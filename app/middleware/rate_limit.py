@@ -0,0 +1,221 @@
+from contextlib import asynccontextmanager, contextmanager
+from functools import wraps
+from flask import jsonify
+from utils.sqlite_utils import ThreadLocalSQLite
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# 슬롯을 오래 기다릴 때 경고를 남기는 간격 (초)
+SLOT_WAIT_WARN_INTERVAL = 30.0
+
+
+class ConcurrencyLimitError(Exception):
+    """동시 LLM 호출 한도를 넘어 정해진 시간 안에 실행 슬롯을 얻지 못했을 때 발생하는 예외."""
+
+
+def caller_key(token: str) -> str:
+    """호출자 식별값 (토큰 원문은 저장하지 않는다)"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+class AdmissionController:
+    """요청 수락 여부를 결정하는 클래스.
+
+    - 호출자(토큰)별 토큰 버킷으로 초당 요청 수를 제한
+    - 모든 워커를 통틀어 동시에 진행 중인 LLM 호출 수를 제한 (만료 시간이 있는 슬롯)
+    - 작업 큐가 너무 깊으면 새 요청을 429로 거절
+
+    상태는 SQLite(WAL)에 저장하므로 같은 서버의 gunicorn 워커들이 한도를 공유한다.
+    """
+
+    def __init__(self, db_path: str, rate_per_minute: float = 30, burst: int = 10, max_inflight: int = 8,
+                 slot_lease_seconds: float = 300, max_queue_depth: int = 50, shed_retry_after: int = 5,
+                 enabled: bool = True):
+        self.enabled = enabled
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_inflight = max_inflight
+        self.slot_lease_seconds = slot_lease_seconds
+        self.max_queue_depth = max_queue_depth
+        self.shed_retry_after = shed_retry_after
+        self._db = ThreadLocalSQLite(db_path, timeout=5)
+        self._last_prune = 0.0
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS buckets (
+                    caller TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_slots (
+                    id TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+    def try_acquire(self, caller: str, cost: int = 1) -> tuple:
+        """호출자의 버킷에서 토큰 cost개를 꺼낸다. (허용 여부, 재시도까지 남은 초)
+
+        cost가 burst보다 크면 버킷이 가득 찼을 때 허용하고 모자란 만큼은 빚으로 남겨
+        이후 요청이 그만큼 더 기다리도록 한다.
+        """
+        now = time.time()
+        conn = self._db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE caller = ?", (caller,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + (now - row[1]) * self.rate)
+            required = min(cost, self.burst)
+            allowed = tokens >= required
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (caller, tokens, updated_at) VALUES (?, ?, ?)",
+                (caller, tokens, now)
+            )
+        self._maybe_prune()
+        if allowed:
+            return True, 0.0
+        return False, (required - tokens) / self.rate if self.rate else float(self.shed_retry_after)
+
+    def _maybe_prune(self, interval: float = 60.0):
+        """버킷이 다시 가득 찼을 만큼 오래된 호출자 기록 삭제"""
+        now = time.time()
+        if now - self._last_prune < interval:
+            return
+        self._last_prune = now
+        idle = self.burst / self.rate if self.rate else 3600
+        try:
+            conn = self._db.connect()
+            with conn:
+                conn.execute("DELETE FROM buckets WHERE updated_at < ?", (now - idle,))
+                conn.execute("DELETE FROM llm_slots WHERE expires_at < ?", (now,))
+        except Exception as e:
+            logger.warning(f"요청 제한 기록 정리 실패: {e}")
+
+    def try_acquire_slot(self):
+        """LLM 호출 슬롯 하나를 얻으면 슬롯 ID, 한도가 찼으면 None"""
+        now = time.time()
+        conn = self._db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # 워커가 죽어서 반납되지 않은 슬롯은 만료 시간이 지나면 회수
+            conn.execute("DELETE FROM llm_slots WHERE expires_at < ?", (now,))
+            inflight = conn.execute("SELECT COUNT(*) FROM llm_slots").fetchone()[0]
+            if inflight >= self.max_inflight:
+                return None
+            slot_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO llm_slots (id, expires_at) VALUES (?, ?)",
+                (slot_id, now + self.slot_lease_seconds)
+            )
+        return slot_id
+
+    def release_slot(self, slot_id: str):
+        with self._db.connect() as conn:
+            conn.execute("DELETE FROM llm_slots WHERE id = ?", (slot_id,))
+
+    def inflight(self) -> int:
+        return self._db.connect().execute(
+            "SELECT COUNT(*) FROM llm_slots WHERE expires_at >= ?", (time.time(),)
+        ).fetchone()[0]
+
+    def _check_wait(self, started: float, timeout: float, warned_at: float) -> float:
+        """기다린 시간이 timeout을 넘으면 ConcurrencyLimitError, 오래 기다리면 주기적으로 경고 (경고 시각 반환)"""
+        now = time.time()
+        if timeout is not None and now - started >= timeout:
+            raise ConcurrencyLimitError(f"동시 LLM 호출 한도({self.max_inflight})를 초과했습니다.")
+        if now - warned_at >= SLOT_WAIT_WARN_INTERVAL:
+            logger.warning(f"LLM 호출 슬롯 대기 중 ({now - started:.0f}초, 한도 {self.max_inflight})")
+            return now
+        return warned_at
+
+    @contextmanager
+    def llm_slot(self, timeout: float = None):
+        """LLM 호출 동안 슬롯을 점유.
+
+        timeout이 None이면 슬롯이 날 때까지 기다린다 (이미 202로 접수한 백그라운드 작업용).
+        timeout이 있으면 그 시간 안에 얻지 못할 때 ConcurrencyLimitError (클라이언트가 기다리는 스트리밍용).
+        """
+        if not self.enabled:
+            yield
+            return
+        started = warned_at = time.time()
+        delay = 0.05
+        slot_id = self.try_acquire_slot()
+        while slot_id is None:
+            warned_at = self._check_wait(started, timeout, warned_at)
+            time.sleep(random.uniform(delay / 2, delay))
+            delay = min(delay * 2, 1.0)
+            slot_id = self.try_acquire_slot()
+        try:
+            yield
+        finally:
+            try:
+                self.release_slot(slot_id)
+            except Exception as e:
+                logger.error(f"LLM 호출 슬롯 반납 실패: {e}")
+
+    @asynccontextmanager
+    async def allm_slot(self, timeout: float = None):
+        """llm_slot의 비동기 버전 (기다리는 동안 이벤트 루프를 막지 않는다)"""
+        if not self.enabled:
+            yield
+            return
+        started = warned_at = time.time()
+        delay = 0.05
+        slot_id = await asyncio.to_thread(self.try_acquire_slot)
+        while slot_id is None:
+            warned_at = self._check_wait(started, timeout, warned_at)
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            delay = min(delay * 2, 1.0)
+            slot_id = await asyncio.to_thread(self.try_acquire_slot)
+        try:
+            yield
+        finally:
+            try:
+                await asyncio.to_thread(self.release_slot, slot_id)
+            except Exception as e:
+                logger.error(f"LLM 호출 슬롯 반납 실패: {e}")
+
+    def limit(self, queue_depth=None, cost=None):
+        """token_required 아래에 적용하는 데코레이터 (kwargs['token']으로 호출자를 구분)
+
+        cost는 요청이 차지할 토큰 수를 돌려주는 함수 (일괄 요청은 질문 수만큼 차감)
+        """
+        def decorator(f):
+            if not self.enabled:
+                return f
+
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if queue_depth is not None and queue_depth() >= self.max_queue_depth:
+                    logger.warning(f"작업 대기열 과부하로 요청 거절 (대기 {queue_depth()}건)")
+                    return jsonify({"error": "요청이 많아 잠시 후 다시 시도해주세요."}), 429, \
+                        {"Retry-After": str(self.shed_retry_after)}
+
+                try:
+                    allowed, retry_after = self.try_acquire(caller_key(kwargs["token"]), cost() if cost else 1)
+                except Exception as e:
+                    # 제한 상태를 읽지 못하면 요청을 막지 않는다
+                    logger.error(f"요청 제한 확인 실패: {e}")
+                    allowed, retry_after = True, 0.0
+                if not allowed:
+                    return jsonify({"error": "요청 한도를 초과했습니다. 잠시 후 다시 시도해주세요."}), 429, \
+                        {"Retry-After": str(max(1, math.ceil(retry_after)))}
+                return f(*args, **kwargs)
+            return decorated
+        return decorator
@@ -0,0 +1,32 @@
+from flask import g, request
+from utils.logging_utils import bind_request_id, get_request_id, reset_request_id
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+def register_request_id(app):
+    """요청마다 요청 ID를 로깅 컨텍스트에 설정하고 응답 헤더로 돌려준다.
+
+    클라이언트가 보낸 X-Request-ID가 있으면 그대로 사용하고, ASGI 래퍼가 이미 설정한 경우에는 그 값을 이어 쓴다.
+    """
+
+    @app.before_request
+    def bind():
+        g.request_id, g.request_id_token = bind_request_id(get_request_id() or request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    def add_header(response):
+        request_id = g.get("request_id")
+        if request_id and REQUEST_ID_HEADER not in response.headers:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+
+    @app.teardown_request
+    def reset(error=None):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            try:
+                reset_request_id(token)
+            except ValueError:
+                # 스트리밍 응답은 다른 컨텍스트에서 정리될 수 있다
+                pass
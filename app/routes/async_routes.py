@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import math
+import re
+import uuid
+
+from app.middleware.rate_limit import caller_key
+from app.routes.qa_routes import (
+    admission, delivery_sender, duplicate_response, idempotency, job_queue, qa_service, send_answer_url
+)
+from app.services.idempotency_service import request_key
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+ANSWER_PATH = re.compile(r"/(\d+)/answers")
+
+# 진행 중인 비동기 답변 작업 (완료 전에 가비지 컬렉션되지 않도록 참조 유지)
+_tasks = set()
+
+
+async def read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, status: int, body: dict, headers: dict = None):
+    payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), str(value).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+def get_header(scope, name: str):
+    name = name.lower().encode()
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def process_answer_async(job_id: str, key: str, query_id, category: str, content: str,
+                               extra_data: dict, token: str):
+    """이벤트 루프에서 답변을 생성하고 전송 (작업 상태는 동기 모드와 같은 작업 DB에 기록)"""
+    store = job_queue.store
+    try:
+        await asyncio.to_thread(store.update, job_id, "running")
+        answer = await qa_service.aqacall(category, content, extra_data)
+        url = send_answer_url(query_id)
+        outbox_id = await asyncio.to_thread(delivery_sender.outbox.enqueue, query_id, url, token, {"answer": answer})
+        result = {"answer": answer, "outboxId": outbox_id}
+        await asyncio.to_thread(idempotency.complete, key, job_id, result)
+        await asyncio.to_thread(store.update, job_id, "succeeded", result)
+    except Exception as e:
+        logger.error(f"작업 실패: {job_id}, 오류 내용: {e}")
+        await asyncio.to_thread(idempotency.release, key, job_id)
+        await asyncio.to_thread(store.update, job_id, "failed", None, str(e))
+        return
+    finally:
+        job_queue.heartbeat.untrack(job_id)
+    # 바로 전송을 시도하고, 실패하면 백그라운드 전송 스레드가 outbox에서 재시도
+    await delivery_sender.adeliver(outbox_id)
+
+
+async def ask(scope, receive, send, question_id: int):
+    """POST /<questionId>/answers 의 비동기 버전 (응답 형식은 동기 라우트와 같다)"""
+    token = get_header(scope, "Authorization")
+    if not token:
+        return await send_json(send, 401, {"error": "Authorization 헤더가 필요합니다."})
+
+    # 이벤트 루프에 쌓이는 작업 수는 요청 제한 설정과 관계없이 항상 제한
+    if len(_tasks) >= Config.ASYNC_MAX_PENDING:
+        return await send_json(send, 429, {"error": "요청이 많아 잠시 후 다시 시도해주세요."},
+                               {"Retry-After": admission.shed_retry_after})
+    if admission.enabled:
+        allowed, retry_after = await asyncio.to_thread(admission.try_acquire, caller_key(token))
+        if not allowed:
+            return await send_json(send, 429, {"error": "요청 한도를 초과했습니다. 잠시 후 다시 시도해주세요."},
+                                   {"Retry-After": max(1, math.ceil(retry_after))})
+
+    try:
+        data = json.loads(await read_body(receive) or b"null")
+    except ValueError:
+        data = None
+    if not data:
+        return await send_json(send, 400, {"error": "유효한 요청 본문이 필요합니다."})
+
+    query_id = data.get("id")
+    query_content = data.get("content")
+    query_category = data.get("category")
+    query_extra_data = data.get("extraData")
+
+    key = request_key(question_id, query_id, query_category, query_content, query_extra_data)
+    job_id = uuid.uuid4().hex
+    reserved, record = await asyncio.to_thread(idempotency.reserve, key, job_id)
+    if not reserved:
+        logger.info(f"질문 ID {question_id} 중복 요청, 기존 작업 사용: {record['owner']}")
+        body, status, headers = await asyncio.to_thread(duplicate_response, record)
+        return await send_json(send, status, body, headers)
+
+    await asyncio.to_thread(
+        job_queue.store.create, job_id, "answer",
+        {"questionId": question_id, "id": query_id, "category": query_category}
+    )
+    # 동기 모드와 같이 작업이 끝날 때까지 생존 시각과 선점을 갱신
+    job_queue.heartbeat.track(job_id, lambda: idempotency.refresh([key], job_id))
+    task = asyncio.create_task(process_answer_async(
+        job_id, key, query_id, query_category, query_content, query_extra_data, token
+    ))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+    logger.info(f"질문 ID {question_id} 비동기 답변 작업 등록: {job_id}")
+    await send_json(send, 202, {
+        "jobId": job_id,
+        "status": "queued",
+        "statusUrl": f"/jobs/{job_id}"
+    }, {"Location": f"/jobs/{job_id}"})
+
+
+async def route(scope, receive, send) -> bool:
+    """비동기로 처리하는 경로면 처리하고 True 반환"""
+    if scope["type"] != "http" or scope["method"] != "POST":
+        return False
+    match = ANSWER_PATH.fullmatch(scope["path"])
+    if match is None:
+        return False
+    await ask(scope, receive, send, int(match.group(1)))
+    return True
+
+
+async def shutdown():
+    """종료 시 진행 중인 작업을 잠시 기다리고 HTTP 클라이언트를 닫는다"""
+    if _tasks:
+        await asyncio.wait(list(_tasks), timeout=Config.ASYNC_SHUTDOWN_TIMEOUT)
+    await delivery_sender.aclose()
@@ -1,67 +1,64 @@
-'''
 from flask import Blueprint, jsonify
-from app.services.qa_service import QAService
+from app.services.health_service import HealthMonitor, check_sqlite
+from app.services.index_versions import IndexVersions
 from config.config import Config
+from utils import lifecycle
 import os
-import psutil
-import datetime
 
 health_bp = Blueprint('health', __name__)
 
 
 def check_vector_db():
-    """벡터 DB 상태 확인"""
-    try:
-        # 벡터 DB 디렉토리 존재 여부 확인
-        if not os.path.exists(Config.VECTOR_DB_PATH):
-            return False, "벡터 DB 디렉토리가 존재하지 않습니다."
-        
-        # 벡터 DB 연결 테스트
-        qa_service = QAService(Config.VECTOR_DB_PATH)
-        qa_service.retrieve_relevant_text("test", num_results=1)
+    """벡터 DB 상태 확인 (클라이언트를 만들지 않고 현재 버전 파일만 읽기 전용으로 확인)"""
+    versions = IndexVersions(Config.VECTOR_DB_PATH, local_root=Config.MMAP_INDEX_PATH)
+    if Config.RETRIEVAL_BACKEND == "mmap":
+        from app.services.mmap_index import META_FILENAME
+        mmap_directory = versions.current_local_path(fallback=Config.MMAP_INDEX_PATH)
+        if not os.path.exists(os.path.join(mmap_directory, META_FILENAME)):
+            return False, "메모리 매핑 인덱스가 존재하지 않습니다."
         return True, "정상"
-    except Exception as e:
-        return False, str(e)
+
+    db_directory = versions.current_path()
+    if not os.path.exists(db_directory):
+        return False, "벡터 DB 디렉토리가 존재하지 않습니다."
+    return check_sqlite(os.path.join(db_directory, "chroma.sqlite3"), "SELECT COUNT(*) FROM collections")
+
+
+def check_job_store():
+    """작업 상태 DB 확인"""
+    return check_sqlite(Config.JOB_DB_PATH)
+
+
+health_monitor = HealthMonitor(
+    checks={
+        "vector_db": check_vector_db,
+        "job_store": check_job_store
+    },
+    sample_interval=Config.HEALTH_SAMPLE_INTERVAL,
+    check_interval=Config.HEALTH_CHECK_INTERVAL,
+    disk_path=Config.HEALTH_DISK_PATH
+)
+
+# 첫 프로브 전에 수집을 시작해 둔다
+lifecycle.on_start(health_monitor.start)
+
+@health_bp.route('/livez', methods=['GET'])
+def liveness_check():
+    """프로세스가 요청을 처리할 수 있는지만 확인 (의존성은 보지 않는다)"""
+    return jsonify({"status": "alive"}), 200
+
+@health_bp.route('/readyz', methods=['GET'])
+def readiness_check():
+    """마지막으로 수집한 의존성 상태로 트래픽을 받을 준비가 되었는지 응답"""
+    ready, services = health_monitor.is_ready()
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "services": {name: service["status"] for name, service in services.items()}
+    }), 200 if ready else 503
 
 @health_bp.route('/health', methods=['GET'])
 def health_check():
-    """시스템 상태 체크 엔드포인트"""
-    
-    # 시스템 리소스 상태 확인
-    cpu_usage = psutil.cpu_percent()
-    memory = psutil.virtual_memory()
-    disk = psutil.disk_usage('/')
-    
-    
-    # 벡터 DB 상태 확인
-    vector_db_status, vector_db_message = check_vector_db()
-    
-    health_status = {
-        "status": "healthy" if vector_db_status else "unhealthy",
-        "timestamp": datetime.datetime.now().isoformat(),
-        "services": {
-            "vector_db": {
-                "status": "healthy" if vector_db_status else "unhealthy",
-                "message": vector_db_message
-            }
-        },
-        "system": {
-            "cpu_usage": f"{cpu_usage}%",
-            "memory": {
-                "total": f"{memory.total / (1024 * 1024 * 1024):.2f}GB",
-                "used": f"{memory.used / (1024 * 1024 * 1024):.2f}GB",
-                "free": f"{memory.free / (1024 * 1024 * 1024):.2f}GB",
-                "percent": f"{memory.percent}%"
-            },
-            "disk": {
-                "total": f"{disk.total / (1024 * 1024 * 1024):.2f}GB",
-                "used": f"{disk.used / (1024 * 1024 * 1024):.2f}GB",
-                "free": f"{disk.free / (1024 * 1024 * 1024):.2f}GB",
-                "percent": f"{disk.percent}%"
-            }
-        }
-    }
-    
-    status_code = 200 if vector_db_status else 503
-    return jsonify(health_status), status_code 
-'''
\ No newline at end of file
+    """시스템 상태 체크 엔드포인트 (백그라운드에서 수집한 결과 반환)"""
+    health_status = health_monitor.snapshot()
+    status_code = 200 if health_status["status"] == "healthy" else 503
+    return jsonify(health_status), status_code
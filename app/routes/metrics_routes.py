@@ -0,0 +1,13 @@
+from flask import Blueprint, Response
+from app.services.metrics_service import registry
+from utils import lifecycle
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# 수집한 게이지 값을 주기적으로 파일에 기록 (워커마다 시작)
+lifecycle.on_start(registry.start)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def export_metrics():
+    """모든 gunicorn 워커의 지표를 합산하여 Prometheus text format으로 반환"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -1,24 +1,160 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.middleware.auth import token_required
+from app.middleware.rate_limit import AdmissionController, ConcurrencyLimitError
 from app.services.qa_service import QAService
+from app.services.batch_service import BatchAnswerer
+from app.services.job_service import JobStore, JobQueue, QueueFullError
+from app.services.delivery_service import DeliveryOutbox, DeliverySender
+from app.services.idempotency_service import IdempotencyStore, request_key
+from app.services import metrics_service as metrics
 from config.config import Config
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from utils import lifecycle
+import json
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 qa_bp = Blueprint('qa', __name__)
 
+# 요청 수락 제어 (호출자별 요청 수, 전체 동시 LLM 호출 수, 대기열 깊이 제한)
+admission = AdmissionController(
+    Config.ADMISSION_DB_PATH,
+    rate_per_minute=Config.RATE_LIMIT_PER_MINUTE,
+    burst=Config.RATE_LIMIT_BURST,
+    max_inflight=Config.LLM_MAX_CONCURRENCY,
+    slot_lease_seconds=Config.LLM_SLOT_LEASE,
+    max_queue_depth=Config.ADMISSION_MAX_QUEUE_DEPTH,
+    shed_retry_after=Config.ADMISSION_RETRY_AFTER,
+    enabled=Config.ADMISSION_ENABLED
+)
+
 # QA 서비스 인스턴스 생성
 #qa_service = QAService(db_directory=Config.VECTOR_DB_PATH)
-qa_service = QAService()
+qa_service = QAService(llm_limiter=admission)
+
+# 답변 생성 작업 큐 (요청 스레드를 LLM 호출 동안 붙잡지 않도록 워커 풀에서 처리)
+job_queue = JobQueue(
+    store=JobStore(Config.JOB_DB_PATH, ttl_seconds=Config.JOB_TTL_SECONDS),
+    num_workers=Config.ANSWER_WORKERS,
+    max_queue_size=Config.ANSWER_QUEUE_SIZE,
+    heartbeat_interval=Config.JOB_HEARTBEAT_INTERVAL,
+    lease_seconds=Config.JOB_LEASE_SECONDS
+)
+
+# 중복 요청(재시도, 이중 제출)을 하나의 답변 생성으로 합치는 저장소
+idempotency = IdempotencyStore(
+    Config.IDEMPOTENCY_DB_PATH,
+    ttl_seconds=Config.IDEMPOTENCY_TTL,
+    pending_timeout=Config.IDEMPOTENCY_PENDING_TIMEOUT
+)
+
+# 답변 전송 outbox (외부 서버 장애 시에도 답변을 보존하고 백그라운드에서 재전송)
+delivery_sender = DeliverySender(
+    DeliveryOutbox(Config.DELIVERY_DB_PATH),
+    pool_size=Config.DELIVERY_POOL_SIZE,
+    timeout=Config.DELIVERY_TIMEOUT,
+    max_attempts=Config.DELIVERY_MAX_ATTEMPTS,
+    backoff_base=Config.DELIVERY_BACKOFF_BASE,
+    backoff_max=Config.DELIVERY_BACKOFF_MAX,
+    batch_size=Config.DELIVERY_BATCH_SIZE,
+    poll_interval=Config.DELIVERY_POLL_INTERVAL
+)
+
+# 앱 시작 시 이전에 전송하지 못한 답변도 이어서 전송
+lifecycle.on_start(delivery_sender.start)
+# --preload 시 마스터에서 프롬프트와 인덱스를 미리 로드해 워커들이 공유
+lifecycle.on_warm_up(qa_service.warm_up)
+
+
+def collect_metrics():
+    """큐 깊이, outbox 상태, 캐시 적중 통계를 지표에 반영 (지표 내보내기 직전에 호출)"""
+    metrics.QUEUE_DEPTH.set(job_queue.depth(), queue="answer")
+    if admission.enabled:
+        metrics.LLM_INFLIGHT.set(admission.inflight())
+    for status, count in delivery_sender.outbox.counts().items():
+        metrics.OUTBOX_ITEMS.set(count, status=status)
+
+    if qa_service.answer_cache is not None:
+        stats = qa_service.answer_cache.get_stats()
+        metrics.CACHE_LOOKUPS.set_total(stats["exact_hits"], cache="answer", result="hit")
+        metrics.CACHE_LOOKUPS.set_total(stats["semantic_hits"], cache="answer", result="semantic_hit")
+        metrics.CACHE_LOOKUPS.set_total(stats["misses"], cache="answer", result="miss")
+    for name, cache in (("retrieval", qa_service.retriever.cache), ("query_embedding", qa_service.embedding.cache)):
+        metrics.CACHE_LOOKUPS.set_total(cache.hits, cache=name, result="hit")
+        metrics.CACHE_LOOKUPS.set_total(cache.misses, cache=name, result="miss")
+
+    retrieval_stats = qa_service.retriever.get_stats()
+    for mode in ("lexical_only", "hybrid", "vector_only"):
+        metrics.RETRIEVAL_REQUESTS.set_total(retrieval_stats[mode], mode=mode)
+
+
+metrics.registry.add_collector(collect_metrics)
+
+def send_answer_url(query_id) -> str:
+    return f"{Config.BASE_TARGET_URL}/{query_id}/answers"
+
+
+# 일괄 답변 요청 처리기 (작업 큐의 작업 하나가 여러 질문을 제한된 동시성으로 처리)
+batch_answerer = BatchAnswerer(
+    qa_service,
+    delivery_sender,
+    idempotency,
+    job_queue.store,
+    url_for=send_answer_url,
+    parallelism=Config.BATCH_PARALLELISM,
+    delivery_chunk=Config.DELIVERY_BATCH_SIZE
+)
+
+
+def send_answer(query_id, answer: str, token: str) -> int:
+    """생성된 답변을 outbox에 저장하고 outbox 항목 ID를 반환 (전송은 백그라운드에서 재시도)"""
+    target_server_url = send_answer_url(query_id)
+    payload = {
+        "answer": answer
+    }
+
+    logger.debug(f"외부 서버 URL: {target_server_url}")
+    return delivery_sender.submit(query_id, target_server_url, token, payload)
+
+
+def process_answer(query_id, category: str, content: str, extra_data: dict, token: str,
+                   idempotency_key: str = None, owner: str = None) -> dict:
+    """워커 스레드에서 답변을 생성하고 전송 outbox에 등록"""
+    try:
+        response_body = qa_service.qacall(category, content, extra_data)
+        outbox_id = send_answer(query_id, response_body, token)
+    except Exception:
+        # 실패한 요청은 선점을 풀어 재시도가 새로 처리되도록 한다
+        if idempotency_key:
+            idempotency.release(idempotency_key, owner)
+        raise
+    result = {"answer": response_body, "outboxId": outbox_id}
+    if idempotency_key:
+        idempotency.complete(idempotency_key, owner, result)
+    return result
+
+
+def duplicate_response(record: dict) -> tuple:
+    """이미 처리 중이거나 처리된 요청에 대한 (본문, 상태 코드, 헤더). 새로 답변을 생성하지 않는다"""
+    body = {"duplicate": True}
+    job = job_queue.store.get(record["owner"])
+    if job is not None:
+        body["jobId"] = job["jobId"]
+        body["statusUrl"] = f"/jobs/{job['jobId']}"
+    if record["status"] == "done":
+        body.update({"status": "succeeded", **record["result"]})
+        return body, 200, {}
+    body["status"] = job["status"] if job is not None else "running"
+    headers = {"Location": body["statusUrl"]} if "statusUrl" in body else {}
+    return body, 202, headers
+
 
 @qa_bp.route('/<int:questionId>/answers', methods=['POST'])
 @token_required
+@admission.limit(queue_depth=lambda: job_queue.depth())
 def ask(questionId, token):
     logger.info(f"질문 ID {questionId}에 대한 답변 요청 시작")
-    
+
     # 요청 본문 데이터 가져오기
     data = request.json
     if not data:
@@ -30,44 +166,211 @@ def ask(questionId, token):
     query_category = data.get("category")
     query_extra_data = data.get("extraData")
 
-    # QA 서비스 호출
-    response_body = qa_service.qacall(query_category, query_content, query_extra_data)
+    # 같은 질문의 중복 요청은 먼저 등록된 작업의 결과를 함께 사용
+    key = request_key(questionId, query_id, query_category, query_content, query_extra_data)
+    job_id = uuid.uuid4().hex
+    reserved, record = idempotency.reserve(key, job_id)
+    if not reserved:
+        logger.info(f"질문 ID {questionId} 중복 요청, 기존 작업 사용: {record['owner']}")
+        body, status, headers = duplicate_response(record)
+        return jsonify(body), status, headers
+
+    # 답변 생성 및 전송은 워커 풀에서 비동기로 처리
+    try:
+        job_queue.submit(
+            "answer",
+            process_answer,
+            query_id, query_category, query_content, query_extra_data, token,
+            payload={"questionId": questionId, "id": query_id, "category": query_category},
+            job_id=job_id,
+            # 큐에서 기다리거나 LLM 슬롯을 기다리는 동안에도 선점이 만료되지 않도록 갱신
+            on_heartbeat=lambda: idempotency.refresh([key], job_id),
+            idempotency_key=key,
+            owner=job_id
+        )
+    except QueueFullError as e:
+        idempotency.release(key, job_id)
+        logger.warning(f"답변 작업 큐 포화: {str(e)}")
+        return jsonify({"error": "요청이 많아 잠시 후 다시 시도해주세요."}), 503, {"Retry-After": "5"}
+
+    logger.info(f"질문 ID {questionId} 답변 작업 등록: {job_id}")
+    return jsonify({
+        "jobId": job_id,
+        "status": "queued",
+        "statusUrl": f"/jobs/{job_id}"
+    }), 202, {"Location": f"/jobs/{job_id}"}
 
-    # 결과 데이터를 questionId 포함한 target_server_url로 전송
-    target_server_url = f"{Config.BASE_TARGET_URL}/{query_id}/answers"
-    headers = {"Authorization": token, "Content-Type": "application/json"}
-    payload = {
-        "answer": response_body
-    }
 
-    logger.info(f"외부 서버 URL: {target_server_url}")
-    logger.info(f"외부 서버 헤더: {headers}")
-    logger.info(f"외부 서버 페이로드: {payload}")
-
-    # 재시도 설정
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[500, 502, 503, 504]
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session = requests.Session()
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
+def batch_cost() -> int:
+    """일괄 요청이 차지할 요청 한도 (질문 한 건당 토큰 하나)"""
+    data = request.get_json(silent=True)
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return 1
+    return max(1, min(len(items), Config.BATCH_MAX_ITEMS))
+
+
+@qa_bp.route('/answers/batch', methods=['POST'])
+@token_required
+@admission.limit(queue_depth=lambda: job_queue.depth(), cost=batch_cost)
+def ask_batch(token):
+    """여러 질문을 한 번에 받아 하나의 작업으로 답변 생성 (질문별 결과는 작업 상태에서 확인)"""
+    data = request.json
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items 목록이 필요합니다."}), 400
+    if len(items) > Config.BATCH_MAX_ITEMS:
+        return jsonify({"error": f"한 번에 최대 {Config.BATCH_MAX_ITEMS}개의 질문만 요청할 수 있습니다."}), 400
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or item.get("id") is None or not item.get("content"):
+            return jsonify({"error": f"{index}번째 항목에 id와 content가 필요합니다."}), 400
+
+    job_id = uuid.uuid4().hex
+    accepted, report, seen = [], [], {}
+    for index, item in enumerate(items):
+        question_id = item.get("questionId", item["id"])
+        key = request_key(question_id, item["id"], item.get("category"), item["content"], item.get("extraData"))
+        if key in seen:
+            # 같은 요청 안의 중복 질문은 한 번만 답변
+            report.append({"index": index, "id": item["id"], "status": "queued", "duplicate": True, "duplicateOf": seen[key]})
+            continue
+        seen[key] = index
+        # 이미 다른 요청이 처리 중이거나 처리한 질문은 기존 결과를 사용
+        reserved, record = idempotency.reserve(key, job_id)
+        if not reserved:
+            body, _, _ = duplicate_response(record)
+            report.append({"index": index, "id": item["id"], **body})
+            continue
+        accepted.append({
+            "index": index,
+            "questionId": question_id,
+            "id": item["id"],
+            "category": item.get("category"),
+            "content": item["content"],
+            "extraData": item.get("extraData"),
+            "key": key
+        })
+        report.append({"index": index, "id": item["id"], "status": "queued"})
+
+    if not accepted:
+        return jsonify({"status": "succeeded", "accepted": 0, "items": report}), 200
 
     try:
-        external_response = session.post(
-            target_server_url, 
-            headers=headers, 
-            json=payload,
-            timeout=30
+        job_queue.submit(
+            "answer_batch",
+            batch_answerer.run,
+            job_id, accepted, token,
+            payload={"count": len(accepted), "ids": [item["id"] for item in accepted]},
+            job_id=job_id
         )
-        external_response.raise_for_status()
-        return jsonify(external_response.json()), external_response.status_code
-        
-    except requests.exceptions.RequestException as e:
-        logger.error(f"외부 서버 요청 실패: {str(e)}")
-        return jsonify({
-            "status": "error",
-            "message": f"외부 서버 요청 실패: {str(e)}"
-        }), 500
\ No newline at end of file
+    except QueueFullError as e:
+        for item in accepted:
+            idempotency.release(item["key"], job_id)
+        logger.warning(f"답변 작업 큐 포화: {str(e)}")
+        return jsonify({"error": "요청이 많아 잠시 후 다시 시도해주세요."}), 503, {"Retry-After": "5"}
+
+    logger.info(f"일괄 답변 작업 등록: {job_id} ({len(accepted)}/{len(items)}건)")
+    return jsonify({
+        "jobId": job_id,
+        "status": "queued",
+        "statusUrl": f"/jobs/{job_id}",
+        "accepted": len(accepted),
+        "items": report
+    }), 202, {"Location": f"/jobs/{job_id}"}
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Server-Sent-Events 형식의 메시지 생성"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@qa_bp.route('/<int:questionId>/answers/stream', methods=['POST'])
+@token_required
+@admission.limit()
+def ask_stream(questionId, token):
+    """답변을 생성되는 대로 SSE로 전송하고, 완료되면 전체 답변을 외부 서버로 전송"""
+    logger.info(f"질문 ID {questionId}에 대한 스트리밍 답변 요청 시작")
+
+    data = request.json
+    if not data:
+        return jsonify({"error": "유효한 요청 본문이 필요합니다."}), 400
+
+    query_id = data.get("id")
+    query_content = data.get("content")
+    query_category = data.get("category")
+    query_extra_data = data.get("extraData")
+
+    key = request_key(questionId, query_id, query_category, query_content, query_extra_data)
+    owner = f"stream-{uuid.uuid4().hex}"
+
+    def replay(record):
+        """다른 요청이 만든 답변을 LLM 호출 없이 그대로 전송"""
+        if record["status"] != "done":
+            record = idempotency.wait(key, timeout=Config.IDEMPOTENCY_WAIT_TIMEOUT)
+        if record is None:
+            yield format_sse("error", {"message": "같은 질문의 답변 생성에 실패했습니다. 다시 시도해주세요."})
+            return
+        answer = record["result"]["answer"]
+        yield format_sse("token", {"text": answer})
+        yield format_sse("done", {"outboxId": record["result"]["outboxId"], "length": len(answer), "duplicate": True})
+
+    def generate():
+        reserved, record = idempotency.reserve(key, owner)
+        if not reserved:
+            logger.info(f"질문 ID {questionId} 중복 스트리밍 요청, 기존 결과 사용: {record['owner']}")
+            yield from replay(record)
+            return
+
+        chunks = []
+        try:
+            for chunk in qa_service.qacall_stream(query_category, query_content, query_extra_data):
+                chunks.append(chunk)
+                yield format_sse("token", {"text": chunk})
+        except GeneratorExit:
+            idempotency.release(key, owner)
+            logger.warning(f"질문 ID {questionId} 스트리밍 중 클라이언트 연결 종료")
+            raise
+        except ConcurrencyLimitError as e:
+            idempotency.release(key, owner)
+            logger.warning(f"질문 ID {questionId} 스트리밍 거절: {str(e)}")
+            yield format_sse("error", {"message": "요청이 많아 잠시 후 다시 시도해주세요.", "retryAfter": admission.shed_retry_after})
+            return
+        except Exception as e:
+            idempotency.release(key, owner)
+            logger.error(f"스트리밍 답변 생성 실패: {str(e)}")
+            yield format_sse("error", {"message": "답변 생성 중 오류가 발생했습니다."})
+            return
+
+        # 전체 답변을 조립하여 기존 전송 경로로 전달
+        answer = "".join(chunks)
+        try:
+            outbox_id = send_answer(query_id, answer, token)
+            idempotency.complete(key, owner, {"answer": answer, "outboxId": outbox_id})
+        except Exception as e:
+            # 선점을 풀어 재시도가 막히지 않도록 하고, 잘린 스트림 대신 오류 이벤트로 끝낸다
+            idempotency.release(key, owner)
+            logger.error(f"질문 ID {questionId} 스트리밍 답변 저장 실패: {str(e)}")
+            yield format_sse("error", {"message": "답변 저장 중 오류가 발생했습니다. 다시 시도해주세요."})
+            return
+        yield format_sse("done", {"outboxId": outbox_id, "length": len(answer)})
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    }
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
+
+
+@qa_bp.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(job_id, token):
+    """답변 작업 상태 조회"""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "해당 작업을 찾을 수 없습니다."}), 404
+
+    # 답변 전송 상태 첨부
+    result = job.get("result") or {}
+    if result.get("outboxId"):
+        job["delivery"] = delivery_sender.outbox.get(result["outboxId"])
+    return jsonify(job), 200
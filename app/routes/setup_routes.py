@@ -1,21 +1,34 @@
-'''
 from flask import Blueprint, jsonify
-from langchain_openai import OpenAIEmbeddings
-from app.services.db_service import PDFConverter, VectorDBSetup
+from app.services.job_service import JobStore
+from app.services.rebuild_service import RebuildInProgressError, RebuildService
 from config.config import Config
 
 setup_bp = Blueprint('setup', __name__)
 
+# 재구축은 요청 스레드가 아닌 백그라운드 작업으로 실행하고, 상태는 작업 DB에서 조회
+rebuild_service = RebuildService(
+    Config,
+    JobStore(Config.JOB_DB_PATH, ttl_seconds=Config.JOB_TTL_SECONDS),
+    progress_interval=Config.REBUILD_PROGRESS_INTERVAL
+)
+
 @setup_bp.route('/setup_aidb', methods=['POST'])
 def setup_db():
-    PDFConverter.convert_pdf_to_text(
-        pdf_dir=Config.PDF_DIR_PATH, 
-        txt_dir=Config.TXT_DIR_PATH
-    )
-    vector_db_setup = VectorDBSetup(embedding=OpenAIEmbeddings())
-    response = vector_db_setup.setup_vector_db(
-        txt_directory=Config.TXT_DIR_PATH, 
-        db_directory=Config.VECTOR_DB_PATH
-    )
-    return jsonify(response)
-'''
\ No newline at end of file
+    try:
+        job_id = rebuild_service.start()
+    except RebuildInProgressError as e:
+        return jsonify({"error": str(e)}), 409
+
+    return jsonify({
+        "jobId": job_id,
+        "status": "queued",
+        "statusUrl": f"/setup_aidb/status/{job_id}"
+    }), 202, {"Location": f"/setup_aidb/status/{job_id}"}
+
+@setup_bp.route('/setup_aidb/status', methods=['GET'])
+@setup_bp.route('/setup_aidb/status/<job_id>', methods=['GET'])
+def setup_status(job_id=None):
+    job = rebuild_service.status(job_id)
+    if job is None:
+        return jsonify({"error": "재구축 작업을 찾을 수 없습니다."}), 404
+    return jsonify(job)
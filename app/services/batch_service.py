@@ -0,0 +1,115 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+class BatchAnswerer:
+    """여러 질문의 답변을 제한된 동시성으로 생성하고 묶어서 전송하는 클래스.
+
+    질문 임베딩은 한 번의 API 호출로 미리 계산하고, 검색 결과와 카테고리별 프롬프트는
+    QAService의 캐시를 함께 사용한다. 완료된 답변은 delivery_chunk개씩 한 트랜잭션으로
+    outbox에 넣어 전송 스레드가 묶음 단위로 동시에 전송하도록 한다.
+    작업이 길어져도 재시도 요청이 같은 질문을 가져가지 않도록 남은 질문의 선점을 주기적으로 갱신한다.
+    """
+
+    def __init__(self, qa_service, delivery_sender, idempotency, store, url_for,
+                 parallelism: int = 4, delivery_chunk: int = 20, refresh_interval: float = None):
+        self.qa_service = qa_service
+        self.delivery_sender = delivery_sender
+        self.idempotency = idempotency
+        self.store = store
+        self.url_for = url_for
+        self.parallelism = parallelism
+        self.delivery_chunk = delivery_chunk
+        # 기본값은 선점 만료 시간의 1/3
+        self.refresh_interval = refresh_interval or idempotency.pending_timeout / 3
+
+    def run(self, job_id: str, items: list, token: str) -> dict:
+        """items: index, questionId, id, category, content, extraData, key를 가진 질문 목록"""
+        results = [None] * len(items)
+        pending = []
+
+        def finish(position: int, result: dict):
+            results[position] = result
+            done = [result for result in results if result is not None]
+            self.store.set_progress(job_id, {
+                "total": len(items),
+                "done": len(done),
+                "failed": sum(1 for result in done if result["status"] == "failed"),
+                # 진행 중에는 답변 본문 없이 질문별 상태만 기록
+                "items": [{key: value for key, value in result.items() if key != "answer"} for result in done]
+            })
+
+        def fail(position: int, error: Exception):
+            item = items[position]
+            self.idempotency.release(item["key"], job_id)
+            logger.error(f"일괄 답변 실패: {job_id} #{item['index']}, 오류 내용: {error}")
+            finish(position, {"index": item["index"], "id": item["id"], "status": "failed", "error": str(error)})
+
+        def flush():
+            batch, pending[:] = list(pending), []
+            if not batch:
+                return
+            try:
+                outbox_ids = self.delivery_sender.submit_many([
+                    (items[position]["id"], self.url_for(items[position]["id"]), token, {"answer": answer})
+                    for position, answer in batch
+                ])
+            except Exception as e:
+                for position, _ in batch:
+                    fail(position, e)
+                return
+            for (position, answer), outbox_id in zip(batch, outbox_ids):
+                item = items[position]
+                result = {"answer": answer, "outboxId": outbox_id}
+                self.idempotency.complete(item["key"], job_id, result)
+                finish(position, {"index": item["index"], "id": item["id"], "status": "succeeded", **result})
+
+        stopped = threading.Event()
+
+        def keep_reserved():
+            # 큐에서 기다린 시간도 있으므로 시작하자마자 한 번 갱신
+            while True:
+                keys = [item["key"] for item, result in zip(items, results) if result is None]
+                try:
+                    self.idempotency.refresh(keys, job_id)
+                except Exception as e:
+                    logger.warning(f"일괄 답변 선점 갱신 실패: {job_id}, 오류 내용: {e}")
+                if stopped.wait(self.refresh_interval):
+                    return
+
+        refresher = threading.Thread(target=keep_reserved, name=f"batch-refresh-{job_id[:8]}", daemon=True)
+        refresher.start()
+        try:
+            self.qa_service.prefetch_embeddings([item["content"] for item in items])
+
+            with ThreadPoolExecutor(max_workers=max(1, min(self.parallelism, len(items))),
+                                    thread_name_prefix="batch-answer") as executor:
+                futures = {
+                    executor.submit(self.qa_service.qacall, item["category"], item["content"], item["extraData"]): position
+                    for position, item in enumerate(items)
+                }
+                for future in as_completed(futures):
+                    position = futures[future]
+                    try:
+                        pending.append((position, future.result()))
+                    except Exception as e:
+                        fail(position, e)
+                        continue
+                    if len(pending) >= self.delivery_chunk:
+                        flush()
+            flush()
+        finally:
+            stopped.set()
+            refresher.join()
+
+        succeeded = sum(1 for result in results if result["status"] == "succeeded")
+        logger.info(f"일괄 답변 완료: {job_id} (성공 {succeeded}, 실패 {len(items) - succeeded})")
+        return {
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "items": results
+        }
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.sqlite_utils import ThreadLocalSQLite
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """유니코드 정규화 후 공백을 하나로 합치고 소문자로 변환"""
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", str(text)).lower().split())
+
+
+def profile_key(category: str, extra_data: dict) -> str:
+    """카테고리와 정규화된 extra_data로 프로필 키 생성 (값이 빈 항목은 무시)"""
+    profile = {}
+    for key, value in (extra_data or {}).items():
+        if value in (None, "", [], {}):
+            continue
+        profile[key] = normalize_text(value) if isinstance(value, str) else value
+    raw = json.dumps([normalize_text(category), profile], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """LLM 앞단의 답변 캐시 클래스.
+
+    1단계는 (프로필, 정규화된 질문)의 해시로 정확히 일치하는 답변을 찾고,
+    2단계는 같은 프로필 안에서 질문 임베딩의 코사인 유사도가 임계값 이상인 답변을 찾는다.
+    """
+
+    def __init__(self, embed_fn, similarity_threshold: float = 0.95, ttl_seconds: float = 86400,
+                 max_entries: int = 1000, db_path: str = None):
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._db = None
+        if db_path:
+            self._db = ThreadLocalSQLite(db_path)
+            with self._db.connect() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS answer_cache (
+                        key TEXT PRIMARY KEY,
+                        profile_key TEXT NOT NULL,
+                        embedding BLOB,
+                        answer TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                    """
+                )
+            self._load()
+
+    def _load(self):
+        """디스크에 저장된 유효한 캐시 항목을 메모리로 로드"""
+        conn = self._db.connect()
+        with conn:
+            conn.execute("DELETE FROM answer_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        rows = conn.execute(
+            "SELECT key, profile_key, embedding, answer, created_at FROM answer_cache "
+            "ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for key, pkey, embedding, answer, created_at in reversed(rows):
+            vector = np.frombuffer(embedding, dtype=np.float32) if embedding else None
+            self._insert(key, pkey, vector, answer, created_at)
+        logger.info(f"답변 캐시 {len(rows)}건 로드")
+
+    @staticmethod
+    def _exact_key(pkey: str, content: str) -> str:
+        return hashlib.sha256(f"{pkey}\n{normalize_text(content)}".encode("utf-8")).hexdigest()
+
+    def _embed(self, content: str):
+        vector = np.asarray(self.embed_fn(content), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, category: str, content: str, extra_data: dict):
+        """캐시된 답변 반환. 없으면 None"""
+        pkey = profile_key(category, extra_data)
+        key = self._exact_key(pkey, content)
+
+        with self._lock:
+            answer = self._get_exact(key)
+            if answer is not None:
+                self.stats["exact_hits"] += 1
+                return answer
+            has_candidates = bool(self._profiles.get(pkey))
+
+        if self._db is not None:
+            answer = self._get_from_disk(key)
+            if answer is not None:
+                with self._lock:
+                    self.stats["exact_hits"] += 1
+                return answer
+
+        if has_candidates:
+            vector = self._embed(content)
+            with self._lock:
+                answer = self._get_similar(pkey, vector)
+                if answer is not None:
+                    self.stats["semantic_hits"] += 1
+                    return answer
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, category: str, content: str, extra_data: dict, answer: str):
+        """답변을 캐시에 저장"""
+        pkey = profile_key(category, extra_data)
+        key = self._exact_key(pkey, content)
+        try:
+            vector = self._embed(content)
+        except Exception as e:
+            # 임베딩 실패 시 정확히 일치하는 질문에만 사용
+            logger.warning(f"답변 캐시 임베딩 실패: {e}")
+            vector = None
+        created_at = time.time()
+
+        with self._lock:
+            self._insert(key, pkey, vector, answer, created_at)
+
+        if self._db is not None:
+            with self._db.connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO answer_cache (key, profile_key, embedding, answer, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, pkey, vector.tobytes() if vector is not None else None, answer, created_at)
+                )
+                # 디스크도 TTL과 최대 항목 수를 넘지 않도록 정리
+                conn.execute(
+                    "DELETE FROM answer_cache WHERE created_at < ? OR key NOT IN "
+                    "(SELECT key FROM answer_cache ORDER BY created_at DESC LIMIT ?)",
+                    (created_at - self.ttl_seconds, self.max_entries)
+                )
+
+    def _get_exact(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._is_expired(entry):
+            self._remove(key)
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry["answer"]
+
+    def _get_from_disk(self, key: str):
+        """다른 워커가 저장한 답변을 디스크에서 조회"""
+        row = self._db.connect().execute(
+            "SELECT profile_key, embedding, answer, created_at FROM answer_cache WHERE key = ? AND created_at >= ?",
+            (key, time.time() - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+        pkey, embedding, answer, created_at = row
+        vector = np.frombuffer(embedding, dtype=np.float32) if embedding else None
+        with self._lock:
+            self._insert(key, pkey, vector, answer, created_at)
+        return answer
+
+    def _get_similar(self, pkey: str, vector):
+        keys = [key for key in self._profiles.get(pkey, ()) if self._entries[key]["vector"] is not None]
+        if not keys:
+            return None
+        matrix = np.stack([self._entries[key]["vector"] for key in keys])
+        scores = matrix @ vector
+        for index in np.argsort(-scores):
+            if scores[index] < self.similarity_threshold:
+                break
+            key = keys[index]
+            if self._is_expired(self._entries[key]):
+                self._remove(key)
+                self.stats["expired"] += 1
+                continue
+            self._entries.move_to_end(key)
+            return self._entries[key]["answer"]
+        return None
+
+    def _is_expired(self, entry: dict) -> bool:
+        return time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _insert(self, key: str, pkey: str, vector, answer: str, created_at: float):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = {"profile_key": pkey, "vector": vector, "answer": answer, "created_at": created_at}
+        self._profiles.setdefault(pkey, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        keys = self._profiles.get(entry["profile_key"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._profiles[entry["profile_key"]]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        return stats
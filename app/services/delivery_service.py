@@ -0,0 +1,383 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.services import metrics_service as metrics
+from utils.sqlite_utils import ThreadLocalSQLite
+
+logger = logging.getLogger(__name__)
+
+# 재시도해도 성공할 가능성이 있는 HTTP 상태 코드
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_http_session(pool_size: int = 10) -> requests.Session:
+    """프로세스 단위로 공유되는 keep-alive 커넥션 풀 세션 반환 (fork 이후 새로 생성)"""
+    global _session, _session_pid
+    if _session is not None and _session_pid == os.getpid():
+        return _session
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            # 재시도는 outbox 전송기가 담당하므로 어댑터 수준의 재시도(요청 스레드 sleep)는 끈다
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+    return _session
+
+
+class DeliveryOutbox:
+    """전송 대기 중인 답변을 SQLite에 보관하는 outbox 클래스."""
+
+    def __init__(self, db_path: str):
+        self._db = ThreadLocalSQLite(db_path)
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    question_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    token TEXT,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    locked_until REAL NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    response TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_question ON outbox (question_id, status)"
+            )
+
+    def enqueue(self, question_id, url: str, token: str, payload: dict) -> int:
+        """답변을 outbox에 저장하고 항목 ID를 반환.
+
+        같은 질문에 대해 아직 전송되지 않은 항목이 있으면 새 답변으로 덮어써서
+        한 번만 전송되도록 합친다.
+        """
+        return self.enqueue_many([(question_id, url, token, payload)])[0]
+
+    def enqueue_many(self, entries: list) -> list:
+        """(question_id, url, token, payload) 목록을 한 트랜잭션으로 저장하고 항목 ID 목록 반환"""
+        now = time.time()
+        conn = self._db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return [self._enqueue(conn, now, *entry) for entry in entries]
+
+    @staticmethod
+    def _enqueue(conn, now: float, question_id, url: str, token: str, payload: dict) -> int:
+        body = json.dumps(payload, ensure_ascii=False)
+        row = conn.execute(
+            "SELECT id FROM outbox WHERE question_id = ? AND status = 'pending' AND locked_until < ?",
+            (str(question_id), now)
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE outbox SET url = ?, token = ?, payload = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (url, token, body, now, now, row[0])
+            )
+            return row[0]
+        cursor = conn.execute(
+            "INSERT INTO outbox (question_id, url, token, payload, status, next_attempt_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+            (str(question_id), url, token, body, now, now, now)
+        )
+        return cursor.lastrowid
+
+    def claim_due(self, limit: int, lease_seconds: float) -> list:
+        """전송 시각이 된 항목을 임대(lease)하여 다른 워커가 중복 전송하지 않도록 한다"""
+        return self._claim(
+            "status = 'pending' AND next_attempt_at <= ? AND locked_until < ? ORDER BY next_attempt_at LIMIT ?",
+            lambda now: (now, now, limit),
+            lease_seconds
+        )
+
+    def claim(self, item_id: int, lease_seconds: float):
+        """특정 항목을 바로 전송하기 위해 임대 (이미 전송되었거나 다른 곳에서 전송 중이면 None)"""
+        items = self._claim(
+            "id = ? AND status = 'pending' AND locked_until < ?",
+            lambda now: (item_id, now),
+            lease_seconds
+        )
+        return items[0] if items else None
+
+    def _claim(self, where: str, params, lease_seconds: float) -> list:
+        now = time.time()
+        conn = self._db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                f"SELECT id, question_id, url, token, payload, attempts FROM outbox WHERE {where}",
+                params(now)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE outbox SET locked_until = ? WHERE id = ?",
+                    [(now + lease_seconds, row[0]) for row in rows]
+                )
+        return [
+            {
+                "id": row[0],
+                "question_id": row[1],
+                "url": row[2],
+                "token": row[3],
+                "payload": json.loads(row[4]),
+                "attempts": row[5],
+                "locked_until": now + lease_seconds
+            }
+            for row in rows
+        ]
+
+    def renew(self, item: dict, lease_seconds: float) -> bool:
+        """전송 직전에 임대를 연장. 그사이 다른 워커가 다시 임대했거나 처리가 끝났으면 False
+
+        임대 만료 시각을 임대 식별자로 사용하므로, 만료 후 아무도 가져가지 않은 항목은 그대로 연장된다.
+        """
+        locked_until = time.time() + lease_seconds
+        conn = self._db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "UPDATE outbox SET locked_until = ? WHERE id = ? AND status = 'pending' AND locked_until = ?",
+                (locked_until, item["id"], item["locked_until"])
+            )
+        if cursor.rowcount != 1:
+            return False
+        item["locked_until"] = locked_until
+        return True
+
+    def mark_delivered(self, item_id: int, response):
+        now = time.time()
+        with self._db.connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = 'delivered', attempts = attempts + 1, locked_until = 0, "
+                "token = NULL, response = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(response, ensure_ascii=False), now, item_id)
+            )
+
+    def mark_failed(self, item_id: int, error: str, next_attempt_at: float = None):
+        """전송 실패 기록. next_attempt_at이 없으면 더 이상 재시도하지 않는다(dead)"""
+        now = time.time()
+        status = "pending" if next_attempt_at is not None else "dead"
+        with self._db.connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, locked_until = 0, "
+                "next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (status, next_attempt_at or now, error, now, item_id)
+            )
+
+    def get(self, item_id: int):
+        row = self._db.connect().execute(
+            "SELECT id, question_id, status, attempts, next_attempt_at, last_error, response, updated_at "
+            "FROM outbox WHERE id = ?",
+            (item_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "outboxId": row[0],
+            "questionId": row[1],
+            "status": row[2],
+            "attempts": row[3],
+            "nextAttemptAt": row[4],
+            "lastError": row[5],
+            "response": json.loads(row[6]) if row[6] else None,
+            "updatedAt": row[7]
+        }
+
+    def counts(self) -> dict:
+        rows = self._db.connect().execute(
+            "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+
+class DeliverySender:
+    """outbox의 답변을 백그라운드에서 재시도/백오프하며 외부 서버로 전송하는 클래스."""
+
+    def __init__(self, outbox: DeliveryOutbox, pool_size: int = 10, timeout: float = 30,
+                 max_attempts: int = 10, backoff_base: float = 1, backoff_max: float = 300,
+                 batch_size: int = 20, poll_interval: float = 5):
+        self.outbox = outbox
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._aclient = None
+        self._aclient_loop = None
+        self._aclient_pid = None
+
+    def _ensure_started(self):
+        """전송 스레드를 지연 시작 (fork된 프로세스에서는 다시 시작)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._wakeup = threading.Event()
+            # 한 묶음의 항목은 커넥션 풀 크기만큼 동시에 전송
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="delivery")
+            thread = threading.Thread(target=self._run, name="delivery-sender", daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+            logger.info(f"답변 전송 스레드 시작 (pid={self._pid})")
+
+    def submit(self, question_id, url: str, token: str, payload: dict) -> int:
+        """답변을 outbox에 저장하고 전송 스레드를 깨운다"""
+        self._ensure_started()
+        item_id = self.outbox.enqueue(question_id, url, token, payload)
+        self._wakeup.set()
+        return item_id
+
+    def submit_many(self, entries: list) -> list:
+        """여러 답변을 한 번에 outbox에 저장하고 전송 스레드를 한 번만 깨운다"""
+        self._ensure_started()
+        item_ids = self.outbox.enqueue_many(entries)
+        self._wakeup.set()
+        return item_ids
+
+    def start(self):
+        """다른 워커가 남긴 미전송 항목도 처리하도록 전송 스레드를 미리 시작"""
+        self._ensure_started()
+
+    def _run(self):
+        while True:
+            # 짧은 시간 동안 들어온 답변을 한 번에 모아서 전송
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                while self._deliver_batch():
+                    pass
+            except Exception as e:
+                logger.error(f"답변 전송 루프 오류: {e}")
+
+    def _deliver_batch(self) -> bool:
+        """만기된 항목을 한 묶음 전송. 전송한 항목이 있으면 True"""
+        items = self.outbox.claim_due(self.batch_size, lease_seconds=self._lease_seconds())
+        if len(items) > 1:
+            list(self._executor.map(self._deliver, items))
+        elif items:
+            self._deliver(items[0])
+        return len(items) == self.batch_size
+
+    @staticmethod
+    def _headers(item: dict) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if item["token"]:
+            headers["Authorization"] = item["token"]
+        return headers
+
+    def _lease_seconds(self) -> float:
+        return self.timeout * 2
+
+    def _deliver(self, item: dict):
+        # 묶음의 뒤쪽 항목은 앞 항목 전송을 기다리는 동안 임대가 끝날 수 있으므로 보내기 직전에 연장한다
+        if not self.outbox.renew(item, self._lease_seconds()):
+            logger.info(f"답변 전송 건너뜀(다른 워커가 임대): 질문 ID {item['question_id']}")
+            return
+        attempt = item["attempts"] + 1
+        started = time.perf_counter()
+        try:
+            response = get_http_session(self.pool_size).post(
+                item["url"],
+                headers=self._headers(item),
+                json=item["payload"],
+                timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            metrics.DELIVERY_SECONDS.observe(time.perf_counter() - started, result="error")
+            self._retry_later(item, attempt, f"요청 실패: {e}")
+            return
+        metrics.DELIVERY_SECONDS.observe(time.perf_counter() - started, result=str(response.status_code))
+        self._handle_response(item, attempt, response)
+
+    def _async_client(self):
+        """현재 이벤트 루프에서 사용할 httpx 비동기 클라이언트 (루프/프로세스마다 새로 생성)"""
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop or self._aclient_pid != os.getpid():
+            limits = httpx.Limits(max_connections=self.pool_size * 10, max_keepalive_connections=self.pool_size)
+            self._aclient = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+            self._aclient_loop = loop
+            self._aclient_pid = os.getpid()
+        return self._aclient
+
+    async def aclose(self):
+        if self._aclient is not None and self._aclient_pid == os.getpid():
+            await self._aclient.aclose()
+        self._aclient = None
+
+    async def adeliver(self, item_id: int):
+        """이벤트 루프에서 바로 전송 시도 (실패하면 백그라운드 전송 스레드가 재시도)"""
+        self._ensure_started()
+        item = await asyncio.to_thread(self.outbox.claim, item_id, self._lease_seconds())
+        if item is None:
+            return
+        attempt = item["attempts"] + 1
+        started = time.perf_counter()
+        try:
+            response = await self._async_client().post(item["url"], headers=self._headers(item), json=item["payload"])
+        except httpx.HTTPError as e:
+            metrics.DELIVERY_SECONDS.observe(time.perf_counter() - started, result="error")
+            await asyncio.to_thread(self._retry_later, item, attempt, f"요청 실패: {e!r}")
+            return
+        metrics.DELIVERY_SECONDS.observe(time.perf_counter() - started, result=str(response.status_code))
+        await asyncio.to_thread(self._handle_response, item, attempt, response)
+
+    def _handle_response(self, item: dict, attempt: int, response):
+        """requests/httpx 응답 공통 처리"""
+        if 200 <= response.status_code < 300:
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            self.outbox.mark_delivered(item["id"], {"statusCode": response.status_code, "response": body})
+            logger.info(f"답변 전송 완료: 질문 ID {item['question_id']} (시도 {attempt}회)")
+        elif response.status_code in RETRYABLE_STATUS:
+            self._retry_later(item, attempt, f"HTTP {response.status_code}", response.headers.get("Retry-After"))
+        else:
+            self.outbox.mark_failed(item["id"], f"HTTP {response.status_code}: {response.text[:500]}")
+            logger.error(f"답변 전송 실패(재시도 불가): 질문 ID {item['question_id']}, HTTP {response.status_code}")
+
+    def _retry_later(self, item: dict, attempt: int, error: str, retry_after: str = None):
+        if attempt >= self.max_attempts:
+            self.outbox.mark_failed(item["id"], error)
+            logger.error(f"답변 전송 최종 실패: 질문 ID {item['question_id']}, {error}")
+            return
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay = random.uniform(delay / 2, delay)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        self.outbox.mark_failed(item["id"], error, next_attempt_at=time.time() + delay)
+        logger.warning(f"답변 전송 재시도 예정: 질문 ID {item['question_id']}, {delay:.1f}초 후, {error}")
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from config.config import Config
+from utils.sqlite_utils import ThreadLocalSQLite
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """OpenAI 등 임베딩 API의 rate limit(429) 오류인지 확인"""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+class EmbeddingCache:
+    """청크 텍스트 해시와 모델 이름을 키로 임베딩을 저장하는 디스크 캐시."""
+
+    def __init__(self, db_path: str):
+        self._db = ThreadLocalSQLite(db_path)
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+                """
+            )
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, hashes: list) -> dict:
+        found = {}
+        conn = self._db.connect()
+        # SQLite 변수 개수 제한을 넘지 않도록 나눠서 조회
+        for start in range(0, len(hashes), 500):
+            part = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *part]
+            ).fetchall()
+            for text_hash, blob in rows:
+                found[text_hash] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: list):
+        """items: [(text_hash, vector), ...]"""
+        with self._db.connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, text_hash, array("f", vector).tobytes()) for text_hash, vector in items]
+            )
+
+
+class BatchedEmbeddings(Embeddings):
+    """배치 크기와 동시 요청 수를 제한하고, rate limit 시 백오프하며, 결과를 디스크에 캐시하는 임베딩 래퍼.
+
+    배치가 끝날 때마다 캐시에 저장하므로 중간에 실패해도 다시 실행하면 이미 비용을 낸 임베딩은 건너뛴다.
+    """
+
+    def __init__(self, embedding: Embeddings, cache_path: str = None, batch_size: int = 100,
+                 concurrency: int = 4, max_retries: int = 6, backoff_base: float = 1.0,
+                 backoff_max: float = 60.0):
+        self.embedding = embedding
+        self.cache = EmbeddingCache(cache_path) if cache_path else None
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def model(self) -> str:
+        return getattr(self.embedding, "model", None) or type(self.embedding).__name__
+
+    def reset_stats(self):
+        self.stats = {"chunks": 0, "cached": 0, "embedded": 0, "batches": 0, "retries": 0, "seconds": 0.0}
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["chunks_per_sec"] = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
+
+    def embed_query(self, text: str):
+        return self.embedding.embed_query(text)
+
+    def embed_documents(self, texts):
+        started = time.perf_counter()
+        texts = list(texts)
+        hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model, list(set(hashes))) if self.cache else {}
+        cached_count = sum(1 for text_hash in hashes if text_hash in vectors)
+
+        # 캐시에 없는 텍스트만 중복 없이 임베딩
+        pending = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in vectors and text_hash not in pending:
+                pending[text_hash] = text
+        items = list(pending.items())
+        batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+                for batch, batch_vectors in zip(batches, executor.map(self._embed_batch, batches)):
+                    for (text_hash, _), vector in zip(batch, batch_vectors):
+                        vectors[text_hash] = vector
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["chunks"] += len(texts)
+            self.stats["cached"] += cached_count
+            self.stats["embedded"] += len(items)
+            self.stats["batches"] += len(batches)
+            self.stats["seconds"] += elapsed
+        if texts:
+            logger.info(
+                f"임베딩 {len(texts)}건 (캐시 {cached_count}, 신규 {len(items)}) "
+                f"{elapsed:.2f}초, {len(texts) / elapsed if elapsed else 0:.1f}건/초"
+            )
+        return [vectors[text_hash] for text_hash in hashes]
+
+    def _embed_batch(self, batch: list) -> list:
+        """한 배치를 임베딩하고 즉시 캐시에 저장 (rate limit 오류는 지수 백오프 후 재시도)"""
+        texts = [text for _, text in batch]
+        attempt = 0
+        while True:
+            try:
+                batch_vectors = self.embedding.embed_documents(texts)
+                break
+            except Exception as e:
+                attempt += 1
+                if not is_rate_limit_error(e) or attempt > self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                delay = random.uniform(delay / 2, delay)
+                with self._lock:
+                    self.stats["retries"] += 1
+                logger.warning(f"임베딩 rate limit, {delay:.1f}초 후 재시도 ({attempt}/{self.max_retries})")
+                time.sleep(delay)
+
+        if self.cache:
+            self.cache.put_many(self.model, [(text_hash, vector) for (text_hash, _), vector in zip(batch, batch_vectors)])
+        return batch_vectors
+
+
+def create_batched_embeddings(embedding: Embeddings = None) -> BatchedEmbeddings:
+    """설정값으로 인덱싱용 임베딩 생성 (기본은 OpenAIEmbeddings)"""
+    if embedding is None:
+        from langchain_openai import OpenAIEmbeddings
+        embedding = OpenAIEmbeddings()
+    return BatchedEmbeddings(
+        embedding,
+        cache_path=Config.EMBEDDING_CACHE_PATH,
+        batch_size=Config.EMBEDDING_BATCH_SIZE,
+        concurrency=Config.EMBEDDING_CONCURRENCY,
+        max_retries=Config.EMBEDDING_MAX_RETRIES
+    )
@@ -0,0 +1,140 @@
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 * 1024 * 1024
+
+
+def check_sqlite(path: str, query: str = "SELECT 1"):
+    """SQLite 파일을 읽기 전용으로 열어 간단한 질의가 되는지 확인"""
+    if not os.path.exists(path):
+        return False, f"파일이 존재하지 않습니다: {path}"
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=1)
+    try:
+        conn.execute(query).fetchone()
+    finally:
+        conn.close()
+    return True, "정상"
+
+
+class HealthMonitor:
+    """시스템 자원과 의존성 상태를 백그라운드 스레드에서 주기적으로 수집하는 클래스.
+
+    프로브 요청은 마지막으로 수집한 결과만 읽으므로 요청마다 psutil 호출이나
+    벡터 DB 연결을 하지 않는다. checks는 {이름: 함수}이며 함수는 (정상 여부, 메시지)를 반환한다.
+    """
+
+    def __init__(self, checks: dict, sample_interval: float = 5.0, check_interval: float = 30.0,
+                 disk_path: str = "/", stale_after: float = None):
+        self.checks = checks
+        self.sample_interval = sample_interval
+        self.check_interval = check_interval
+        self.disk_path = disk_path
+        # 수집 스레드가 멈춘 채 오래된 결과로 준비 상태를 알리지 않도록 유효 시간을 둔다
+        self.stale_after = stale_after or max(check_interval, sample_interval) * 3
+        self._system = None
+        self._services = {}
+        self._checked_at = 0.0
+        self._sampled_at = 0.0
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """수집 스레드를 지연 시작 (fork된 프로세스에서는 다시 시작)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            thread = threading.Thread(target=self._run, name="health-sampler", daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"상태 수집 실패: {e}")
+            time.sleep(self.sample_interval)
+
+    def sample(self):
+        """시스템 자원은 매번, 의존성 검사는 check_interval마다 갱신"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        system = {
+            # interval 없이 호출하면 직전 호출 이후의 사용률을 바로 반환한다
+            "cpu_usage": f"{psutil.cpu_percent(interval=None)}%",
+            "memory": {
+                "total": f"{memory.total / GB:.2f}GB",
+                "used": f"{memory.used / GB:.2f}GB",
+                "free": f"{memory.free / GB:.2f}GB",
+                "percent": f"{memory.percent}%"
+            },
+            "disk": {
+                "total": f"{disk.total / GB:.2f}GB",
+                "used": f"{disk.used / GB:.2f}GB",
+                "free": f"{disk.free / GB:.2f}GB",
+                "percent": f"{disk.percent}%"
+            }
+        }
+        now = time.time()
+        services = None
+        if now - self._checked_at >= self.check_interval:
+            services = {}
+            for name, check in self.checks.items():
+                started = time.perf_counter()
+                try:
+                    healthy, message = check()
+                except Exception as e:
+                    healthy, message = False, str(e)
+                services[name] = {
+                    "status": "healthy" if healthy else "unhealthy",
+                    "message": message,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 2)
+                }
+                if not healthy:
+                    logger.warning(f"의존성 상태 이상: {name}, {message}")
+        with self._lock:
+            self._system = system
+            self._sampled_at = now
+            if services is not None:
+                self._services = services
+                self._checked_at = now
+
+    def _ensure_sampled(self):
+        self.start()
+        if self._checked_at == 0.0:
+            # 수집 스레드가 첫 결과를 만들기 전에 들어온 요청은 한 번만 직접 수집
+            self.sample()
+
+    def is_ready(self):
+        """(준비 여부, 의존성 상태)"""
+        self._ensure_sampled()
+        with self._lock:
+            services = self._services
+            fresh = time.time() - self._checked_at <= self.stale_after
+        ready = fresh and all(service["status"] == "healthy" for service in services.values())
+        return ready, services
+
+    def snapshot(self) -> dict:
+        ready, services = self.is_ready()
+        with self._lock:
+            system = self._system
+            sampled_at = self._sampled_at
+            checked_at = self._checked_at
+        return {
+            "status": "healthy" if ready else "unhealthy",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "sampled_at": datetime.datetime.fromtimestamp(sampled_at).isoformat(),
+            "checked_at": datetime.datetime.fromtimestamp(checked_at).isoformat(),
+            "services": services,
+            "system": system
+        }
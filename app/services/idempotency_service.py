@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import time
+
+from utils.sqlite_utils import ThreadLocalSQLite
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(question_id, query_id, category: str, content: str, extra_data) -> str:
+    """같은 질문의 중복 요청을 구분하는 키 (질문 ID + 요청 본문 해시)"""
+    body = json.dumps(
+        {"id": query_id, "category": category, "content": content, "extraData": extra_data},
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return f"{question_id}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+class IdempotencyStore:
+    """중복 요청을 하나의 답변 생성으로 합치는 저장소.
+
+    먼저 도착한 요청이 키를 선점(pending)하고, 같은 키의 요청은 그 결과를 기다리거나
+    완료된 결과(done)를 그대로 돌려받는다. 모든 gunicorn 워커가 같은 SQLite 파일을 사용하므로
+    워커가 달라도 LLM 호출은 한 번만 일어난다.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 86400, pending_timeout: float = 600):
+        self.ttl_seconds = ttl_seconds
+        self.pending_timeout = pending_timeout
+        self._db = ThreadLocalSQLite(db_path)
+        self._last_purge = 0.0
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS idempotency (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _is_live(self, status: str, updated_at: float, now: float) -> bool:
+        if status == "done":
+            return now - updated_at <= self.ttl_seconds
+        # 선점한 워커가 죽었으면 일정 시간 뒤 다른 요청이 다시 처리할 수 있다
+        return now - updated_at <= self.pending_timeout
+
+    def reserve(self, key: str, owner: str) -> tuple:
+        """키를 선점하면 (True, None), 이미 처리 중이거나 완료되었으면 (False, 기존 기록)"""
+        now = time.time()
+        conn = self._db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT owner, status, result, created_at, updated_at FROM idempotency WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._is_live(row[1], row[4], now):
+                return False, self._to_dict(key, row)
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency (key, owner, status, result, created_at, updated_at) "
+                "VALUES (?, ?, 'pending', NULL, ?, ?)",
+                (key, owner, now, now)
+            )
+        self._maybe_purge()
+        return True, None
+
+    def complete(self, key: str, owner: str, result: dict):
+        with self._db.connect() as conn:
+            conn.execute(
+                "UPDATE idempotency SET status = 'done', result = ?, updated_at = ? WHERE key = ? AND owner = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), key, owner)
+            )
+
+    def refresh(self, keys: list, owner: str):
+        """처리 중인 키의 선점 시각을 갱신하여 오래 걸리는 작업의 키를 재시도가 가져가지 않도록 한다"""
+        if not keys:
+            return
+        now = time.time()
+        conn = self._db.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE idempotency SET updated_at = ? WHERE key = ? AND owner = ? AND status = 'pending'",
+                [(now, key, owner) for key in keys]
+            )
+
+    def release(self, key: str, owner: str):
+        """실패한 요청의 선점을 풀어 재시도가 새로 처리되도록 한다"""
+        with self._db.connect() as conn:
+            conn.execute("DELETE FROM idempotency WHERE key = ? AND owner = ? AND status = 'pending'", (key, owner))
+
+    def get(self, key: str):
+        row = self._db.connect().execute(
+            "SELECT owner, status, result, created_at, updated_at FROM idempotency WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or not self._is_live(row[1], row[4], time.time()):
+            return None
+        return self._to_dict(key, row)
+
+    def wait(self, key: str, timeout: float, interval: float = 0.5):
+        """다른 요청이 처리 중인 키의 결과를 기다린다. 완료 기록 또는 None(실패/시간 초과) 반환"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            record = self.get(key)
+            if record is None or record["status"] == "done":
+                return record
+            time.sleep(interval)
+        return None
+
+    @staticmethod
+    def _to_dict(key: str, row) -> dict:
+        return {
+            "key": key,
+            "owner": row[0],
+            "status": row[1],
+            "result": json.loads(row[2]) if row[2] else None,
+            "createdAt": row[3],
+            "updatedAt": row[4]
+        }
+
+    def _maybe_purge(self, interval: float = 60.0):
+        now = time.time()
+        if now - self._last_purge < interval:
+            return
+        self._last_purge = now
+        try:
+            with self._db.connect() as conn:
+                conn.execute(
+                    "DELETE FROM idempotency WHERE (status = 'done' AND updated_at < ?) "
+                    "OR (status = 'pending' AND updated_at < ?)",
+                    (now - self.ttl_seconds, now - self.pending_timeout)
+                )
+        except Exception as e:
+            logger.error(f"중복 요청 기록 정리 실패: {e}")
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "index_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sha256_file(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, chunk_hash: str, occurrence: int = 0) -> str:
+    """소스 파일과 청크 내용으로 결정되는 벡터 ID (같은 파일 안의 중복 청크는 occurrence로 구분)"""
+    return sha256_text(f"{source}\n{chunk_hash}\n{occurrence}")[:32]
+
+
+def owned_ids(chunks: list) -> list:
+    """매니페스트 청크 목록 중 벡터 DB에 직접 저장된 청크의 벡터 ID (근접 중복 청크 제외)"""
+    return [chunk[1] for chunk in chunks if len(chunk) == 2]
+
+
+class IndexManifest:
+    """벡터 DB에 반영된 파일/청크 해시를 기록하는 매니페스트.
+
+    files: {소스 경로: {"hash": 파일 해시, "chunks": [[청크 해시, 벡터 ID], ...]}}
+    근접 중복으로 저장하지 않은 청크는 [청크 해시, 벡터 ID, 대표 청크의 벡터 ID]로 기록한다.
+    """
+
+    def __init__(self, path: str, data: dict = None):
+        self.path = path
+        self.data = data or {"version": MANIFEST_VERSION, "settings": {}, "files": {}}
+
+    @classmethod
+    def load(cls, db_directory: str):
+        path = os.path.join(db_directory, MANIFEST_FILENAME)
+        if not os.path.exists(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                logger.warning(f"매니페스트 버전이 달라 새로 생성합니다: {path}")
+                return cls(path)
+            return cls(path, data)
+        except (OSError, ValueError) as e:
+            logger.error(f"매니페스트 로드 실패, 새로 생성합니다: {path}, 오류 내용: {e}")
+            return cls(path)
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @property
+    def files(self) -> dict:
+        return self.data["files"]
+
+    @property
+    def settings(self) -> dict:
+        return self.data["settings"]
+
+    def get_file(self, source: str):
+        return self.files.get(source)
+
+    def set_file(self, source: str, file_hash: str, chunks: list):
+        self.files[source] = {"hash": file_hash, "chunks": chunks}
+
+    def remove_file(self, source: str):
+        return self.files.pop(source, None)
+
+    def all_ids(self) -> list:
+        return [vector_id for entry in self.files.values() for vector_id in owned_ids(entry["chunks"])]
+
+    def save(self):
+        """임시 파일에 쓴 뒤 교체하여 중간에 실패해도 매니페스트가 깨지지 않도록 저장"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
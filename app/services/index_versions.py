@@ -0,0 +1,148 @@
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIRNAME = "versions"
+CURRENT_FILENAME = "CURRENT"
+BUILDING_MARKER = ".building"
+# 버전 디렉토리 안에 함께 만드는 보조 인덱스 (BM25 역색인)
+LEXICAL_INDEX_FILENAME = "lexical_index.json"
+# 이전에 버전 디렉토리 안에 만들던 메모리 매핑 인덱스 (새 버전으로 복사하지 않는다)
+MMAP_INDEX_DIRNAME = "mmap_index"
+
+
+class IndexVersions:
+    """벡터 DB를 버전별 디렉토리로 관리하고 CURRENT 포인터 파일로 원자적으로 전환하는 클래스.
+
+    root/
+      CURRENT            현재 사용 중인 버전 이름
+      versions/<버전>/    버전별 Chroma 디렉토리 (+ lexical_index.json)
+    local_root/<버전>/    버전별 메모리 매핑 인덱스 (네트워크 파일 시스템이 아닌 로컬 디스크)
+
+    CURRENT가 없으면 root 자체를 (이전 방식의) Chroma 디렉토리로 사용한다.
+    보조 인덱스도 같은 버전 이름으로 두므로 하나의 CURRENT 포인터로 Chroma와 함께 전환되고 함께 삭제된다.
+    """
+
+    def __init__(self, root: str, keep: int = 2, local_root: str = None):
+        self.root = root
+        self.keep = keep
+        self.local_root = local_root
+        self.versions_dir = os.path.join(root, VERSIONS_DIRNAME)
+        self.pointer_path = os.path.join(root, CURRENT_FILENAME)
+
+    def current_version(self):
+        try:
+            with open(self.pointer_path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def current_path(self) -> str:
+        version = self.current_version()
+        if version is None:
+            return self.root
+        return os.path.join(self.versions_dir, version)
+
+    def current_file(self, name: str, fallback: str = None) -> str:
+        """현재 버전 디렉토리 안의 파일 경로 (CURRENT가 없으면 fallback, 이전 방식의 고정 경로)"""
+        version = self.current_version()
+        if version is None:
+            return fallback
+        return os.path.join(self.versions_dir, version, name)
+
+    def local_path(self, version: str) -> str:
+        """버전의 로컬 디스크 인덱스 디렉토리"""
+        return os.path.join(self.local_root, version)
+
+    def current_local_path(self, fallback: str = None) -> str:
+        """현재 버전의 로컬 디스크 인덱스 디렉토리 (CURRENT나 local_root가 없으면 fallback, 이전 방식의 고정 경로)"""
+        version = self.current_version()
+        if version is None or self.local_root is None:
+            return fallback
+        return self.local_path(version)
+
+    def create_version(self, copy_current: bool = True):
+        """새 버전 디렉토리를 만들고 (버전, 경로) 반환. 현재 버전을 복사해 두면 증분 인덱싱이 가능하다"""
+        # 이름순 정렬이 생성 순서가 되도록 시각을 앞에 둔다
+        version = datetime.now().strftime("%Y%m%dT%H%M%S%f") + f"-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.versions_dir, version)
+        current = self.current_path()
+        if copy_current and os.path.isdir(current):
+            # 이전 방식(root)에서 복사할 때는 버전 디렉토리와 포인터 파일은 제외
+            # 보조 인덱스는 새 버전에서 다시 만들므로 복사하지 않는다
+            shutil.copytree(
+                current, path,
+                ignore=shutil.ignore_patterns(
+                    VERSIONS_DIRNAME, f"{CURRENT_FILENAME}*", BUILDING_MARKER, ".rebuild.lock",
+                    f"{LEXICAL_INDEX_FILENAME}*", MMAP_INDEX_DIRNAME
+                )
+            )
+        else:
+            os.makedirs(path)
+        open(os.path.join(path, BUILDING_MARKER), "w").close()
+        return version, path
+
+    def activate(self, version: str):
+        """CURRENT 포인터를 원자적으로 교체하여 읽는 쪽이 새 버전을 보도록 전환"""
+        path = os.path.join(self.versions_dir, version)
+        marker = os.path.join(path, BUILDING_MARKER)
+        if os.path.exists(marker):
+            os.remove(marker)
+        tmp_path = f"{self.pointer_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+        logger.info(f"벡터 DB 버전 전환: {version}")
+
+    def discard(self, version: str):
+        shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
+        if self.local_root is not None:
+            shutil.rmtree(self.local_path(version), ignore_errors=True)
+
+    def gc(self, stale_build_seconds: float = 86400) -> list:
+        """현재 버전과 최근 버전(keep개)만 남기고 삭제.
+
+        전환 직후에도 이전 버전을 읽고 있는 워커가 있을 수 있으므로 바로 이전 버전은 남겨 둔다.
+        """
+        if not os.path.isdir(self.versions_dir):
+            return []
+        current = self.current_version()
+        versions = sorted(os.listdir(self.versions_dir), reverse=True)
+        removed = []
+        kept = 0
+        for version in versions:
+            path = os.path.join(self.versions_dir, version)
+            if version == current:
+                continue
+            marker = os.path.join(path, BUILDING_MARKER)
+            if os.path.exists(marker):
+                # 빌드 중인 버전은 오래된 실패 흔적일 때만 삭제
+                if time.time() - os.path.getmtime(marker) < stale_build_seconds:
+                    continue
+            elif kept < self.keep - 1:
+                kept += 1
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(version)
+        if removed:
+            logger.info(f"이전 벡터 DB 버전 삭제: {removed}")
+        self._gc_local()
+        return removed
+
+    def _gc_local(self):
+        """남아 있는 버전이 없는 로컬 디스크 인덱스 디렉토리 삭제 (이전 방식으로 바로 쓴 파일과 만드는 중인 .tmp는 유지)"""
+        if self.local_root is None or not os.path.isdir(self.local_root):
+            return
+        versions = set(os.listdir(self.versions_dir))
+        for name in os.listdir(self.local_root):
+            path = os.path.join(self.local_root, name)
+            if name in versions or ".tmp" in name or not os.path.isdir(path):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,449 @@
+import glob
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.index_manifest import IndexManifest, chunk_id, owned_ids, sha256_file, sha256_text
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.pdf_extraction import extract_pdf_to_file, iter_page_texts, iter_text_pages, ocr_page_text
+
+logger = logging.getLogger(__name__)
+
+# 청크 메타데이터(source, page, start, end) 형식 버전 (바뀌면 기존 벡터를 다시 만든다)
+CHUNK_METADATA_VERSION = 1
+# 대표 청크가 삭제된 문서를 다시 처리하는 최대 횟수
+MAX_PASSES = 3
+
+
+class IngestionSource:
+    """인덱싱 대상 문서 (PDF 또는 txt)."""
+
+    def __init__(self, name: str, path: str, kind: str):
+        self.name = name
+        self.path = path
+        self.kind = kind
+        # 마지막으로 읽을 때 OCR에 실패한 페이지 번호 (있으면 다음 인덱싱에서 다시 처리)
+        self.ocr_failed_pages = []
+
+    def iter_pages(self, ocr=None):
+        """페이지 단위 텍스트를 순서대로 yield (ocr이 있으면 텍스트 없는 PDF 페이지는 OCR 결과 사용)"""
+        if self.kind == "pdf":
+            self.ocr_failed_pages = []
+            yield from iter_page_texts(self.path, ocr, self.ocr_failed_pages)
+            return
+        # txt 파일은 페이지 구분자(\f) 단위로 나눠 읽는다
+        yield from iter_text_pages(self.path)
+
+
+class ParallelPageExtractor:
+    """PDF 텍스트 추출을 프로세스 풀에서 앞서 진행하는 클래스.
+
+    처리할 PDF를 최대 lookahead개까지 자식 프로세스에서 임시 txt 파일로 미리 추출해 두고,
+    파이프라인은 차례가 된 문서의 파일을 페이지 단위로 읽는다. 문서를 메모리에 올리지 않으며
+    임시 파일은 다 읽으면 바로 지운다. ocr이 있으면 텍스트 없는 페이지는 OCR 결과로 바꾼다.
+    """
+
+    def __init__(self, workers: int, ocr=None, lookahead: int = None):
+        self.workers = workers
+        self.ocr = ocr
+        self.lookahead = lookahead or workers * 2
+        self._executor = None
+        self._spill_dir = None
+        self._waiting = deque()
+        self._futures = {}
+        self._submitted = 0
+
+    def schedule(self, sources: list):
+        self._waiting.extend(sources)
+        self._fill()
+
+    def _fill(self):
+        while self._waiting and len(self._futures) < self.lookahead:
+            if self._executor is None:
+                # 요청 스레드가 여러 개인 서버 프로세스에서 fork하지 않도록 spawn 사용
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._spill_dir = tempfile.mkdtemp(prefix="ingest-pages-")
+            source = self._waiting.popleft()
+            txt_path = os.path.join(self._spill_dir, f"{self._submitted}.txt")
+            self._submitted += 1
+            ocr_min_chars = self.ocr.min_chars if self.ocr is not None else 0
+            self._futures[source.name] = self._executor.submit(extract_pdf_to_file, source.path, txt_path, ocr_min_chars)
+
+    def iter_pages(self, source: IngestionSource):
+        """미리 추출한 페이지 텍스트를 yield (예약되지 않은 문서는 현재 스레드에서 읽는다)"""
+        future = self._futures.pop(source.name, None)
+        if future is None:
+            yield from source.iter_pages(self.ocr)
+            return
+        self._fill()
+        result = future.result()
+        try:
+            if "error" in result:
+                raise RuntimeError(f"PDF 텍스트 추출 실패: {result['error']}")
+            pending = self._submit_ocr(result)
+            source.ocr_failed_pages = []
+            for page_no, text in enumerate(iter_text_pages(result["txt_path"])):
+                if page_no in pending:
+                    text = ocr_page_text(self.ocr, source.path, page_no, pending.pop(page_no), text,
+                                         source.ocr_failed_pages)
+                yield text
+        finally:
+            if os.path.exists(result["txt_path"]):
+                os.remove(result["txt_path"])
+
+    def _submit_ocr(self, result: dict) -> dict:
+        if self.ocr is None or not result["ocr_pages"]:
+            return {}
+        import fitz  # PyMuPDF
+
+        with fitz.open(result["pdf_path"]) as doc:
+            return self.ocr.submit(result["pdf_path"], doc, result["ocr_pages"])
+
+    def close(self):
+        """아직 시작하지 않은 추출은 취소하고 임시 파일 삭제"""
+        self._waiting.clear()
+        self._futures.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+
+def discover_sources(pdf_dir: str = None, txt_dir: str = None) -> list:
+    """PDF를 우선으로 하고, 대응하는 PDF가 없는 txt 파일만 추가로 수집"""
+    sources = {}
+    if pdf_dir:
+        for path in sorted(glob.glob(os.path.join(pdf_dir, "*.pdf"))):
+            name = os.path.basename(path)
+            sources[name] = IngestionSource(name, path, "pdf")
+    if txt_dir:
+        for path in sorted(glob.glob(os.path.join(txt_dir, "*.txt"))):
+            name = os.path.basename(path)
+            if name[:-len(".txt")] + ".pdf" in sources:
+                continue
+            sources[name] = IngestionSource(name, path, "txt")
+    return list(sources.values())
+
+
+class IngestionPipeline:
+    """PDF 페이지 -> 청크 -> 임베딩 -> 벡터 DB 저장을 스트리밍으로 처리하는 파이프라인.
+
+    생산자 스레드가 페이지를 읽고 청크로 나눠 배치 단위로 크기 제한 큐에 넣고,
+    소비자(호출 스레드)가 배치를 임베딩하여 저장한다. 큐가 가득 차면 생산자가 기다리므로
+    메모리 사용량은 코퍼스 크기가 아니라 배치 크기와 큐 길이에 비례한다.
+    매니페스트(index_manifest.json)를 사용하여 바뀌지 않은 문서와 청크는 건너뛴다.
+    청크에는 source/page/start/end 메타데이터를 붙이고, dedupe_threshold가 있으면
+    기존 청크와 근접 중복인 청크는 임베딩하지 않고 대표 청크의 ID만 매니페스트에 기록한다.
+    extract_workers가 2 이상이면 다시 처리할 PDF의 텍스트 추출은 프로세스 풀에서 앞서 진행한다.
+    """
+
+    def __init__(self, embedding, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 batch_size: int = 256, max_pending_batches: int = 2, ocr=None, dedupe_threshold: float = None,
+                 extract_workers: int = 0):
+        self.embedding = embedding
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.max_pending_batches = max_pending_batches
+        self.ocr = ocr
+        # None이면 근접 중복 제거를 하지 않는다
+        self.dedupe_threshold = dedupe_threshold
+        self.extract_workers = extract_workers
+
+    def text_splitter(self):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        return RecursiveCharacterTextSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+
+    def embedding_model_name(self) -> str:
+        return getattr(self.embedding, "model", None) or type(self.embedding).__name__
+
+    def open_store(self, db_directory: str):
+        from langchain_community.vectorstores import Chroma
+        return Chroma(persist_directory=db_directory, embedding_function=self.embedding)
+
+    def run(self, db_directory: str, pdf_dir: str = None, txt_dir: str = None, progress=None) -> dict:
+        """progress가 있으면 배치/문서 처리 때마다 현재 통계(dict)를 넘겨 호출한다"""
+        started = time.perf_counter()
+        os.makedirs(db_directory, exist_ok=True)
+        manifest = IndexManifest.load(db_directory)
+        vectordb = self.open_store(db_directory)
+
+        settings = {
+            "embedding_model": self.embedding_model_name(),
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "chunk_metadata": CHUNK_METADATA_VERSION
+        }
+        if not manifest.exists or any(manifest.settings.get(key) != value for key, value in settings.items()):
+            # 매니페스트가 없거나 임베딩 모델/청크 크기/메타데이터 형식이 바뀌었으면 기존 벡터를 모두 지우고 새로 만든다
+            stale_ids = vectordb.get()["ids"]
+            if stale_ids:
+                logger.info(f"매니페스트와 맞지 않는 기존 벡터 {len(stale_ids)}건 삭제")
+                vectordb.delete(ids=stale_ids)
+            manifest = IndexManifest(manifest.path)
+        manifest.settings.update(settings)
+        dedupe = None
+        if self.dedupe_threshold is not None:
+            dedupe = NearDuplicateIndex.load(db_directory, valid_ids=manifest.all_ids(),
+                                             threshold=self.dedupe_threshold)
+
+        sources = discover_sources(pdf_dir, txt_dir)
+        stats = {
+            "added": 0, "skipped": 0, "removed": 0, "duplicates": 0, "sources": len(sources), "failed": 0,
+            "ocr_retry": 0,
+        }
+        removed_ids = set()
+
+        pending = sources
+        for attempt in range(MAX_PASSES):
+            self._run_pass(vectordb, manifest, pending, dedupe, stats, removed_ids, progress)
+            if attempt == 0:
+                # 삭제된 문서의 벡터 제거
+                current = {source.name for source in sources}
+                for name in list(manifest.files):
+                    if name not in current:
+                        entry = manifest.remove_file(name)
+                        stale_ids = owned_ids(entry["chunks"])
+                        if stale_ids:
+                            vectordb.delete(ids=stale_ids)
+                            stats["removed"] += len(stale_ids)
+                            removed_ids.update(stale_ids)
+                            if dedupe is not None:
+                                dedupe.remove(stale_ids)
+                        logger.info(f"삭제된 문서의 벡터 제거: {name} ({len(stale_ids)}건)")
+            # 대표 청크가 삭제된 중복 청크를 가진 문서는 다시 처리하여 새 대표 청크를 정한다
+            pending = self._orphaned_sources(manifest, sources, removed_ids)
+            if not pending:
+                break
+            logger.info(f"대표 청크가 삭제된 문서 {len(pending)}건 다시 처리")
+
+        vectordb.persist()
+        manifest.save()
+        if dedupe is not None:
+            dedupe.save(db_directory)
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = elapsed
+        stats["chunks_per_sec"] = stats["added"] / elapsed if elapsed else 0.0
+        logger.info(
+            f"인덱싱 파이프라인 완료 (추가 {stats['added']}, 유지 {stats['skipped']}, 중복 {stats['duplicates']}, "
+            f"삭제 {stats['removed']}, {elapsed:.1f}초, {stats['chunks_per_sec']:.1f}청크/초)"
+        )
+        return {"success": stats["failed"] == 0, **stats}
+
+    def _run_pass(self, vectordb, manifest, sources, dedupe, stats, removed_ids, progress):
+        work = queue.Queue(maxsize=self.max_pending_batches)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(sources, manifest, dedupe, work, stop, stats),
+            name="ingestion-producer", daemon=True
+        )
+        producer.start()
+        try:
+            self._consume(vectordb, manifest, work, stats, removed_ids, progress)
+        finally:
+            stop.set()
+            producer.join()
+
+    @staticmethod
+    def _orphaned_sources(manifest, sources, removed_ids) -> list:
+        orphaned = []
+        if not removed_ids:
+            return orphaned
+        for source in sources:
+            entry = manifest.get_file(source.name)
+            if entry and any(len(chunk) == 3 and chunk[2] in removed_ids for chunk in entry["chunks"]):
+                # 해시를 비워 두면 다음 처리에서 내용이 바뀐 문서로 취급된다
+                entry["hash"], entry["mtime"] = "", None
+                orphaned.append(source)
+        return orphaned
+
+    def _put(self, work: queue.Queue, stop: threading.Event, item) -> bool:
+        """큐에 여유가 생길 때까지 기다렸다가 넣는다 (소비자가 중단되면 False)"""
+        while not stop.is_set():
+            try:
+                work.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _plan(self, sources, manifest, stats) -> list:
+        """바뀌지 않은 문서는 건너뛰고 ("touch", source, entry) 또는 ("index", source, entry, 해시) 목록 반환"""
+        plan = []
+        for source in sources:
+            entry = manifest.get_file(source.name)
+            stat = os.stat(source.path)
+            if entry and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+                stats["skipped"] += len(entry["chunks"])
+                continue
+            file_hash = sha256_file(source.path)
+            if entry and entry["hash"] == file_hash:
+                stats["skipped"] += len(entry["chunks"])
+                plan.append(("touch", source, entry))
+                continue
+            plan.append(("index", source, entry, file_hash))
+        return plan
+
+    def _produce(self, sources, manifest, dedupe, work, stop, stats):
+        splitter = self.text_splitter()
+        extractor = None
+        try:
+            plan = self._plan(sources, manifest, stats)
+            pdfs = [item[1] for item in plan if item[0] == "index" and item[1].kind == "pdf"]
+            if self.extract_workers > 1 and len(pdfs) > 1:
+                extractor = ParallelPageExtractor(min(self.extract_workers, len(pdfs)), self.ocr)
+                extractor.schedule(pdfs)
+            for item in plan:
+                if item[0] == "touch":
+                    if not self._put(work, stop, item):
+                        return
+                    continue
+                _, source, entry, file_hash = item
+                pages = extractor.iter_pages(source) if extractor is not None else source.iter_pages(self.ocr)
+                if not self._produce_source(source, file_hash, entry, pages, splitter, dedupe, work, stop, stats):
+                    return
+        except Exception as e:
+            self._put(work, stop, ("error", e))
+            return
+        finally:
+            if extractor is not None:
+                extractor.close()
+        self._put(work, stop, ("end",))
+
+    def _produce_source(self, source, file_hash, entry, pages, splitter, dedupe, work, stop, stats) -> bool:
+        old_chunks = entry["chunks"] if entry else []
+        old_ids = set(owned_ids(old_chunks))
+        old_duplicates = {chunk[1]: chunk[2] for chunk in old_chunks if len(chunk) == 3}
+        # 이 문서의 기존 청크끼리 중복으로 묶이지 않도록 서명을 빼 두었다가 유지되는 청크만 다시 넣는다
+        stashed = dedupe.remove(old_ids) if dedupe is not None else {}
+        added, flushed = [], []
+        new_chunks, batch, occurrences = [], [], {}
+        try:
+            for page_no, page_text in enumerate(pages, start=1):
+                cursor = 0
+                for chunk in splitter.split_text(page_text):
+                    chunk = chunk.strip()
+                    if not chunk:
+                        continue
+                    start = page_text.find(chunk, cursor)
+                    if start < 0:
+                        start = page_text.find(chunk)
+                    cursor = start + 1
+                    chunk_hash = sha256_text(chunk)
+                    occurrence = occurrences.get(chunk_hash, 0)
+                    occurrences[chunk_hash] = occurrence + 1
+                    vector_id = chunk_id(source.name, chunk_hash, occurrence)
+
+                    if vector_id in old_ids:
+                        new_chunks.append([chunk_hash, vector_id])
+                        if dedupe is not None:
+                            dedupe.add(vector_id, stashed.get(vector_id) or dedupe.signature(chunk))
+                            added.append(vector_id)
+                        stats["skipped"] += 1
+                        continue
+                    if dedupe is not None:
+                        canonical = old_duplicates.get(vector_id)
+                        signature = None
+                        if canonical not in dedupe:
+                            signature = dedupe.signature(chunk)
+                            canonical = dedupe.find(signature)
+                        if canonical is not None:
+                            new_chunks.append([chunk_hash, vector_id, canonical])
+                            stats["duplicates"] += 1
+                            continue
+                        dedupe.add(vector_id, signature)
+                        added.append(vector_id)
+
+                    new_chunks.append([chunk_hash, vector_id])
+                    metadata = {"source": source.name, "page": page_no, "start": start, "end": start + len(chunk)}
+                    batch.append((vector_id, chunk, metadata))
+                    if len(batch) >= self.batch_size:
+                        if not self._put(work, stop, ("batch", batch)):
+                            return False
+                        flushed.extend(vector_id for vector_id, _, _ in batch)
+                        batch = []
+        except Exception as e:
+            # 한 문서의 추출 실패가 전체 인덱싱을 멈추지 않도록 기록만 하고 넘어간다
+            logger.error(f"문서 처리 실패: {source.path}, 오류 내용: {e}")
+            stats["failed"] += 1
+            # 매니페스트에 기록되지 않으므로 이미 저장된 배치의 벡터는 지운다
+            if flushed and not self._put(work, stop, ("discard", flushed)):
+                return False
+            if dedupe is not None:
+                # 매니페스트는 이전 상태로 남으므로 중복 검출 인덱스도 되돌린다
+                dedupe.remove(added)
+                for vector_id, signature in stashed.items():
+                    dedupe.add(vector_id, signature)
+            return True
+
+        if batch and not self._put(work, stop, ("batch", batch)):
+            return False
+        stale_ids = list(old_ids - {chunk[1] for chunk in new_chunks if len(chunk) == 2})
+        if source.ocr_failed_pages:
+            # 최신으로 기록하지 않아 다음 인덱싱에서 OCR을 다시 시도한다 (성공한 페이지는 OCR 캐시 사용)
+            logger.warning(
+                f"OCR 실패 페이지가 있어 다음 인덱싱에서 다시 처리합니다: {source.name} "
+                f"({', '.join(str(page_no + 1) for page_no in source.ocr_failed_pages)}쪽)"
+            )
+            stats["ocr_retry"] += 1
+            file_hash = ""
+        return self._put(work, stop, ("done", source, file_hash, new_chunks, stale_ids))
+
+    def _consume(self, vectordb, manifest, work, stats, removed_ids, progress=None):
+        while True:
+            item = work.get()
+            kind = item[0]
+            if kind == "end":
+                return
+            if kind == "error":
+                raise item[1]
+            if kind == "batch":
+                ids = [vector_id for vector_id, _, _ in item[1]]
+                texts = [text for _, text, _ in item[1]]
+                metadatas = [metadata for _, _, metadata in item[1]]
+                vectordb.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+                stats["added"] += len(texts)
+            elif kind == "discard":
+                # 처리 도중 실패한 문서가 먼저 저장한 벡터
+                vectordb.delete(ids=item[1])
+                stats["added"] -= len(item[1])
+            elif kind == "touch":
+                # 내용은 같고 mtime만 바뀐 문서는 다음부터 해시 계산을 생략하도록 기록만 갱신
+                _, source, entry = item
+                self._record(manifest, source, entry["hash"], entry["chunks"])
+            elif kind == "done":
+                _, source, file_hash, new_chunks, stale_ids = item
+                if stale_ids:
+                    vectordb.delete(ids=stale_ids)
+                    stats["removed"] += len(stale_ids)
+                    removed_ids.update(stale_ids)
+                # 문서의 모든 청크가 저장된 뒤에만 매니페스트에 기록
+                self._record(manifest, source, file_hash, new_chunks)
+                logger.info(f"인덱싱 완료: {source.name} (청크 {len(new_chunks)}, 삭제 {len(stale_ids)})")
+            if progress is not None:
+                progress(dict(stats))
+
+    @staticmethod
+    def _record(manifest, source, file_hash, chunks):
+        """문서의 청크 기록 (file_hash가 비어 있으면 다음 인덱싱에서 내용이 바뀐 문서로 취급된다)"""
+        manifest.set_file(source.name, file_hash, chunks)
+        entry = manifest.get_file(source.name)
+        if file_hash:
+            stat = os.stat(source.path)
+            entry["mtime"] = stat.st_mtime
+            entry["size"] = stat.st_size
+        else:
+            entry["mtime"] = None
+        manifest.save()
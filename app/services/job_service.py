@@ -0,0 +1,304 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from utils.sqlite_utils import ThreadLocalSQLite
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """작업 큐가 가득 차서 새 작업을 받을 수 없을 때 발생하는 예외."""
+
+
+class JobStore:
+    """작업 상태를 SQLite에 저장하여 모든 gunicorn 워커에서 조회할 수 있게 하는 클래스."""
+
+    def __init__(self, db_path: str, ttl_seconds: int = 86400):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._db = ThreadLocalSQLite(db_path)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            # 진행 상황/생존 시각 컬럼은 나중에 추가되었으므로 기존 DB에는 컬럼만 추가
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "progress" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+            if "heartbeat_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    def _connect(self):
+        return self._db.connect()
+
+    def create(self, job_id: str, kind: str, payload: dict = None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, "queued", json.dumps(payload or {}, ensure_ascii=False), now, now)
+            )
+
+    def update(self, job_id: str, status: str, result=None, error: str = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id
+                )
+            )
+
+    def set_progress(self, job_id: str, progress: dict):
+        """오래 걸리는 작업의 진행 상황 기록"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress, ensure_ascii=False), time.time(), job_id)
+            )
+
+    def heartbeat(self, job_ids: list):
+        """대기 중이거나 실행 중인 작업의 생존 시각 갱신"""
+        if not job_ids:
+            return
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                [(now, job_id) for job_id in job_ids]
+            )
+
+    def reclaim_expired(self, lease_seconds: float) -> list:
+        """lease_seconds 동안 생존 시각이 갱신되지 않은 (처리하던 워커가 죽은) 대기/실행 작업을 실패로 처리"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            job_ids = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') AND COALESCE(heartbeat_at, updated_at) < ?",
+                (now - lease_seconds,)
+            )]
+            conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                [("작업을 처리하던 워커가 종료되었습니다.", now, job_id) for job_id in job_ids]
+            )
+        return job_ids
+
+    def delete(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    _COLUMNS = "id, kind, status, payload, result, error, created_at, updated_at, progress"
+
+    def get(self, job_id: str):
+        row = self._connect().execute(
+            f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def latest(self, kind: str):
+        """해당 종류의 가장 최근 작업"""
+        row = self._connect().execute(
+            f"SELECT {self._COLUMNS} FROM jobs WHERE kind = ? ORDER BY created_at DESC LIMIT 1",
+            (kind,)
+        ).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        return {
+            "jobId": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "payload": json.loads(row[3]) if row[3] else None,
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "createdAt": row[6],
+            "updatedAt": row[7],
+            "progress": json.loads(row[8]) if row[8] else None
+        }
+
+    def purge_expired(self):
+        """TTL이 지난 완료/실패 작업 삭제"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND status IN ('succeeded', 'failed')",
+                (cutoff,)
+            )
+
+
+class JobHeartbeat:
+    """이 프로세스가 맡은 작업의 생존 시각을 주기적으로 기록하는 백그라운드 스레드.
+
+    대기열에서 기다리거나 실행 중인 작업마다 interval초마다 생존 시각을 갱신하고 작업별 콜백
+    (중복 요청 선점 갱신 등)을 호출한다. lease_seconds 동안 갱신되지 않은 작업은 처리하던 워커가
+    죽은 것으로 보고 어느 프로세스에서든 실패로 회수한다.
+    """
+
+    def __init__(self, store: JobStore, interval: float = 60.0, lease_seconds: float = None):
+        self.store = store
+        self.interval = interval
+        self.lease_seconds = lease_seconds or interval * 3
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        """갱신 스레드를 지연 시작 (fork된 프로세스에서는 다시 시작)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # fork 이전 프로세스의 작업은 자식 프로세스에서 갱신하지 않는다
+            self._jobs = {}
+            threading.Thread(target=self._run, name="job-heartbeat", daemon=True).start()
+            self._pid = os.getpid()
+
+    def track(self, job_id: str, on_beat=None):
+        """작업이 끝날 때까지 생존 시각을 갱신 (on_beat가 있으면 갱신할 때마다 호출)"""
+        self._ensure_started()
+        with self._lock:
+            self._jobs[job_id] = on_beat
+
+    def untrack(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def beat(self):
+        with self._lock:
+            jobs = dict(self._jobs)
+        try:
+            self.store.heartbeat(list(jobs))
+            reclaimed = self.store.reclaim_expired(self.lease_seconds)
+            if reclaimed:
+                logger.warning(f"생존 시각이 갱신되지 않은 작업 {len(reclaimed)}건을 실패로 처리: {reclaimed}")
+        except Exception as e:
+            logger.error(f"작업 생존 시각 갱신 실패: {e}")
+        for job_id, on_beat in jobs.items():
+            if on_beat is None:
+                continue
+            try:
+                on_beat()
+            except Exception as e:
+                logger.warning(f"작업 갱신 콜백 실패: {job_id}, 오류 내용: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.beat()
+
+
+class JobQueue:
+    """크기가 제한된 큐와 고정 개수의 워커 스레드로 작업을 실행하는 클래스.
+
+    대기 중이거나 실행 중인 작업은 JobHeartbeat로 생존 시각을 갱신하므로 워커가 죽어 남은 작업은 회수된다.
+    """
+
+    def __init__(self, store: JobStore, num_workers: int = 8, max_queue_size: int = 100,
+                 heartbeat_interval: float = 60.0, lease_seconds: float = None):
+        self.store = store
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.heartbeat = JobHeartbeat(store, interval=heartbeat_interval, lease_seconds=lease_seconds)
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self._last_purge = 0.0
+
+    def _ensure_started(self):
+        """워커 스레드를 지연 시작 (fork된 프로세스에서는 다시 시작)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # fork 이전 프로세스의 큐/스레드는 자식 프로세스로 이어지지 않는다
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._threads = []
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._pid = os.getpid()
+            logger.info(f"작업 워커 {self.num_workers}개 시작 (pid={self._pid})")
+
+    def submit(self, kind: str, func, *args, payload: dict = None, job_id: str = None,
+               on_heartbeat=None, **kwargs) -> str:
+        """작업을 큐에 등록하고 작업 ID를 반환 (job_id를 주면 그 ID를 사용)
+
+        on_heartbeat가 있으면 작업이 대기하거나 실행되는 동안 주기적으로 호출한다.
+        """
+        self._ensure_started()
+        job_id = job_id or uuid.uuid4().hex
+        self.store.create(job_id, kind, payload)
+        self.heartbeat.track(job_id, on_heartbeat)
+        try:
+            # 요청 ID 등 등록한 요청의 컨텍스트를 워커 스레드에서도 사용
+            self._queue.put_nowait((job_id, contextvars.copy_context(), func, args, kwargs))
+        except queue.Full:
+            self.heartbeat.untrack(job_id)
+            self.store.delete(job_id)
+            raise QueueFullError(f"작업 큐가 가득 찼습니다. (최대 {self.max_queue_size}개)")
+        return job_id
+
+    def depth(self) -> int:
+        """대기 중인 작업 수"""
+        return self._queue.qsize()
+
+    def _worker(self):
+        while True:
+            job_id, context, func, args, kwargs = self._queue.get()
+            try:
+                context.run(self._run, job_id, func, args, kwargs)
+            finally:
+                self.heartbeat.untrack(job_id)
+                self._queue.task_done()
+                self._maybe_purge()
+
+    def _run(self, job_id: str, func, args, kwargs):
+        try:
+            self.store.update(job_id, "running")
+            result = func(*args, **kwargs)
+            self.store.update(job_id, "succeeded", result=result)
+        except Exception as e:
+            logger.error(f"작업 실패: {job_id}, 오류 내용: {e}")
+            try:
+                self.store.update(job_id, "failed", error=str(e))
+            except Exception as store_error:
+                logger.error(f"작업 상태 저장 실패: {job_id}, 오류 내용: {store_error}")
+
+    def _maybe_purge(self, interval: float = 60.0):
+        now = time.time()
+        if now - self._last_purge < interval:
+            return
+        self._last_purge = now
+        try:
+            self.store.purge_expired()
+        except Exception as e:
+            logger.error(f"만료 작업 정리 실패: {e}")
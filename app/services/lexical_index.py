@@ -0,0 +1,181 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """한국어 검색용 토큰화.
+
+    형태소 분석기 없이도 '부가세', '근로계약서' 같은 복합어와 조사가 붙은 형태를 맞출 수 있도록
+    한글은 글자 bigram으로, 영문/숫자는 단어 단위로 나눈다.
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(text):
+        if "가" <= word[0] <= "힣":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+class BM25Index:
+    """문서 본문에 대한 BM25 역색인."""
+
+    def __init__(self, ids: list, documents: list, doc_lengths: list, postings: dict, k1: float = 1.5, b: float = 0.75):
+        self.ids = ids
+        self.documents = documents
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        count = len(documents)
+        self.idf = {
+            term: math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in postings.items()
+        }
+
+    @classmethod
+    def build(cls, ids: list, documents: list):
+        postings = defaultdict(list)
+        doc_lengths = []
+        for doc_index, document in enumerate(documents):
+            counts = Counter(tokenize(document))
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((doc_index, tf))
+        return cls(list(ids), list(documents), doc_lengths, dict(postings))
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query: str, k: int = 10) -> list:
+        """BM25 점수 상위 k개 (문서 번호, 점수, 매칭된 질의 토큰 비율) 반환"""
+        terms = set(tokenize(query))
+        if not terms or not self.documents:
+            return []
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf[term]
+            for doc_index, tf in posting:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_length or 1)
+                scores[doc_index] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+                matched[doc_index] += 1
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(doc_index, score, matched[doc_index] / len(terms)) for doc_index, score in top]
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self.ids,
+                "documents": self.documents,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+                "k1": self.k1,
+                "b": self.b
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        postings = {term: [tuple(item) for item in posting] for term, posting in data["postings"].items()}
+        return cls(data["ids"], data["documents"], data["doc_lengths"], postings, data["k1"], data["b"])
+
+    @classmethod
+    def build_from_collection(cls, collection, page_size: int = 1000):
+        """Chroma 컬렉션의 문서로 역색인 생성"""
+        ids, documents = [], []
+        count = collection.count()
+        for start in range(0, count, page_size):
+            page = collection.get(include=["documents"], limit=page_size, offset=start)
+            ids.extend(page["ids"])
+            documents.extend(document or "" for document in page["documents"])
+        return cls.build(ids, documents)
+
+
+class LexicalIndexHandle:
+    """역색인 파일을 지연 로드하고, 파일이 바뀌면 다시 읽는 핸들.
+
+    versions가 있으면 CURRENT 포인터가 가리키는 버전 디렉토리의 역색인을 읽으므로
+    벡터 DB 버전이 바뀌면 역색인도 같은 버전으로 바뀐다 (CURRENT가 없으면 path 사용).
+    """
+
+    def __init__(self, path: str, refresh_interval: float = 5.0, versions=None):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.versions = versions
+        self._index = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current_path(self) -> str:
+        if self.versions is None:
+            return self.path
+        from app.services.index_versions import LEXICAL_INDEX_FILENAME
+        return self.versions.current_file(LEXICAL_INDEX_FILENAME, fallback=self.path)
+
+    def get(self):
+        """역색인 반환. 파일이 없으면 None"""
+        now = time.time()
+        if self._index is not None and now - self._checked_at < self.refresh_interval:
+            return self._index
+        with self._lock:
+            self._checked_at = now
+            path = self.current_path()
+            try:
+                signature = (path, os.stat(path).st_mtime_ns)
+            except OSError:
+                signature = (path, None)
+            if signature == self._signature:
+                return self._index
+            # 이전 버전의 역색인은 현재 벡터 DB에 없는 청크를 가리키므로 읽지 못하면 버리고 벡터 검색만 사용
+            self._index = None
+            self._signature = signature
+            if signature[1] is None:
+                logger.warning(f"역색인이 없어 벡터 검색만 사용합니다: {path}")
+                return None
+            try:
+                started = time.perf_counter()
+                self._index = BM25Index.load(path)
+                logger.info(
+                    f"역색인 로드: {path} ({len(self._index)}건, {(time.perf_counter() - started) * 1000:.1f}ms)"
+                )
+            except (OSError, ValueError) as e:
+                logger.warning(f"역색인 로드 실패, 벡터 검색만 사용합니다: {path}, 오류 내용: {e}")
+        return self._index
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """여러 순위 목록을 RRF 점수로 합쳐 키 목록을 반환"""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] += 1.0 / (k + rank + 1)
+    return [key for key, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
@@ -0,0 +1,429 @@
+import fcntl
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, math.inf)
+FILE_PREFIX = "metrics-"
+# 종료된 워커의 카운터/히스토그램을 합쳐 두는 파일
+AGGREGATE_FILENAME = "aggregate.json"
+COMPACT_LOCK_FILENAME = ".compact.lock"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict) -> str:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 레이블이 맞지 않습니다: {sorted(labels)}")
+        return json.dumps([str(labels[name]) for name in self.labelnames], ensure_ascii=False)
+
+    def labels_of(self, key: str) -> dict:
+        return dict(zip(self.labelnames, json.loads(key)))
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {key: (list(value) if isinstance(value, list) else value) for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        self.registry.start()
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """이 프로세스의 누적값을 직접 지정 (다른 객체가 세고 있는 통계를 옮길 때 사용)"""
+        self.registry.start()
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Gauge(_Metric):
+    """현재 값. 프로세스별 값을 mode("sum" 또는 "max")로 합치고, 종료된 프로세스의 값은 제외한다."""
+
+    kind = "gauge"
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=(), mode: str = "sum"):
+        self.mode = mode
+        super().__init__(registry, name, documentation, labelnames)
+
+    def set(self, value: float, **labels):
+        self.registry.start()
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets) if buckets[-1] == math.inf else tuple(buckets) + (math.inf,)
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value: float, **labels):
+        self.registry.start()
+        key = self._key(labels)
+        with self._lock:
+            # [버킷별 개수..., 합계, 개수]
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class MetricsRegistry:
+    """gunicorn 워커별 지표를 파일로 내보내고, 조회 시 모든 워커의 파일을 합쳐 Prometheus 형식으로 만든다.
+
+    각 프로세스는 flush_interval마다 directory/metrics-<pid>-<인스턴스>.json을 원자적으로 갱신한다.
+    (pid가 재사용되어도 종료된 프로세스의 파일을 덮어쓰지 않도록 프로세스마다 인스턴스 ID를 붙인다.)
+    종료된 워커의 파일은 compact()가 카운터/히스토그램을 aggregate.json에 합친 뒤 삭제하므로
+    워커가 재시작되어도 파일이 쌓이지 않고 카운터가 줄어들지 않는다. 게이지는 살아 있는 워커 값만 쓴다.
+    directory가 없으면 현재 프로세스의 값만 내보낸다.
+    """
+
+    def __init__(self, directory: str = None, flush_interval: float = 5.0, stale_after: float = None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        # 이 시간 동안 갱신되지 않은 파일은 pid가 살아 있어도 (재사용된 pid) 종료된 워커로 본다
+        self.stale_after = stale_after or max(60.0, flush_interval * 12)
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._instance = None
+
+    def register(self, metric: _Metric):
+        self._metrics[metric.name] = metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return Counter(self, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=(), mode: str = "sum") -> Gauge:
+        return Gauge(self, name, documentation, labelnames, mode)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return Histogram(self, name, documentation, labelnames, buckets)
+
+    def add_collector(self, func):
+        """내보내기 직전에 호출되어 게이지 등을 갱신하는 함수 등록"""
+        self._collectors.append(func)
+
+    def start(self):
+        """주기적으로 파일에 기록하는 스레드를 지연 시작 (fork된 프로세스에서는 다시 시작)"""
+        if self.directory is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # 부모 프로세스에서 센 값은 부모 파일에 남아 있으므로 자식은 0부터 센다
+            if self._pid is not None:
+                for metric in self._metrics.values():
+                    with metric._lock:
+                        metric._values.clear()
+            self._instance = uuid.uuid4().hex[:8]
+            thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"지표 기록 실패: {e}")
+
+    def collect(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"지표 수집 실패: {e}")
+
+    def snapshot(self) -> dict:
+        self.collect()
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def flush(self):
+        if self.directory is None or self._pid != os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{FILE_PREFIX}{self._pid}-{self._instance}.json")
+        data = {"pid": self._pid, "instance": self._instance, "updated_at": time.time(), "metrics": self.snapshot()}
+        self._write(path, data)
+
+    @staticmethod
+    def _write(path: str, data: dict):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read(path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _worker_files(self) -> list:
+        """다른 프로세스가 기록한 (파일 이름, 내용) 목록"""
+        results = []
+        for filename in os.listdir(self.directory):
+            if not filename.startswith(FILE_PREFIX) or not filename.endswith(".json"):
+                continue
+            data = self._read(os.path.join(self.directory, filename))
+            if data is None:
+                continue
+            if data["pid"] == os.getpid() and data.get("instance") == self._instance:
+                continue
+            results.append((filename, data))
+        return results
+
+    def _is_live(self, data: dict, now: float) -> bool:
+        return _pid_alive(data["pid"]) and now - data.get("updated_at", 0) <= self.stale_after
+
+    def compact(self) -> list:
+        """종료된 워커의 파일을 aggregate.json에 합치고 삭제. 합친 파일 이름 목록 반환
+
+        카운터와 히스토그램만 합치고 게이지는 버린다. gunicorn이 워커를 거둘 때(child_exit)와 지표를 조회할 때 호출된다.
+        """
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+        with open(os.path.join(self.directory, COMPACT_LOCK_FILENAME), "a") as lock_file:
+            # 여러 워커가 동시에 조회해도 한 곳에서만 합친다
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            aggregate_path = os.path.join(self.directory, AGGREGATE_FILENAME)
+            aggregate = self._read(aggregate_path) or {"metrics": {}, "folded": []}
+            existing = set(os.listdir(self.directory))
+            # 합친 뒤 삭제하기 전에 멈췄던 파일은 다시 더하지 않고 삭제만 한다
+            leftover = [filename for filename in aggregate["folded"] if filename in existing]
+            now = time.time()
+            folded = []
+            for filename, data in self._worker_files():
+                if filename in leftover or self._is_live(data, now):
+                    continue
+                for name, samples in data["metrics"].items():
+                    metric = self._metrics.get(name)
+                    if metric is None or metric.kind == "gauge":
+                        continue
+                    self._merge(metric, aggregate["metrics"].setdefault(name, {}), samples)
+                folded.append(filename)
+            if folded:
+                aggregate["folded"] = leftover + folded
+                self._write(aggregate_path, aggregate)
+            for filename in leftover + folded:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+        if folded:
+            logger.info(f"종료된 워커 지표 {len(folded)}개를 합계 파일에 합침")
+        return folded
+
+    @staticmethod
+    def _merge(metric: _Metric, merged: dict, samples: dict):
+        for key, value in samples.items():
+            if metric.kind == "histogram":
+                if len(value) != len(metric.buckets) + 2:
+                    continue
+                current = merged.setdefault(key, [0.0] * len(value))
+                merged[key] = [a + b for a, b in zip(current, value)]
+            elif metric.kind == "gauge" and metric.mode == "max":
+                merged[key] = max(merged.get(key, value), value)
+            else:
+                merged[key] = merged.get(key, 0.0) + value
+
+    def _load_all(self) -> list:
+        """(살아 있는지, 지표 값) 목록. 현재 프로세스는 파일 대신 메모리 값을 사용"""
+        own = (True, self.snapshot())
+        if self.directory is None or not os.path.isdir(self.directory):
+            return [own]
+        try:
+            self.compact()
+        except Exception as e:
+            logger.warning(f"종료된 워커 지표 합치기 실패: {e}")
+        results = [own]
+        aggregate = self._read(os.path.join(self.directory, AGGREGATE_FILENAME))
+        if aggregate is not None:
+            results.append((False, aggregate["metrics"]))
+        now = time.time()
+        for _, data in self._worker_files():
+            results.append((self._is_live(data, now), data["metrics"]))
+        return results
+
+    def render(self) -> str:
+        """모든 워커의 값을 합친 Prometheus text format"""
+        self.start()
+        sources = self._load_all()
+        lines = []
+        for name, metric in self._metrics.items():
+            merged = {}
+            for alive, values in sources:
+                if metric.kind == "gauge" and not alive:
+                    continue
+                self._merge(metric, merged, values.get(name) or {})
+
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key in sorted(merged):
+                labels = metric.labels_of(key)
+                value = merged[key]
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(metric.buckets, value):
+                    cumulative += count
+                    bucket_labels = {**labels, "le": _format_value(bound)}
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {_format_value(value[-1])}")
+        return "\n".join(lines) + "\n"
+
+
+def _default_registry() -> MetricsRegistry:
+    from config.config import Config
+    return MetricsRegistry(Config.METRICS_DIR or None, flush_interval=Config.METRICS_FLUSH_INTERVAL)
+
+
+registry = _default_registry()
+
+STAGE_SECONDS = registry.histogram(
+    "qa_stage_duration_seconds",
+    "QA 파이프라인 단계별 소요 시간",
+    ["stage", "category"]
+)
+REQUEST_SECONDS = registry.histogram(
+    "qa_request_duration_seconds",
+    "질의응답 전체 소요 시간",
+    ["mode", "category", "status"]
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total",
+    "LLM 토큰 사용량",
+    ["category", "model", "type"]
+)
+LLM_COST = registry.counter(
+    "llm_cost_usd_total",
+    "LLM 호출 비용 (USD)",
+    ["category", "model"]
+)
+DELIVERY_SECONDS = registry.histogram(
+    "delivery_post_duration_seconds",
+    "외부 서버로 답변을 전송하는 POST 소요 시간",
+    ["result"]
+)
+QUEUE_DEPTH = registry.gauge(
+    "job_queue_depth",
+    "대기 중인 작업 수",
+    ["queue"]
+)
+LLM_INFLIGHT = registry.gauge(
+    "llm_inflight_calls",
+    "모든 워커에서 진행 중인 LLM 호출 수",
+    mode="max"
+)
+OUTBOX_ITEMS = registry.gauge(
+    "delivery_outbox_items",
+    "상태별 outbox 항목 수",
+    ["status"],
+    mode="max"
+)
+CACHE_LOOKUPS = registry.counter(
+    "cache_lookups_total",
+    "캐시 조회 수 (result: hit, semantic_hit, miss)",
+    ["cache", "result"]
+)
+MODEL_ROUTE_REQUESTS = registry.counter(
+    "model_route_requests_total",
+    "경로별 답변 수 (outcome: primary, hedge, fallback, error)",
+    ["route", "model", "outcome"]
+)
+MODEL_ROUTE_SECONDS = registry.histogram(
+    "model_route_duration_seconds",
+    "경로별 LLM 응답 시간 (헤지/대체 포함)",
+    ["route", "outcome"]
+)
+MODEL_ROUTE_COST = registry.counter(
+    "model_route_cost_usd_total",
+    "경로별 LLM 호출 비용 (USD, 헤지로 버려진 호출 포함)",
+    ["route", "model"]
+)
+MODEL_HEDGES = registry.counter(
+    "model_hedged_requests_total",
+    "지연 예산을 넘겨 백업 모델로 보낸 요청 수",
+    ["route"]
+)
+MODEL_HEDGES_SKIPPED = registry.counter(
+    "model_hedges_skipped_total",
+    "지연 예산을 넘겼지만 남은 LLM 슬롯이 없어 헤지하지 않은 요청 수",
+    ["route"]
+)
+RETRIEVAL_REQUESTS = registry.counter(
+    "retrieval_requests_total",
+    "검색 방식별 문서 검색 수",
+    ["mode"]
+)
@@ -0,0 +1,199 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILENAME = "vectors.npy"
+OFFSETS_FILENAME = "offsets.npy"
+DOCUMENTS_FILENAME = "documents.bin"
+META_FILENAME = "meta.json"
+FORMAT_VERSION = 1
+
+
+def metadata_matches(metadata: dict, where: dict) -> bool:
+    """메타데이터 필터 일치 여부 (값이 목록이면 그중 하나와 같으면 일치)"""
+    for key, expected in where.items():
+        value = (metadata or {}).get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class IndexedDocument:
+    """검색 결과 문서 (langchain Document와 같은 page_content/metadata 속성 제공)."""
+
+    __slots__ = ("page_content", "metadata", "score")
+
+    def __init__(self, page_content: str, metadata: dict, score: float):
+        self.page_content = page_content
+        self.metadata = metadata
+        self.score = score
+
+
+class MmapVectorIndex:
+    """로컬 디스크의 float32 행렬을 메모리 매핑하여 검색하는 읽기 전용 벡터 인덱스.
+
+    vectors.npy   : 정규화된 (N, D) float32 행렬
+    offsets.npy   : documents.bin 안의 문서 시작 위치 (N + 1,) int64
+    documents.bin : UTF-8 문서 본문을 이어 붙인 파일
+    meta.json     : 벡터 ID, 메타데이터, 생성 정보
+
+    파일을 읽기 전용으로 매핑하므로 여러 gunicorn 워커가 같은 페이지 캐시를 공유한다.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors = np.load(os.path.join(directory, VECTORS_FILENAME), mmap_mode="r")
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILENAME), mmap_mode="r")
+        with open(os.path.join(directory, META_FILENAME), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        # 내보내기 도중 컬렉션이 줄어든 경우를 대비해 실제로 기록된 행만 사용
+        self.vectors = self.vectors[:self.meta["count"]]
+        self.ids = self.meta["ids"]
+        self.metadatas = self.meta["metadatas"]
+        self._id_rows = None
+        self._documents_file = open(os.path.join(directory, DOCUMENTS_FILENAME), "rb")
+        size = os.fstat(self._documents_file.fileno()).st_size
+        self._documents = mmap.mmap(self._documents_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @classmethod
+    def load(cls, directory: str):
+        if not os.path.exists(os.path.join(directory, META_FILENAME)):
+            raise FileNotFoundError(f"메모리 매핑 인덱스가 존재하지 않습니다: {directory}")
+        started = time.perf_counter()
+        index = cls(directory)
+        logger.info(f"메모리 매핑 인덱스 로드: {directory} ({len(index)}건, {(time.perf_counter() - started) * 1000:.1f}ms)")
+        return index
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def document(self, row: int) -> str:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self._documents[start:end].decode("utf-8")
+
+    def search(self, vector, k: int = 3, rows=None) -> list:
+        """코사인 유사도 상위 k개 (행 번호, 점수) 반환. rows가 있으면 해당 행 안에서만 검색"""
+        if len(self) == 0 or k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            if rows.size == 0:
+                return []
+            scores = self.vectors[rows] @ query
+        else:
+            scores = self.vectors @ query
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        if rows is not None:
+            return [(int(rows[i]), float(scores[i])) for i in top]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def rows_matching(self, where: dict) -> list:
+        return [row for row, metadata in enumerate(self.metadatas[:len(self)]) if metadata_matches(metadata, where)]
+
+    def rows_for_ids(self, ids) -> list:
+        if self._id_rows is None:
+            self._id_rows = {vector_id: row for row, vector_id in enumerate(self.ids[:len(self)])}
+        return [self._id_rows[vector_id] for vector_id in ids if vector_id in self._id_rows]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, ids=None, **kwargs) -> list:
+        """Chroma와 같은 인터페이스의 검색
+
+        filter가 있으면 메타데이터가 일치하는 행과 ids(근접 중복으로 대신 저장된 대표 청크) 안에서만 검색한다.
+        """
+        rows = None
+        if filter:
+            rows = sorted(set(self.rows_matching(filter)) | set(self.rows_for_ids(ids or ())))
+        return [
+            IndexedDocument(self.document(row), self.metadatas[row] or {}, score)
+            for row, score in self.search(embedding, k, rows=rows)
+        ]
+
+    def close(self):
+        if isinstance(self._documents, mmap.mmap):
+            self._documents.close()
+        self._documents_file.close()
+
+    @staticmethod
+    def build_from_chroma(collection, out_dir: str, page_size: int = 1000, info: dict = None) -> dict:
+        """Chroma 컬렉션을 페이지 단위로 읽어 메모리 매핑 인덱스로 내보낸다.
+
+        out_dir은 새 (버전별) 디렉토리여야 한다. 임시 디렉토리에 모두 쓴 뒤 out_dir로 옮기며,
+        읽는 쪽에 공개하는 것은 호출하는 쪽의 CURRENT 전환(IndexVersions.activate)이 맡는다.
+        """
+        if os.path.exists(out_dir):
+            raise FileExistsError(f"메모리 매핑 인덱스 디렉토리가 이미 존재합니다: {out_dir}")
+        started = time.perf_counter()
+        count = collection.count()
+        tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        ids, metadatas = [], []
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        vectors = None
+        row = 0
+        with open(os.path.join(tmp_dir, DOCUMENTS_FILENAME), "wb") as documents_file:
+            for start in range(0, count, page_size):
+                page = collection.get(
+                    include=["embeddings", "documents", "metadatas"],
+                    limit=page_size,
+                    offset=start
+                )
+                embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+                if embeddings.size == 0:
+                    continue
+                if vectors is None:
+                    vectors = np.lib.format.open_memmap(
+                        os.path.join(tmp_dir, VECTORS_FILENAME), mode="w+", dtype=np.float32,
+                        shape=(count, embeddings.shape[1])
+                    )
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                vectors[row:row + len(embeddings)] = embeddings / norms
+                for document, metadata, vector_id in zip(page["documents"], page["metadatas"], page["ids"]):
+                    encoded = (document or "").encode("utf-8")
+                    documents_file.write(encoded)
+                    offsets[row + 1] = offsets[row] + len(encoded)
+                    ids.append(vector_id)
+                    metadatas.append(metadata)
+                    row += 1
+
+        if vectors is None:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+            np.save(os.path.join(tmp_dir, VECTORS_FILENAME), vectors)
+        else:
+            vectors.flush()
+            del vectors
+        np.save(os.path.join(tmp_dir, OFFSETS_FILENAME), offsets[:row + 1])
+        meta = {
+            "version": FORMAT_VERSION,
+            "count": row,
+            "ids": ids,
+            "metadatas": metadatas,
+            "created_at": time.time(),
+            **(info or {})
+        }
+        with open(os.path.join(tmp_dir, META_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        os.rename(tmp_dir, out_dir)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"메모리 매핑 인덱스 생성 완료: {out_dir} ({row}건, {elapsed:.1f}초)")
+        return {"count": row, "seconds": elapsed, "path": out_dir}
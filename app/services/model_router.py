@@ -0,0 +1,377 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from app.services import metrics_service as metrics
+
+logger = logging.getLogger(__name__)
+
+# 카테고리별 경로: 질문 복잡도(simple/complex)마다 모델 등급(fast/primary)과 최대 답변 토큰
+# 세무와 직원관리는 법령과 계산이 얽혀 있어 짧은 질문도 기본 모델을 사용하고,
+# 긴 답변이 늦다고 빠른 모델로 헤지하면 답변 품질이 떨어지므로 헤지하지 않는다 (hedge_after=None, 실패 시 대체만)
+DEFAULT_ROUTES = {
+    "노하우": {"simple": {"tier": "fast", "max_tokens": 1500}, "complex": {"tier": "primary", "max_tokens": 3000}},
+    "세무": {
+        "simple": {"tier": "primary", "max_tokens": 2000, "hedge_after": None},
+        "complex": {"tier": "primary", "max_tokens": 4500, "hedge_after": None},
+    },
+    "직원관리": {
+        "simple": {"tier": "primary", "max_tokens": 2000, "hedge_after": None},
+        "complex": {"tier": "primary", "max_tokens": 4500, "hedge_after": None},
+    },
+}
+DEFAULT_ROUTES["상권"] = DEFAULT_ROUTES["노하우"]
+
+# 등록되지 않은 카테고리에 사용하는 기본 경로
+FALLBACK_ROUTE = {"simple": {"tier": "fast", "max_tokens": 1500}, "complex": {"tier": "primary", "max_tokens": 3000}}
+
+# 계산, 절차, 법령 등 긴 답변이 필요한 질문에 자주 나오는 단어
+COMPLEX_KEYWORDS = (
+    "계산", "신고", "계약", "법", "세금", "부가세", "소득세", "퇴직금", "4대보험", "주휴",
+    "비교", "절차", "방법", "전략", "사례", "분석"
+)
+
+
+def get_openai_callback():
+    # langchain_community는 임포트가 무거우므로 처음 LLM을 호출할 때 불러온다
+    from langchain_community.callbacks.manager import get_openai_callback
+    return get_openai_callback()
+
+
+class ModelRoute:
+    """한 요청에 사용할 모델, 최대 토큰, 백업 모델과 헤지 기준 시간."""
+
+    def __init__(self, name: str, model: str, max_tokens: int, backup: str = None,
+                 backup_max_tokens: int = None, hedge_after: float = None):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.backup = backup
+        self.backup_max_tokens = backup_max_tokens or max_tokens
+        # None이면 헤지하지 않고 오류/시간 초과 시에만 백업 모델로 대체
+        self.hedge_after = hedge_after
+
+    def __repr__(self):
+        return f"ModelRoute({self.name}, {self.model}/{self.max_tokens}, backup={self.backup})"
+
+
+class ModelRouter:
+    """카테고리와 질문 복잡도로 모델을 고르고, 느리거나 실패한 호출을 백업 모델로 보완하는 라우터.
+
+    기본 모델이 헤지 기준 시간 안에 답하지 않으면 더 빠른 백업 모델에 같은 요청을 보내 먼저 끝난
+    답변을 사용하고(헤지), 기본 모델이 오류나 시간 초과로 실패하면 백업 모델로 다시 요청한다(대체).
+    스트리밍하지 않는 호출은 답변을 다 만들어야 응답하므로 헤지 기준 시간은
+    hedge_after(연결과 첫 토큰까지) + 최대 답변 토큰 x hedge_seconds_per_token으로 답변 길이에 비례해 늘린다.
+    OpenAI 클라이언트는 (모델, 최대 토큰)별로 프로세스마다 한 번 만든다.
+
+    slots(try_acquire_slot/release_slot 제공)가 있으면 헤지 호출은 별도의 LLM 슬롯을 기다리지 않고
+    얻을 수 있을 때만 보내고, 그 슬롯은 두 호출이 모두 끝날 때 반납하여 버려진 호출도 동시 호출 한도에 포함한다.
+    대체 호출은 실패한 기본 호출의 슬롯(호출한 쪽이 점유)을 이어서 사용한다.
+    """
+
+    def __init__(self, primary: str = "gpt-4", fast: str = "gpt-3.5-turbo", routes: dict = None,
+                 count_tokens=None, complex_tokens: int = 150, hedge_after: float = 10,
+                 request_timeout: float = 90, temperature: float = 0.1, hedge_workers: int = 16,
+                 enabled: bool = True, default_max_tokens: int = 4500, slots=None,
+                 hedge_seconds_per_token: float = 0.02):
+        self.primary = primary
+        self.fast = fast
+        self.routes = routes if routes is not None else DEFAULT_ROUTES
+        self.count_tokens = count_tokens or len
+        self.complex_tokens = complex_tokens
+        self.hedge_after = hedge_after
+        self.hedge_seconds_per_token = hedge_seconds_per_token
+        self.request_timeout = request_timeout
+        self.temperature = temperature
+        self.hedge_workers = hedge_workers
+        self.enabled = enabled
+        self.default_max_tokens = default_max_tokens
+        self.slots = slots
+        self._clients = {}
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load_routes(overrides: str) -> dict:
+        """기본 경로에 JSON 재정의를 합친 경로 표 (재정의하지 않은 항목은 기본값 유지)"""
+        routes = {category: dict(tiers) for category, tiers in DEFAULT_ROUTES.items()}
+        if not overrides:
+            return routes
+        try:
+            for category, tiers in json.loads(overrides).items():
+                route = routes.setdefault(category, dict(FALLBACK_ROUTE))
+                for tier, spec in tiers.items():
+                    route[tier] = {**route.get(tier, {}), **spec}
+        except (ValueError, AttributeError, TypeError) as e:
+            logger.error(f"MODEL_ROUTES 설정을 해석할 수 없어 기본 경로를 사용합니다: {e}")
+        return routes
+
+    def complexity(self, content: str, extra_data: dict = None) -> str:
+        """질문 길이, 질문 수, 전문 용어로 복잡도(simple/complex) 추정"""
+        content = content or ""
+        score = self.count_tokens(content) / self.complex_tokens
+        score += 0.3 * max(0, len(re.findall(r"[?？]", content)) - 1)
+        score += 0.25 * sum(1 for keyword in COMPLEX_KEYWORDS if keyword in content)
+        return "complex" if score >= 1.0 else "simple"
+
+    def route(self, category: str, content: str, extra_data: dict = None) -> ModelRoute:
+        if not self.enabled:
+            return ModelRoute("default", self.primary, self.default_max_tokens)
+
+        tier = self.complexity(content, extra_data)
+        spec = self.routes.get(category, FALLBACK_ROUTE).get(tier) or FALLBACK_ROUTE[tier]
+        model = spec.get("model") or (self.fast if spec.get("tier") == "fast" else self.primary)
+        name = f"{category if category in self.routes else '기타'}:{tier}"
+        max_tokens = int(spec.get("max_tokens", self.default_max_tokens))
+
+        if model == self.fast:
+            # 빠른 모델이 실패하면 기본 모델로 대체만 한다 (더 느린 모델로 헤지해도 꼬리 지연이 줄지 않음)
+            return ModelRoute(name, model, max_tokens, backup=self.primary)
+        hedge_after = spec.get("hedge_after", self.hedge_after)
+        if hedge_after is not None:
+            # 정상적인 긴 답변까지 헤지하지 않도록 최대 답변 길이만큼 기준 시간을 늘린다
+            hedge_after += max_tokens * self.hedge_seconds_per_token
+        # 헤지용 빠른 모델은 짧게 답하도록 토큰 수를 제한
+        return ModelRoute(name, model, max_tokens, backup=self.fast,
+                          backup_max_tokens=min(max_tokens, 2000), hedge_after=hedge_after)
+
+    def _check_pid(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # 부모 프로세스의 HTTP 커넥션 풀과 스레드는 자식에서 쓰지 않는다
+                self._clients = {}
+                self._executor = None
+                self._pid = os.getpid()
+
+    def client(self, model: str, max_tokens: int):
+        """(모델, 최대 토큰)별 ChatOpenAI (프로세스당 한 번 생성)"""
+        self._check_pid()
+        key = (model, max_tokens)
+        llm = self._clients.get(key)
+        if llm is None:
+            from langchain_openai import ChatOpenAI
+
+            with self._lock:
+                llm = self._clients.get(key)
+                if llm is None:
+                    llm = ChatOpenAI(
+                        model=model,
+                        temperature=self.temperature,
+                        max_tokens=max_tokens,
+                        request_timeout=self.request_timeout,
+                        #presence_penalty=0.5,
+                        #frequency_penalty=0.5
+                    )
+                    self._clients[key] = llm
+        return llm
+
+    def _pool(self) -> ThreadPoolExecutor:
+        self._check_pid()
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="llm-hedge")
+        return self._executor
+
+    def _call(self, route: ModelRoute, model: str, max_tokens: int, chain_for, inputs, on_usage):
+        with get_openai_callback() as cb:
+            answer = chain_for(self.client(model, max_tokens)).invoke(inputs)
+        self.record_usage(route, model, cb, on_usage)
+        return answer
+
+    def record_usage(self, route: ModelRoute, model: str, cb, on_usage=None):
+        metrics.MODEL_ROUTE_COST.inc(cb.total_cost, route=route.name, model=model)
+        if on_usage is not None:
+            on_usage(model, cb)
+
+    def _record(self, route: ModelRoute, model: str, outcome: str, started: float):
+        metrics.MODEL_ROUTE_REQUESTS.inc(route=route.name, model=model, outcome=outcome)
+        metrics.MODEL_ROUTE_SECONDS.observe(time.perf_counter() - started, route=route.name, outcome=outcome)
+
+    def invoke(self, route: ModelRoute, chain_for, inputs: dict, on_usage=None) -> str:
+        """경로대로 LLM을 호출하여 답변 반환.
+
+        chain_for(llm)은 해당 LLM을 사용하는 체인을 반환하고, on_usage(model, cb)는 호출마다
+        (헤지로 버려진 호출 포함) 토큰 사용량을 기록한다.
+        """
+        started = time.perf_counter()
+        if route.backup is None:
+            try:
+                answer = self._call(route, route.model, route.max_tokens, chain_for, inputs, on_usage)
+            except Exception:
+                self._record(route, route.model, "error", started)
+                raise
+            self._record(route, route.model, "primary", started)
+            return answer
+
+        pool = self._pool()
+        futures = {pool.submit(self._call, route, route.model, route.max_tokens, chain_for, inputs, on_usage): "primary"}
+        backup_sent = False
+        hedge_skipped = False
+        hedge_slot = None
+        error = None
+        try:
+            while futures:
+                hedging = not backup_sent and not hedge_skipped and route.hedge_after is not None
+                done, _ = wait(list(futures), timeout=route.hedge_after if hedging else None,
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    ok, hedge_slot = self._try_hedge_slot()
+                    if not ok:
+                        logger.info(f"{route.name} LLM 슬롯이 없어 헤지하지 않고 {route.model} 응답을 기다림")
+                        metrics.MODEL_HEDGES_SKIPPED.inc(route=route.name)
+                        hedge_skipped = True
+                        continue
+                    logger.info(f"{route.name} {route.model} 응답이 {route.hedge_after:.1f}초를 넘어 {route.backup}로 헤지 요청")
+                    metrics.MODEL_HEDGES.inc(route=route.name)
+                    futures[pool.submit(self._call, route, route.backup, route.backup_max_tokens,
+                                        chain_for, inputs, on_usage)] = "hedge"
+                    backup_sent = True
+                    continue
+                for future in done:
+                    outcome = futures.pop(future)
+                    try:
+                        answer = future.result()
+                    except Exception as e:
+                        error = e
+                        logger.warning(f"{route.name} {outcome} 호출 실패: {e}")
+                        if not backup_sent:
+                            futures[pool.submit(self._call, route, route.backup, route.backup_max_tokens,
+                                                chain_for, inputs, on_usage)] = "fallback"
+                            backup_sent = True
+                        continue
+                    # 남은 호출은 끝날 때까지 진행되며 사용량은 _call에서 기록된다
+                    self._record(route, route.model if outcome == "primary" else route.backup, outcome, started)
+                    return answer
+            self._record(route, route.model, "error", started)
+            raise error
+        finally:
+            # 진 호출이 아직 실행 중이면 끝날 때까지 헤지 슬롯을 유지 (호출한 쪽의 슬롯은 곧 반납된다)
+            self._release_after(hedge_slot, list(futures))
+
+    def _try_hedge_slot(self) -> tuple:
+        """헤지 호출용 슬롯을 기다리지 않고 얻는다. (보낼 수 있는지, 슬롯 ID)"""
+        if self.slots is None:
+            return True, None
+        try:
+            slot_id = self.slots.try_acquire_slot()
+        except Exception as e:
+            logger.error(f"헤지용 LLM 슬롯 확인 실패: {e}")
+            return False, None
+        return slot_id is not None, slot_id
+
+    def _release_slot(self, slot_id):
+        if slot_id is None:
+            return
+        try:
+            self.slots.release_slot(slot_id)
+        except Exception as e:
+            logger.error(f"헤지용 LLM 슬롯 반납 실패: {e}")
+
+    def _release_after(self, slot_id, futures: list):
+        """futures가 모두 끝나면 슬롯 반납"""
+        if slot_id is None:
+            return
+        remaining = [future for future in futures if not future.done()]
+        if not remaining:
+            self._release_slot(slot_id)
+            return
+        lock = threading.Lock()
+        count = [len(remaining)]
+
+        def on_done(_):
+            with lock:
+                count[0] -= 1
+                last = count[0] == 0
+            if last:
+                self._release_slot(slot_id)
+
+        for future in remaining:
+            future.add_done_callback(on_done)
+
+    async def _acall(self, route: ModelRoute, model: str, max_tokens: int, chain_for, inputs, on_usage):
+        with get_openai_callback() as cb:
+            answer = await chain_for(self.client(model, max_tokens)).ainvoke(inputs)
+        self.record_usage(route, model, cb, on_usage)
+        return answer
+
+    async def ainvoke(self, route: ModelRoute, chain_for, inputs: dict, on_usage=None) -> str:
+        """invoke의 비동기 버전 (먼저 끝난 답변을 쓰고 나머지 호출은 취소)"""
+        started = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._acall(route, route.model, route.max_tokens, chain_for, inputs, on_usage)): "primary"}
+        backup_sent = route.backup is None
+        hedge_skipped = False
+        hedge_slot = None
+        error = None
+        try:
+            while tasks:
+                hedging = not backup_sent and not hedge_skipped and route.hedge_after is not None
+                done, _ = await asyncio.wait(list(tasks), timeout=route.hedge_after if hedging else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    ok, hedge_slot = await asyncio.to_thread(self._try_hedge_slot)
+                    if not ok:
+                        logger.info(f"{route.name} LLM 슬롯이 없어 헤지하지 않고 {route.model} 응답을 기다림")
+                        metrics.MODEL_HEDGES_SKIPPED.inc(route=route.name)
+                        hedge_skipped = True
+                        continue
+                    logger.info(f"{route.name} {route.model} 응답이 {route.hedge_after:.1f}초를 넘어 {route.backup}로 헤지 요청")
+                    metrics.MODEL_HEDGES.inc(route=route.name)
+                    tasks[asyncio.ensure_future(self._acall(route, route.backup, route.backup_max_tokens,
+                                                            chain_for, inputs, on_usage))] = "hedge"
+                    backup_sent = True
+                    continue
+                for task in done:
+                    outcome = tasks.pop(task)
+                    try:
+                        answer = task.result()
+                    except Exception as e:
+                        error = e
+                        logger.warning(f"{route.name} {outcome} 호출 실패: {e}")
+                        if not backup_sent:
+                            tasks[asyncio.ensure_future(self._acall(route, route.backup, route.backup_max_tokens,
+                                                                    chain_for, inputs, on_usage))] = "fallback"
+                            backup_sent = True
+                        continue
+                    self._record(route, route.model if outcome == "primary" else route.backup, outcome, started)
+                    return answer
+        finally:
+            for task in tasks:
+                task.cancel()
+            # 남은 호출은 취소했으므로 취소가 끝난 뒤 헤지 슬롯 반납 (이 작업이 취소되어도 반납되도록 직접 호출)
+            try:
+                if tasks:
+                    await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                self._release_slot(hedge_slot)
+        self._record(route, route.model, "error", started)
+        raise error
+
+    def stream(self, route: ModelRoute, chain_for, inputs: dict):
+        """(모델, 토큰 조각)을 yield. 첫 토큰 전에 실패하면 백업 모델로 대체 (스트리밍은 헤지하지 않음)"""
+        started = time.perf_counter()
+        attempts = [("primary", route.model, route.max_tokens)]
+        if route.backup is not None:
+            attempts.append(("fallback", route.backup, route.backup_max_tokens))
+        for index, (outcome, model, max_tokens) in enumerate(attempts):
+            streamed = False
+            try:
+                for chunk in chain_for(self.client(model, max_tokens)).stream(inputs):
+                    streamed = True
+                    yield model, chunk
+            except Exception as e:
+                if streamed or index == len(attempts) - 1:
+                    self._record(route, model, "error", started)
+                    raise
+                logger.warning(f"{route.name} {model} 스트리밍 시작 실패, {attempts[index + 1][1]}로 대체: {e}")
+                continue
+            self._record(route, model, outcome, started)
+            return
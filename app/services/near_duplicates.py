@@ -0,0 +1,162 @@
+"""청크 근접 중복 검출 (문자 shingle + MinHash + LSH 밴딩).
+
+여러 PDF에 반복되는 머리말, 안내 문구 같은 청크를 임베딩 전에 찾아
+대표 청크 하나만 벡터 DB에 저장하도록 한다. 서명은 벡터 DB 디렉토리의
+dedupe_index.json에 저장하여 증분 인덱싱에서도 기존 청크와 비교한다.
+"""
+import base64
+import json
+import logging
+import os
+import zlib
+from array import array
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_FILENAME = "dedupe_index.json"
+DEDUPE_VERSION = 1
+
+# 비어 있는 구간 표시 (32비트 해시의 최댓값)
+EMPTY = 0xFFFFFFFF
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """공백을 정리하고 소문자로 바꾼 텍스트의 문자 size-gram 집합"""
+    text = ' '.join(text.lower().split())
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash_signature(text: str, num_perm: int = 64, shingle_size: int = 5) -> tuple:
+    """one-permutation MinHash 서명.
+
+    shingle마다 해시를 한 번만 계산하고, 해시 공간을 num_perm개 구간으로 나눠 구간별 최솟값을 쓴다.
+    순열을 num_perm번 적용하는 방식과 같은 추정 정확도를 shingle 수에 비례하는 비용으로 얻는다.
+    """
+    signature = [EMPTY] * num_perm
+    for shingle in shingles(text, shingle_size):
+        # crc32는 하위 비트 분포가 고르지 않으므로 곱셈 해시로 섞은 뒤 상위 비트로 구간을 정한다
+        value = (zlib.crc32(shingle.encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+        bucket = (value * num_perm) >> 32
+        if value < signature[bucket]:
+            signature[bucket] = value
+    return tuple(signature)
+
+
+def estimate_similarity(a: tuple, b: tuple) -> float:
+    """두 서명의 추정 Jaccard 유사도 (양쪽 모두 비어 있는 구간은 제외)"""
+    compared = matched = 0
+    for x, y in zip(a, b):
+        if x == EMPTY and y == EMPTY:
+            continue
+        compared += 1
+        if x == y:
+            matched += 1
+    return matched / compared if compared else 1.0
+
+
+class NearDuplicateIndex:
+    """MinHash 서명을 밴드로 나눠 후보를 찾고, 추정 유사도가 threshold 이상인 대표 청크를 돌려주는 인덱스."""
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, shingle_size: int = 5):
+        if num_perm % bands:
+            raise ValueError("num_perm은 bands의 배수여야 합니다.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.signatures = {}
+        self._buckets = defaultdict(set)
+
+    @property
+    def settings(self) -> dict:
+        return {"num_perm": self.num_perm, "bands": self.bands, "shingle_size": self.shingle_size}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self.signatures
+
+    def signature(self, text: str) -> tuple:
+        return minhash_signature(text, self.num_perm, self.shingle_size)
+
+    def _band_keys(self, signature: tuple):
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            # 모두 빈 구간인 밴드는 짧은 청크끼리 무조건 묶이므로 건너뛴다
+            if any(value != EMPTY for value in rows):
+                yield band, rows
+
+    def find(self, signature: tuple):
+        """가장 유사한 대표 청크의 벡터 ID (threshold 미만이면 None)"""
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        best_id, best_score = None, self.threshold
+        for vector_id in candidates:
+            score = estimate_similarity(signature, self.signatures[vector_id])
+            if score >= best_score:
+                best_id, best_score = vector_id, score
+        return best_id
+
+    def add(self, vector_id: str, signature: tuple):
+        self.signatures[vector_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets[key].add(vector_id)
+
+    def remove(self, vector_ids) -> dict:
+        """제거한 {벡터 ID: 서명} 반환"""
+        removed = {}
+        for vector_id in vector_ids:
+            signature = self.signatures.pop(vector_id, None)
+            if signature is None:
+                continue
+            removed[vector_id] = signature
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(vector_id)
+                    if not bucket:
+                        del self._buckets[key]
+        return removed
+
+    @classmethod
+    def load(cls, db_directory: str, valid_ids=None, **options):
+        """저장된 서명 로드 (valid_ids가 있으면 벡터 DB에 남아 있는 청크만 사용)"""
+        index = cls(**options)
+        path = os.path.join(db_directory, DEDUPE_FILENAME)
+        if not os.path.exists(path):
+            return index
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"중복 검출 인덱스를 읽을 수 없어 새로 만듭니다: {path}, 오류 내용: {e}")
+            return index
+        if data.get("version") != DEDUPE_VERSION or data.get("settings") != index.settings:
+            logger.info(f"중복 검출 설정이 바뀌어 서명을 새로 계산합니다: {path}")
+            return index
+        valid_ids = set(valid_ids) if valid_ids is not None else None
+        for vector_id, encoded in data["signatures"].items():
+            if valid_ids is None or vector_id in valid_ids:
+                index.add(vector_id, tuple(array("I", base64.b64decode(encoded))))
+        return index
+
+    def save(self, db_directory: str):
+        """임시 파일에 쓴 뒤 교체"""
+        path = os.path.join(db_directory, DEDUPE_FILENAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": DEDUPE_VERSION,
+                "settings": self.settings,
+                "signatures": {
+                    vector_id: base64.b64encode(array("I", signature).tobytes()).decode("ascii")
+                    for vector_id, signature in self.signatures.items()
+                }
+            }, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,239 @@
+"""텍스트 레이어가 없는 PDF 페이지(스캔 이미지)만 골라 OCR하는 모듈.
+
+페이지 이미지 변환과 OCR은 CPU를 많이 쓰므로 spawn 프로세스 풀에서 실행하고,
+결과는 페이지 내용 해시로 SQLite에 캐시하여 다시 실행할 때는 OCR을 건너뛴다.
+OCR 엔진은 이름("easyocr", "stub") 또는 "모듈:클래스" 경로로 지정한다.
+"""
+import hashlib
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from config.config import Config
+from utils.sqlite_utils import ThreadLocalSQLite
+
+logger = logging.getLogger(__name__)
+
+
+class EasyOCREngine:
+    """EasyOCR 엔진 (Reader는 처음 사용할 때 프로세스마다 한 번 생성)."""
+
+    def __init__(self, languages=None, gpu: bool = False):
+        self.languages = list(languages or ["ko", "en"])
+        self.gpu = gpu
+        self._reader = None
+
+    @property
+    def signature(self) -> str:
+        return f"easyocr:{','.join(self.languages)}"
+
+    def recognize(self, image: bytes) -> str:
+        if self._reader is None:
+            import easyocr
+            self._reader = easyocr.Reader(self.languages, gpu=self.gpu, verbose=False)
+        return " ".join(self._reader.readtext(image, detail=0, paragraph=True))
+
+
+class StubOCREngine:
+    """이미지 해시로 결정되는 텍스트를 돌려주는 테스트/벤치마크용 엔진."""
+
+    def __init__(self, languages=None, text: str = "OCR"):
+        self.text = text
+
+    @property
+    def signature(self) -> str:
+        return f"stub:{self.text}"
+
+    def recognize(self, image: bytes) -> str:
+        return f"{self.text} {hashlib.sha256(image).hexdigest()[:12]}"
+
+
+ENGINES = {
+    "easyocr": EasyOCREngine,
+    "stub": StubOCREngine,
+}
+
+
+def create_engine(spec: str, **options):
+    """엔진 이름 또는 "패키지.모듈:클래스" 경로로 엔진 생성 (spawn 자식 프로세스에서도 같은 방식으로 생성)"""
+    if spec in ENGINES:
+        return ENGINES[spec](**options)
+    module_name, sep, class_name = spec.partition(":")
+    if not sep:
+        raise ValueError(f"알 수 없는 OCR 엔진입니다: {spec}")
+    return getattr(importlib.import_module(module_name), class_name)(**options)
+
+
+def page_content_hash(doc, page) -> str:
+    """페이지 크기, 콘텐츠 스트림, 이미지 원본 바이트로 만든 해시 (렌더링 없이 계산)"""
+    digest = hashlib.sha256()
+    digest.update(repr(tuple(page.rect)).encode())
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+
+_worker_engine = None
+
+
+def _init_worker(engine_spec: str, options: dict):
+    global _worker_engine
+    _worker_engine = create_engine(engine_spec, **options)
+
+
+def ocr_page(pdf_path: str, page_no: int, zoom: float) -> str:
+    """자식 프로세스에서 페이지 하나를 흑백 이미지로 변환한 뒤 OCR"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        pixmap = doc[page_no].get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+        image = pixmap.tobytes("png")
+    return ' '.join(_worker_engine.recognize(image).split())
+
+
+class OCRCache:
+    """엔진 서명과 페이지 내용 해시를 키로 OCR 결과를 저장하는 디스크 캐시."""
+
+    def __init__(self, db_path: str):
+        self._db = ThreadLocalSQLite(db_path)
+        with self._db.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ocr_pages (
+                    engine TEXT NOT NULL,
+                    page_hash TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (engine, page_hash)
+                )
+                """
+            )
+
+    def get(self, engine: str, page_hash: str):
+        row = self._db.connect().execute(
+            "SELECT text FROM ocr_pages WHERE engine = ? AND page_hash = ?", (engine, page_hash)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, engine: str, page_hash: str, text: str):
+        with self._db.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_pages (engine, page_hash, text, created_at) VALUES (?, ?, ?, ?)",
+                (engine, page_hash, text, time.time())
+            )
+
+
+class OCRStage:
+    """텍스트가 (거의) 없고 이미지가 있는 페이지만 프로세스 풀에서 OCR하는 단계.
+
+    submit()은 페이지 번호별 Future를 돌려주므로 호출하는 쪽은 앞쪽 페이지를 처리하는 동안
+    뒤쪽 페이지의 OCR이 병렬로 진행된다. 캐시에 있는 페이지는 이미 완료된 Future로 돌려준다.
+    """
+
+    def __init__(self, engine: str = "easyocr", languages=None, workers: int = 0, zoom: float = 2.0,
+                 min_chars: int = 20, cache_path: str = None):
+        self.engine_spec = engine
+        self.engine_options = {"languages": list(languages or ["ko", "en"])}
+        # 캐시 키에 쓰는 엔진 서명 (부모 프로세스에서는 엔진 모델을 불러오지 않는다)
+        self.engine_signature = f"{create_engine(engine, **self.engine_options).signature}@{zoom}"
+        self.workers = workers or os.cpu_count() or 1
+        self.zoom = zoom
+        self.min_chars = min_chars
+        self.cache = OCRCache(cache_path) if cache_path else None
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {"pages": 0, "cached": 0, "recognized": 0, "failed": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def needs_ocr(self, page, text: str = None) -> bool:
+        if text is None:
+            text = ' '.join(page.get_text().split())
+        return len(text) < self.min_chars and bool(page.get_images())
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 요청 스레드가 여러 개인 서버 프로세스에서 fork하지 않도록 spawn 사용
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.engine_spec, self.engine_options)
+                )
+            return self._executor
+
+    def submit(self, pdf_path: str, doc, page_numbers=None) -> dict:
+        """OCR이 필요한 페이지의 {페이지 번호: Future} 반환 (page_numbers가 없으면 모든 페이지를 검사)"""
+        if page_numbers is None:
+            page_numbers = [page.number for page in doc if self.needs_ocr(page)]
+        futures = {}
+        for page_no in page_numbers:
+            page_hash = page_content_hash(doc, doc[page_no])
+            cached = self.cache.get(self.engine_signature, page_hash) if self.cache else None
+            with self._lock:
+                self.stats["pages"] += 1
+                if cached is not None:
+                    self.stats["cached"] += 1
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+            else:
+                future = self._pool().submit(ocr_page, pdf_path, page_no, self.zoom)
+                future.add_done_callback(lambda done, page_hash=page_hash: self._store(done, page_hash))
+            futures[page_no] = future
+        return futures
+
+    def _store(self, future: Future, page_hash: str):
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._lock:
+            self.stats["recognized"] += 1
+        if self.cache:
+            try:
+                self.cache.put(self.engine_signature, page_hash, future.result())
+            except Exception as e:
+                logger.warning(f"OCR 결과 캐시 저장 실패: {e}")
+
+    def result(self, pdf_path: str, page_no: int, future: Future):
+        """OCR 결과 텍스트. 실패하면 None (호출하는 쪽은 원래 텍스트로 나머지 페이지를 계속 인덱싱하고 다음에 다시 시도)"""
+        try:
+            return future.result()
+        except Exception as e:
+            with self._lock:
+                self.stats["failed"] += 1
+            logger.error(f"OCR 실패: {pdf_path} {page_no + 1}쪽, 오류 내용: {e}")
+            return None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def create_ocr_stage(config=Config):
+    """설정에서 OCR을 켠 경우에만 OCRStage 생성 (꺼져 있으면 None)"""
+    if not config.OCR_ENABLED:
+        return None
+    return OCRStage(
+        engine=config.OCR_ENGINE,
+        languages=[language.strip() for language in config.OCR_LANGUAGES.split(",") if language.strip()],
+        workers=config.OCR_WORKERS,
+        zoom=config.OCR_ZOOM,
+        min_chars=config.OCR_MIN_CHARS,
+        cache_path=config.OCR_CACHE_PATH
+    )
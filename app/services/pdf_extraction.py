@@ -0,0 +1,75 @@
+"""PDF 텍스트 추출 작업 모듈.
+
+프로세스 풀의 자식 프로세스에서 실행되므로 langchain 등 무거운 모듈을 import하지 않는다.
+"""
+import os
+
+# 추출된 텍스트에서 페이지 경계를 나타내는 문자
+PAGE_SEPARATOR = "\f"
+
+
+def iter_page_texts(pdf_path: str, ocr=None, failed_pages: list = None):
+    """페이지 단위로 공백을 정리한 텍스트를 yield (문서 전체를 메모리에 올리지 않음)
+
+    ocr(OCRStage)가 있으면 텍스트 레이어가 없는 페이지를 먼저 모두 OCR 풀에 넣고,
+    앞쪽 페이지를 yield하는 동안 뒤쪽 페이지의 OCR이 진행되도록 한다.
+    OCR에 실패한 페이지 번호는 failed_pages에 추가한다.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        pending = ocr.submit(pdf_path, doc) if ocr is not None else {}
+        for page in doc:
+            text = ' '.join(page.get_text().split())
+            if page.number in pending:
+                text = ocr_page_text(ocr, pdf_path, page.number, pending.pop(page.number), text, failed_pages)
+            yield text
+
+
+def ocr_page_text(ocr, pdf_path: str, page_no: int, future, text: str, failed_pages: list = None) -> str:
+    """OCR 결과 텍스트. 실패하면 원래 추출된 (짧은) 텍스트를 그대로 쓰고 failed_pages에 기록"""
+    recognized = ocr.result(pdf_path, page_no, future)
+    if recognized is None:
+        if failed_pages is not None:
+            failed_pages.append(page_no)
+        return text
+    return recognized or text
+
+
+def iter_text_pages(txt_path: str, block_size: int = 1 << 16):
+    """페이지 구분자(\f)로 나뉜 txt 파일을 페이지 단위로 yield (파일 전체를 메모리에 올리지 않음)"""
+    buffer = ""
+    with open(txt_path, 'r', encoding='utf-8') as f:
+        for block in iter(lambda: f.read(block_size), ""):
+            buffer += block
+            *pages, buffer = buffer.split(PAGE_SEPARATOR)
+            yield from pages
+    yield buffer
+
+
+def extract_pdf_to_file(pdf_path: str, txt_path: str, ocr_min_chars: int = 0) -> dict:
+    """PDF를 페이지 단위로 읽어 임시 파일에 바로 쓰고, 완료되면 txt 파일로 교체
+
+    ocr_min_chars가 있으면 텍스트가 그보다 짧고 이미지가 있는 페이지 번호를 ocr_pages로 함께 돌려준다.
+    """
+    import fitz  # PyMuPDF
+
+    tmp_path = f"{txt_path}.tmp"
+    pages = 0
+    ocr_pages = []
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f, fitz.open(pdf_path) as doc:
+            for page in doc:
+                page_text = ' '.join(page.get_text().split())
+                if ocr_min_chars and len(page_text) < ocr_min_chars and page.get_images():
+                    ocr_pages.append(page.number)
+                if pages:
+                    f.write(PAGE_SEPARATOR)
+                f.write(page_text)
+                pages += 1
+        os.replace(tmp_path, txt_path)
+        return {"pdf_path": pdf_path, "txt_path": txt_path, "pages": pages, "ocr_pages": ocr_pages}
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return {"pdf_path": pdf_path, "txt_path": txt_path, "pages": pages, "error": str(e)}
@@ -0,0 +1,225 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 모든 카테고리에 공통으로 들어가는 안내 문구
+PREAMBLE = "자영업 관련하여 다음과 같은 구체적인 해결책을 제공합니다. 마지막에는 항상 전문가와의 상담을 권고합니다."
+
+# 카테고리별 프롬프트 정의: 지시문과 extra_data 항목(키, 라벨) 목록
+PROMPT_TEMPLATES = {
+    "노하우": {
+        "instruction": "상세한 자영업 노하우를 바탕으로 한 매장 운영 조언을 예시를 들어 제공합니다.",
+        "fields": [
+            ("bossType", "창업자 유형"),
+            ("businessType", "업종 및 주요 메뉴"),
+            ("location", "매장 위치 및 규모"),
+            ("customerType", "주요 고객 및 목표 고객"),
+            ("storeInfo", "매장 정보"),
+            ("budget", "가용 예산"),
+        ],
+    },
+    "세무": {
+        "instruction": "구체적인 세무 조언을 예시를 들어 제공합니다.",
+        "fields": [
+            ("taxBookKeepingStatus", "세무 기장 상태"),
+            ("businessType", "업종 및 개업연월일"),
+            ("branchInfo", "사업장 정보"),
+            ("employeeManagement", "직원 관리 정보"),
+            ("purchaseEvidence", "구입 증빙 방법"),
+            ("salesScale", "매출 규모"),
+        ],
+    },
+    "직원관리": {
+        "instruction": "구체적인 직원 관리와 관련된 조언을 예시를 들어 제공합니다.",
+        "fields": [
+            ("contractStatus", "근로계약서 상태"),
+            ("businessType", "업종 및 개업연월일"),
+            ("employmentTypeAndDuration", "직원 고용 형태 및 기간"),
+            ("workAndBreakHours", "근로 및 휴게 시간"),
+            ("salaryAndAllowance", "급여 및 수당 체계"),
+            ("statutoryBenefits", "법정 복리후생 제공 여부"),
+        ],
+    },
+}
+# 상권 질문은 노하우와 같은 프롬프트를 사용
+PROMPT_TEMPLATES["상권"] = PROMPT_TEMPLATES["노하우"]
+
+# 등록되지 않은 카테고리에 사용하는 기본 프롬프트
+DEFAULT_TEMPLATE = {"instruction": "", "fields": []}
+
+
+def _escape(text: str) -> str:
+    """ChatPromptTemplate 변수로 해석되지 않도록 중괄호 이스케이프"""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class TokenBudgeter:
+    """토크나이저로 토큰 수를 세고 참고 문서를 목표 토큰 수에 맞게 줄이는 클래스."""
+
+    def __init__(self, model_name: str = "gpt-4"):
+        self.model_name = model_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        """토크나이저 (tiktoken 로드가 느리므로 처음 사용할 때 불러온다)"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._encoding = self._load_encoding()
+                    self._loaded = True
+        return self._encoding
+
+    def _load_encoding(self):
+        try:
+            import tiktoken
+            try:
+                return tiktoken.encoding_for_model(self.model_name)
+            except KeyError:
+                return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # tiktoken을 사용할 수 없으면 문자 수 기반으로 보수적으로 추정
+            logger.warning(f"tiktoken 로드 실패, 문자 수로 토큰을 추정합니다: {e}")
+            return None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text))
+        # 한글은 대략 1글자당 1토큰 이상이므로 글자 수를 그대로 사용
+        return len(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """텍스트를 max_tokens 이하로 자름"""
+        if max_tokens <= 0 or not text:
+            return ""
+        encoding = self.encoding
+        if encoding is not None:
+            tokens = encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            # 잘린 멀티바이트 문자는 버림
+            return encoding.decode(tokens[:max_tokens]).rstrip("�")
+        return text[:max_tokens]
+
+    @staticmethod
+    def compress(text: str) -> str:
+        """공백을 정리하고 중복된 문장을 제거"""
+        seen = set()
+        sentences = []
+        for sentence in " ".join(text.split()).split(". "):
+            key = sentence.strip()
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            sentences.append(key)
+        return ". ".join(sentences)
+
+    def fit(self, passages, max_tokens: int) -> str:
+        """관련도 순으로 정렬된 문서들을 예산 안에서 최대한 채워서 하나의 텍스트로 반환"""
+        if isinstance(passages, str):
+            passages = [passages]
+        selected = []
+        remaining = max_tokens
+        for passage in passages:
+            passage = self.compress(passage)
+            if not passage:
+                continue
+            # 문서 사이 구분자("\n")의 토큰도 예산에 포함
+            cost = self.count(passage) + (1 if selected else 0)
+            if cost <= remaining:
+                selected.append(passage)
+                remaining -= cost
+                continue
+            # 예산이 남아 있으면 마지막 문서는 잘라서 포함
+            truncated = self.truncate(passage, remaining - (1 if selected else 0))
+            if truncated:
+                selected.append(truncated)
+            break
+        return "\n".join(selected)
+
+
+class PromptRegistry:
+    """카테고리별로 미리 컴파일된 프롬프트 템플릿과 체인을 관리하는 클래스."""
+
+    def __init__(self, budgeter: TokenBudgeter, max_prompt_tokens: int = 3000, max_context_tokens: int = 1500,
+                 templates: dict = None):
+        self.budgeter = budgeter
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_context_tokens = max_context_tokens
+        self.templates = templates or PROMPT_TEMPLATES
+        self._prompts = {}
+        self._chains = {}
+        self._lock = threading.Lock()
+
+    def _spec(self, category: str) -> dict:
+        return self.templates.get(category, DEFAULT_TEMPLATE)
+
+    def get_prompt(self, category: str):
+        """카테고리별 ChatPromptTemplate (한 번만 생성)"""
+        from langchain_core.prompts import ChatPromptTemplate
+
+        key = category if category in self.templates else None
+        prompt = self._prompts.get(key)
+        if prompt is None:
+            spec = self._spec(category)
+            text = _escape(PREAMBLE) + "\n\n{context}"
+            if spec["instruction"]:
+                text += _escape(spec["instruction"]) + "\n"
+            text += "{profile}\n질문: {question}"
+            prompt = ChatPromptTemplate.from_messages([("system", text)])
+            with self._lock:
+                self._prompts.setdefault(key, prompt)
+                prompt = self._prompts[key]
+        return prompt
+
+    def get_chain(self, category: str, llm, output_parser):
+        """프롬프트 -> LLM -> 파서 체인 (카테고리와 LLM별로 캐시)"""
+        key = (category if category in self.templates else None, id(llm), id(output_parser))
+        chain = self._chains.get(key)
+        if chain is None:
+            chain = self.get_prompt(category) | llm | output_parser
+            with self._lock:
+                self._chains.setdefault(key, chain)
+                chain = self._chains[key]
+        return chain
+
+    def format_profile(self, category: str, extra_data: dict) -> str:
+        lines = []
+        if extra_data:
+            for field, label in self._spec(category)["fields"]:
+                if extra_data.get(field):
+                    lines.append(f"- {label}: {extra_data[field]}\n")
+        return "".join(lines)
+
+    def build_inputs(self, category: str, content: str, extra_data: dict, relevant_text="") -> dict:
+        """템플릿 변수 생성. 참고 문서는 남은 토큰 예산에 맞게 줄인다"""
+        profile = self.format_profile(category, extra_data)
+        question = content or ""
+        inputs = {"context": "", "profile": profile, "question": question}
+
+        if relevant_text:
+            fixed_tokens = self.budgeter.count(self.render(category, inputs))
+            budget = min(self.max_context_tokens, self.max_prompt_tokens - fixed_tokens)
+            context = self.budgeter.fit(relevant_text, budget)
+            if context:
+                inputs["context"] = f"참고 정보:\n{context}\n\n"
+        return inputs
+
+    def render(self, category: str, inputs: dict) -> str:
+        """템플릿 변수를 채운 최종 프롬프트 문자열"""
+        return self.get_prompt(category).messages[0].prompt.format(**inputs)
+
+    def warm_up(self):
+        """모든 카테고리의 프롬프트를 미리 컴파일하고 토크나이저를 로드"""
+        for category in list(self.templates) + [None]:
+            self.get_prompt(category)
+        self.budgeter.encoding
+
+    def count_tokens(self, category: str, inputs: dict) -> int:
+        return self.budgeter.count(self.render(category, inputs))
@@ -1,126 +1,325 @@
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_chroma import Chroma  
-from langchain_community.callbacks.manager import get_openai_callback
-
-
-def create_prompt(category: str, content: str, extra_data: dict, relevant_text: str = "") -> str:
-    """카테고리 및 추가 데이터에 따라 동적으로 프롬프트를 생성"""
-
-    # 기본적인 프롬프트 구조 설정
-    prompt_template = "자영업 관련하여 다음과 같은 구체적인 해결책을 제공합니다. 마지막에는 항상 전문가와의 상담을 권고합니다.\n\n"
-
-    # 관련 텍스트가 있으면 추가
-    if relevant_text:
-        prompt_template += f"참고 정보:\n{relevant_text}\n\n"
-
-    # 카테고리별 프롬프트 구성
-    if category == "노하우" or category == "상권":
-        prompt_template += "상세한 자영업 노하우를 바탕으로 한 매장 운영 조언을 예시를 들어 제공합니다.\n"
-        if extra_data:
-            if extra_data.get("bossType"):
-                prompt_template += f"- 창업자 유형: {extra_data['bossType']}\n"
-            if extra_data.get("businessType"):
-                prompt_template += f"- 업종 및 주요 메뉴: {extra_data['businessType']}\n"
-            if extra_data.get("location"):
-                prompt_template += f"- 매장 위치 및 규모: {extra_data['location']}\n"
-            if extra_data.get("customerType"):
-                prompt_template += f"- 주요 고객 및 목표 고객: {extra_data['customerType']}\n"
-            if extra_data.get("storeInfo"):
-                prompt_template += f"- 매장 정보: {extra_data['storeInfo']}\n"
-            if extra_data.get("budget"):
-                prompt_template += f"- 가용 예산: {extra_data['budget']}\n"
-
-    elif category == "세무":
-        prompt_template += "구체적인 세무 조언을 예시를 들어 제공합니다.\n"
-        if extra_data:
-            if extra_data.get("taxBookKeepingStatus"):
-                prompt_template += f"- 세무 기장 상태: {extra_data['taxBookKeepingStatus']}\n"
-            if extra_data.get("businessType"):
-                prompt_template += f"- 업종 및 개업연월일: {extra_data['businessType']}\n"
-            if extra_data.get("branchInfo"):
-                prompt_template += f"- 사업장 정보: {extra_data['branchInfo']}\n"
-            if extra_data.get("employeeManagement"):
-                prompt_template += f"- 직원 관리 정보: {extra_data['employeeManagement']}\n"
-            if extra_data.get("purchaseEvidence"):
-                prompt_template += f"- 구입 증빙 방법: {extra_data['purchaseEvidence']}\n"
-            if extra_data.get("salesScale"):
-                prompt_template += f"- 매출 규모: {extra_data['salesScale']}\n"
-
-    elif category == "직원관리":
-        prompt_template += "구체적인 직원 관리와 관련된 조언을 예시를 들어 제공합니다.\n"
-        if extra_data:
-            if extra_data.get("contractStatus"):
-                prompt_template += f"- 근로계약서 상태: {extra_data['contractStatus']}\n"
-            if extra_data.get("businessType"):
-                prompt_template += f"- 업종 및 개업연월일: {extra_data['businessType']}\n"
-            if extra_data.get("employmentTypeAndDuration"):
-                prompt_template += f"- 직원 고용 형태 및 기간: {extra_data['employmentTypeAndDuration']}\n"
-            if extra_data.get("workAndBreakHours"):
-                prompt_template += f"- 근로 및 휴게 시간: {extra_data['workAndBreakHours']}\n"
-            if extra_data.get("salaryAndAllowance"):
-                prompt_template += f"- 급여 및 수당 체계: {extra_data['salaryAndAllowance']}\n"
-            if extra_data.get("statutoryBenefits"):
-                prompt_template += f"- 법정 복리후생 제공 여부: {extra_data['statutoryBenefits']}\n"
-
-    prompt_template += f'\n질문: {content}'
-    return prompt_template
+from app.services.cache_service import SemanticAnswerCache
+from app.services.index_versions import IndexVersions
+from app.services.lexical_index import LexicalIndexHandle
+from app.services.model_router import ModelRouter, get_openai_callback
+from app.services import metrics_service as metrics
+from app.services.prompt_service import PROMPT_TEMPLATES, PromptRegistry, TokenBudgeter
+from app.services.retrieval_service import CachedQueryEmbeddings, Retriever, VectorStoreHandle
+from config.config import Config
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+def category_label(category: str) -> str:
+    """지표 레이블용 카테고리 (임의 입력으로 시계열이 늘어나지 않도록 알려진 카테고리만 사용)"""
+    return category if category in PROMPT_TEMPLATES else "기타"
+
+
+def _openai_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings()
 
 
 class QAService:
     """질의응답(QA) 서비스 관리 클래스."""
 
-    def __init__(self, model_name="gpt-4", temperature=0.1, max_tokens=4500):
-        #self.db_directory = db_directory
-        self.embedding = OpenAIEmbeddings()
-        self.llm = ChatOpenAI(
-            model=model_name,
+    def __init__(self, model_name=None, temperature=0.1, max_tokens=4500, db_directory=None, llm_limiter=None):
+        self.db_directory = db_directory or Config.VECTOR_DB_PATH
+        # 여러 워커의 동시 LLM 호출 수를 제한하는 객체 (llm_slot() 컨텍스트 매니저 제공)
+        self.llm_limiter = llm_limiter
+        self.model_name = model_name or Config.MODEL_PRIMARY
+        self.max_tokens = max_tokens
+        self._output_parser = None
+        # 질문 임베딩은 답변 캐시와 검색에서 함께 사용하므로 캐시해 둔다
+        self.embedding = CachedQueryEmbeddings(max_size=Config.QUERY_EMBEDDING_CACHE_SIZE, factory=_openai_embeddings)
+
+        # 카테고리별로 미리 컴파일된 프롬프트와 토큰 예산 관리
+        self.prompts = PromptRegistry(
+            TokenBudgeter(self.model_name),
+            max_prompt_tokens=Config.PROMPT_MAX_TOKENS,
+            max_context_tokens=Config.PROMPT_CONTEXT_TOKENS
+        )
+
+        # 카테고리와 질문 복잡도별 모델 선택, 지연 시 헤지 / 실패 시 대체
+        # (OpenAI 클라이언트는 fork 후 공유하면 안 되므로 라우터가 프로세스마다 만든다)
+        self.router = ModelRouter(
+            primary=self.model_name,
+            fast=Config.MODEL_FAST,
+            routes=ModelRouter.load_routes(Config.MODEL_ROUTES),
+            count_tokens=self.prompts.budgeter.count,
+            complex_tokens=Config.MODEL_COMPLEX_TOKENS,
+            hedge_after=Config.MODEL_HEDGE_AFTER,
+            hedge_seconds_per_token=Config.MODEL_HEDGE_SECONDS_PER_TOKEN,
+            request_timeout=Config.MODEL_REQUEST_TIMEOUT,
             temperature=temperature,
-            max_tokens=max_tokens,
-            #presence_penalty=0.5,
-            #frequency_penalty=0.5
+            hedge_workers=Config.MODEL_HEDGE_WORKERS,
+            enabled=Config.MODEL_ROUTING_ENABLED,
+            default_max_tokens=max_tokens,
+            # 헤지 호출도 동시 LLM 호출 한도 안에서만 보낸다
+            slots=llm_limiter if llm_limiter is not None and llm_limiter.enabled else None
         )
-        self.output_parser = StrOutputParser()
-        
-        '''
-        # 벡터 데이터베이스 로드
-        self.vectordb = Chroma(
-                    persist_directory=self.db_directory, 
-                    embedding_function=self.embedding
-                ).as_retriever()
-        '''
-    '''
-    def retrieve_relevant_text(self, content: str, num_results: int = 3) -> str:
+
+        # 비슷한 질문에 대한 답변 캐시
+        self.answer_cache = None
+        if Config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                embed_fn=self.embedding.embed_query,
+                similarity_threshold=Config.ANSWER_CACHE_SIMILARITY,
+                ttl_seconds=Config.ANSWER_CACHE_TTL,
+                max_entries=Config.ANSWER_CACHE_MAX_ENTRIES,
+                db_path=Config.ANSWER_CACHE_PATH or None
+            )
+
+        # 벡터 데이터베이스는 첫 검색 시 프로세스당 한 번만 로드
+        # 보조 인덱스도 CURRENT 버전의 것을 읽는다 (설정 경로는 버전 전환 이전 방식의 위치)
+        versions = IndexVersions(self.db_directory, local_root=Config.MMAP_INDEX_PATH)
+        self.vectordb = VectorStoreHandle(
+            self.db_directory,
+            self.embedding,
+            backend=Config.RETRIEVAL_BACKEND,
+            mmap_directory=Config.MMAP_INDEX_PATH,
+            versions=versions
+        )
+        self.retriever = Retriever(
+            self.vectordb,
+            self.embedding,
+            cache_size=Config.RETRIEVAL_CACHE_SIZE,
+            cache_ttl=Config.RETRIEVAL_CACHE_TTL,
+            lexical=LexicalIndexHandle(Config.LEXICAL_INDEX_PATH, versions=versions) if Config.HYBRID_ENABLED else None,
+            lexical_candidates=Config.LEXICAL_CANDIDATES,
+            rrf_k=Config.RRF_K,
+            confident_coverage=Config.LEXICAL_CONFIDENT_COVERAGE,
+            confident_margin=Config.LEXICAL_CONFIDENT_MARGIN
+        )
+
+    @property
+    def llm(self):
+        """라우팅을 거치지 않는 기본 모델"""
+        return self.router.client(self.model_name, self.max_tokens)
+
+    @property
+    def output_parser(self):
+        if self._output_parser is None:
+            from langchain_core.output_parsers import StrOutputParser
+            self._output_parser = StrOutputParser()
+        return self._output_parser
+
+    def warm_up(self):
+        """fork 전에 읽기 전용 상태(모듈, 프롬프트, 토크나이저, 인덱스)를 미리 로드
+
+        gunicorn --preload로 마스터 프로세스에서 호출하면 워커들이 copy-on-write로 공유한다.
+        네트워크 클라이언트(OpenAI, Chroma)는 여기서 만들지 않는다.
+        """
+        import langchain_openai  # noqa: F401
+        import langchain_community.callbacks.manager  # noqa: F401
+
+        self.prompts.warm_up()
+        if self.retriever.lexical is not None:
+            self.retriever.lexical.get()
+        if self.vectordb.backend == "mmap":
+            try:
+                self.vectordb.get()
+            except Exception as e:
+                logger.warning(f"메모리 매핑 인덱스 사전 로드 실패: {e}")
+
+    def retrieve_relevant_documents(self, content: str, num_results: int = 3, where: dict = None) -> list:
+        """벡터 데이터베이스에서 관련 문서를 관련도 순으로 검색 (where: 청크 메타데이터 필터, 예: {"source": "a.pdf"})"""
+        return self.retriever.retrieve(content, k=num_results, where=where)
+
+    def retrieve_relevant_text(self, content: str, num_results: int = 3, where: dict = None) -> str:
         """벡터 데이터베이스에서 관련 문서를 검색하여 반환"""
-        results = self.vectordb.get_relevant_documents(content)
         # 검색된 텍스트들을 연결하여 반환
-        relevant_texts = "\n".join([res.page_content for res in results[:num_results]])
-        return relevant_texts
-    '''
+        return "\n".join(self.retrieve_relevant_documents(content, num_results, where))
+
+    def prefetch_embeddings(self, contents: list):
+        """여러 질문의 임베딩을 한 번의 API 호출로 미리 계산 (답변 캐시와 검색이 캐시된 임베딩을 사용)"""
+        if not (Config.RETRIEVAL_ENABLED or self.answer_cache is not None):
+            return
+        contents = [content for content in contents if content]
+        if not contents:
+            return
+        try:
+            self.embedding.embed_queries(contents)
+        except Exception as e:
+            logger.warning(f"질문 임베딩 일괄 계산 실패, 질문별로 계산합니다: {e}")
+
+    def build_inputs(self, category: str, content: str, extra_data: dict, relevant_text=None) -> dict:
+        """관련 문서를 검색하여 토큰 예산에 맞춘 프롬프트 입력 변수 반환"""
+
+        label = category_label(category)
+
+        # 벡터 DB에서 관련 문서 검색 (검색 실패 시 참고 정보 없이 답변)
+        if relevant_text is None:
+            relevant_text = []
+            if Config.RETRIEVAL_ENABLED and content:
+                with metrics.STAGE_SECONDS.time(stage="retrieval", category=label):
+                    try:
+                        relevant_text = self.retrieve_relevant_documents(content, Config.RETRIEVAL_TOP_K)
+                    except Exception as e:
+                        logger.warning(f"벡터 DB 검색 실패: {e}")
+
+        # 토큰 예산에 맞춘 프롬프트 변수 생성
+        with metrics.STAGE_SECONDS.time(stage="prompt_build", category=label):
+            inputs = self.prompts.build_inputs(category, content, extra_data, relevant_text)
+        return inputs
+
+    def chain_for(self, category: str):
+        """LLM을 받아 카테고리별 체인(프롬프트 -> LLM -> 파서)을 반환하는 함수 (라우터가 모델을 고른다)"""
+        return lambda llm: self.prompts.get_chain(category, llm, self.output_parser)
+
+    def build_chain(self, category: str, content: str, extra_data: dict, relevant_text=None):
+        """기본 모델을 사용하는 카테고리별 체인과 입력 변수 반환"""
+        inputs = self.build_inputs(category, content, extra_data, relevant_text)
+        return self.chain_for(category)(self.llm), inputs
+
+    def get_cached_answer(self, category: str, content: str, extra_data: dict):
+        """캐시된 답변 조회 (캐시 오류는 미스로 처리)"""
+        if self.answer_cache is None:
+            return None
+        with metrics.STAGE_SECONDS.time(stage="cache_lookup", category=category_label(category)):
+            try:
+                return self.answer_cache.get(category, content, extra_data)
+            except Exception as e:
+                logger.warning(f"답변 캐시 조회 실패: {e}")
+                return None
+
+    @staticmethod
+    def _slot_timeout(timeout: float = None):
+        # 접수된 작업은 기본적으로 슬롯이 날 때까지 기다린다 (LLM_SLOT_TIMEOUT이 0이면 제한 없음)
+        if timeout is None:
+            timeout = Config.LLM_SLOT_TIMEOUT
+        return timeout or None
+
+    def llm_slot(self, timeout: float = None):
+        if self.llm_limiter is None:
+            return nullcontext()
+        return self.llm_limiter.llm_slot(self._slot_timeout(timeout))
+
+    def allm_slot(self, timeout: float = None):
+        if self.llm_limiter is None:
+            return nullcontext()
+        return self.llm_limiter.allm_slot(self._slot_timeout(timeout))
+
+    def record_usage(self, category: str, cb, model: str = None):
+        """get_openai_callback으로 집계한 토큰 사용량과 비용 기록"""
+        label = category_label(category)
+        model = model or self.model_name
+        metrics.LLM_TOKENS.inc(cb.prompt_tokens, category=label, model=model, type="prompt")
+        metrics.LLM_TOKENS.inc(cb.completion_tokens, category=label, model=model, type="completion")
+        metrics.LLM_COST.inc(cb.total_cost, category=label, model=model)
+
+    def cache_answer(self, category: str, content: str, extra_data: dict, answer: str):
+        if self.answer_cache is None or not answer:
+            return
+        try:
+            self.answer_cache.put(category, content, extra_data, answer)
+        except Exception as e:
+            logger.warning(f"답변 캐시 저장 실패: {e}")
 
     def qacall(self, category: str, content: str, extra_data: dict):
         """질의응답 실행"""
+        label = category_label(category)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            cached_answer = self.get_cached_answer(category, content, extra_data)
+            if cached_answer is not None:
+                status = "cached"
+                return cached_answer
+
+            route = self.router.route(category, content, extra_data)
+            inputs = self.build_inputs(category, content, extra_data)
+
+            # 경로에 따라 고른 모델로 LLM 응답 생성 (느리면 헤지, 실패하면 백업 모델로 대체)
+            with self.llm_slot(), metrics.STAGE_SECONDS.time(stage="llm", category=label):
+                llm_response = self.router.invoke(
+                    route, self.chain_for(category), inputs,
+                    on_usage=lambda model, cb: self.record_usage(category, cb, model)
+                )
+
+            self.cache_answer(category, content, extra_data, llm_response)
+            status = "ok"
+            return llm_response
+        finally:
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, mode="sync", category=label, status=status)
+
+    async def aqacall(self, category: str, content: str, extra_data: dict):
+        """질의응답 비동기 실행 (LLM 응답을 기다리는 동안 이벤트 루프를 다른 요청에 양보)"""
+        label = category_label(category)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            # 캐시 조회와 문서 검색은 동기 I/O이므로 스레드에서 실행
+            cached_answer = await asyncio.to_thread(self.get_cached_answer, category, content, extra_data)
+            if cached_answer is not None:
+                status = "cached"
+                return cached_answer
+
+            route = self.router.route(category, content, extra_data)
+            inputs = await asyncio.to_thread(self.build_inputs, category, content, extra_data)
 
-        # 벡터 DB에서 관련 문서 검색
-        #relevant_text = self.retrieve_relevant_text(content)
+            async with self.allm_slot():
+                with metrics.STAGE_SECONDS.time(stage="llm", category=label):
+                    llm_response = await self.router.ainvoke(
+                        route, self.chain_for(category), inputs,
+                        on_usage=lambda model, cb: self.record_usage(category, cb, model)
+                    )
 
-        # 검색된 내용을 바탕으로 프롬프트 생성
-        #prompt_text = create_prompt(category, content, extra_data, relevant_text)
-        prompt_text = create_prompt(category, content, extra_data)
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", prompt_text)
-        ])
+            await asyncio.to_thread(self.cache_answer, category, content, extra_data, llm_response)
+            status = "ok"
+            return llm_response
+        finally:
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, mode="async", category=label, status=status)
 
-        # 체인 생성: 프롬프트 -> LLM -> 파서
-        qa_chain = prompt | self.llm | self.output_parser
+    def qacall_stream(self, category: str, content: str, extra_data: dict):
+        """질의응답 스트리밍 실행 (생성되는 토큰을 순서대로 yield)"""
+        label = category_label(category)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            cached_answer = self.get_cached_answer(category, content, extra_data)
+            if cached_answer is not None:
+                status = "cached"
+                yield cached_answer
+                return
 
-        # 체인을 통해 LLM 응답 생성
-        with get_openai_callback() as cb:
-            llm_response = qa_chain.invoke({"user_input": content})
+            route = self.router.route(category, content, extra_data)
+            inputs = self.build_inputs(category, content, extra_data)
+            chunks = []
+            model = route.model
+            llm_started = time.perf_counter()
+            with self.llm_slot(Config.LLM_STREAM_SLOT_TIMEOUT), get_openai_callback() as cb:
+                for model, chunk in self.router.stream(route, self.chain_for(category), inputs):
+                    if chunk:
+                        if not chunks:
+                            metrics.STAGE_SECONDS.observe(
+                                time.perf_counter() - llm_started, stage="llm_first_token", category=label
+                            )
+                        chunks.append(chunk)
+                        yield chunk
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - llm_started, stage="llm", category=label)
+            # 스트리밍 응답에는 사용량이 포함되지 않으므로 토큰 수는 직접 센다
+            if not cb.total_tokens:
+                cb.prompt_tokens = self.prompts.count_tokens(category, inputs)
+                cb.completion_tokens = self.prompts.budgeter.count("".join(chunks))
+                from langchain_community.callbacks.openai_info import get_openai_token_cost_for_model
+                try:
+                    cb.total_cost = (
+                        get_openai_token_cost_for_model(model, cb.prompt_tokens)
+                        + get_openai_token_cost_for_model(model, cb.completion_tokens, is_completion=True)
+                    )
+                except ValueError:
+                    pass
+            self.router.record_usage(route, model, cb, lambda model, cb: self.record_usage(category, cb, model))
 
-        # 응답 및 토큰 사용량 정보 반환
-        return llm_response
+            self.cache_answer(category, content, extra_data, "".join(chunks))
+            status = "ok"
+        finally:
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, mode="stream", category=label, status=status)
 
 if __name__ == "__main__":
     model = QAService().qacall("노하우","새로운 정식 메뉴에 반찬으로 수육을 내려고 하는데요\n\n직접 삶아서 갓 먹으면 부들부들한데\n좀만 시간 지나도 좀 거무잡잡해지고 퍽퍽해지더라구요\n그렇다고 손님 올 때마다 삶을 수도 없고..\n\n근데 주변 프랜차이즈 보쌈집에서 시켜 먹으면.\n촉촉하고 부드럽더라고요\n\n장사가 잘 되는 집이면 회전이 잘 되겠거니 하는데\n리뷰가 그렇게 많지 않은 신생 프랜차이즈 보쌈수육집도 무슨\n부드럽고 맛있더라구요??\n\n제가 주문하자마자 삶았을 리는 없을텐데요 ..\n\n납품받은 거 살짝 쪄서 내는 것보단\n직접 하는게 나을 것 같은데\n어떻게 퀄리티를 유지하는지 꿀팁 좀 얻을 수 있을까요?\n\n아니면 프랜차이즈에서 쓰는 보쌈수육을 좀 발주해서 쓰고 싶습니다",{
@@ -0,0 +1,173 @@
+import fcntl
+import logging
+import os
+import time
+import uuid
+
+from app.services.index_versions import LEXICAL_INDEX_FILENAME, IndexVersions
+from app.services.job_service import JobQueue, JobStore, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+JOB_KIND = "rebuild"
+LOCK_FILENAME = ".rebuild.lock"
+
+
+class RebuildInProgressError(Exception):
+    """이미 벡터 DB 재구축이 진행 중일 때 발생하는 예외."""
+
+
+class RebuildLock:
+    """여러 gunicorn 워커/컨테이너 중 한 곳에서만 재구축하도록 하는 파일 잠금.
+
+    프로세스가 죽으면 운영체제가 잠금을 풀어 주므로 남은 잠금 때문에 재구축이 막히지 않는다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a")
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def is_locked(self) -> bool:
+        # 잠금을 쥔 파일 객체와 별도로 열어 확인 (flock은 열린 파일 단위로 충돌한다)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return False
+
+
+class RebuildService:
+    """벡터 DB 재구축을 백그라운드 작업으로 실행하는 클래스.
+
+    새 버전 디렉토리에 현재 버전을 복사한 뒤 증분 인덱싱하고, 같은 디렉토리에 BM25 인덱스,
+    로컬 디스크(MMAP_INDEX_PATH/<버전>)에 mmap 인덱스까지 만든 다음 CURRENT 포인터를 교체한다. 검색은 전환 전까지 기존 버전을 그대로 사용하므로
+    재구축 중에도 멈추거나 만들다 만 인덱스를 보지 않는다.
+    """
+
+    def __init__(self, config, store: JobStore, versions: IndexVersions = None, progress_interval: float = 2.0):
+        self.config = config
+        self.store = store
+        self.versions = versions or IndexVersions(
+            config.VECTOR_DB_PATH, keep=config.INDEX_KEEP_VERSIONS, local_root=config.MMAP_INDEX_PATH
+        )
+        self.progress_interval = progress_interval
+        self.lock = RebuildLock(os.path.join(self.versions.root, LOCK_FILENAME))
+        # 재구축은 한 번에 하나만 실행
+        self.queue = JobQueue(store, num_workers=1, max_queue_size=1)
+
+    def start(self, options: dict = None) -> str:
+        """재구축 작업을 등록하고 작업 ID를 반환"""
+        if self.lock.is_locked():
+            raise RebuildInProgressError("벡터 DB 재구축이 이미 진행 중입니다.")
+        job_id = uuid.uuid4().hex
+        try:
+            return self.queue.submit(JOB_KIND, self._run_job, job_id, payload=options or {}, job_id=job_id)
+        except QueueFullError:
+            raise RebuildInProgressError("벡터 DB 재구축이 이미 대기 중입니다.")
+
+    def status(self, job_id: str = None):
+        """작업 상태 (job_id가 없으면 가장 최근 재구축)와 현재 버전"""
+        job = self.store.get(job_id) if job_id else self.store.latest(JOB_KIND)
+        if job is None or job["kind"] != JOB_KIND:
+            return None
+        job["currentVersion"] = self.versions.current_version()
+        return job
+
+    def _run_job(self, job_id: str) -> dict:
+        last_report = [0.0]
+
+        def report(stage: str, force: bool = True, **details):
+            now = time.time()
+            if not force and now - last_report[0] < self.progress_interval:
+                return
+            last_report[0] = now
+            try:
+                self.store.set_progress(job_id, {"stage": stage, **details})
+            except Exception as e:
+                logger.warning(f"재구축 진행 상황 저장 실패: {job_id}, 오류 내용: {e}")
+
+        return self.rebuild(report)
+
+    def rebuild(self, report=None) -> dict:
+        """새 버전을 만들고 전환 (report(stage, force=True, **details)로 진행 상황 전달)"""
+        report = report or (lambda stage, force=True, **details: None)
+        if not self.lock.acquire():
+            raise RebuildInProgressError("벡터 DB 재구축이 이미 진행 중입니다.")
+        try:
+            return self._rebuild(report)
+        finally:
+            self.lock.release()
+
+    def _rebuild(self, report) -> dict:
+        from langchain_openai import OpenAIEmbeddings
+        from app.services.db_service import VectorDBSetup
+        from app.services.embedding_service import create_batched_embeddings
+        from app.services.ocr_service import create_ocr_stage
+
+        config = self.config
+        started = time.perf_counter()
+        report("prepare")
+        version, path = self.versions.create_version(copy_current=True)
+        logger.info(f"벡터 DB 재구축 시작: {version}")
+        ocr = create_ocr_stage(config)
+        try:
+            vector_db_setup = VectorDBSetup(
+                embedding=create_batched_embeddings(OpenAIEmbeddings()),
+                batch_size=config.INGEST_BATCH_SIZE,
+                max_pending_batches=config.INGEST_MAX_PENDING_BATCHES,
+                ocr=ocr,
+                dedupe_threshold=config.DEDUPE_THRESHOLD if config.DEDUPE_ENABLED else None,
+                extract_workers=config.PDF_WORKERS or os.cpu_count() or 1
+            )
+            report("ingest", version=version)
+            # PDF 페이지 -> 청크 -> 임베딩 -> 새 버전 디렉토리로 스트리밍
+            response = vector_db_setup.ingest(
+                db_directory=path,
+                pdf_dir=config.PDF_DIR_PATH,
+                txt_dir=config.TXT_DIR_PATH,
+                progress=lambda stats: report("ingest", force=False, version=version, **stats)
+            )
+            # 보조 인덱스도 같은 버전 이름으로 만들어 CURRENT 전환 시 Chroma와 함께 바뀌도록 한다
+            if config.HYBRID_ENABLED:
+                report("lexical_index", version=version)
+                response["lexical_index"] = vector_db_setup.build_lexical_index(
+                    path, os.path.join(path, LEXICAL_INDEX_FILENAME)
+                )
+            if config.RETRIEVAL_BACKEND == "mmap":
+                report("mmap_index", version=version)
+                response["mmap_index"] = vector_db_setup.build_mmap_index(path, self.versions.local_path(version))
+        except Exception:
+            self.versions.discard(version)
+            raise
+        finally:
+            if ocr is not None:
+                ocr.close()
+
+        report("activate", version=version)
+        self.versions.activate(version)
+        response["removed_versions"] = self.versions.gc()
+        response["version"] = version
+        response["total_seconds"] = time.perf_counter() - started
+        report("done", version=version)
+        logger.info(f"벡터 DB 재구축 완료: {version} ({response['total_seconds']:.1f}초)")
+        return response
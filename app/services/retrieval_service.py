@@ -0,0 +1,361 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+from app.services.cache_service import normalize_text
+from app.services.lexical_index import reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+
+# 청크 하나를 가리키는 메타데이터 키
+CHUNK_LOCATION_KEYS = ("source", "page", "start")
+
+
+def chroma_where(where: dict, canonical_metadatas: list = None) -> dict:
+    """{"source": "a.pdf", "page": [1, 2]} 형태의 필터를 Chroma where 조건으로 변환
+
+    canonical_metadatas가 있으면 해당 위치의 (근접 중복의 대표) 청크도 함께 일치시킨다.
+    """
+    conditions = [
+        {key: {"$in": list(value)} if isinstance(value, (list, tuple, set)) else value}
+        for key, value in where.items()
+    ]
+    condition = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+    locations = [
+        {"$and": [{key: metadata[key]} for key in CHUNK_LOCATION_KEYS]}
+        for metadata in canonical_metadatas or ()
+        if metadata and all(key in metadata for key in CHUNK_LOCATION_KEYS)
+    ]
+    return {"$or": [condition, *locations]} if locations else condition
+
+
+class LRUCache:
+    """스레드 안전한 LRU 캐시 (ttl_seconds가 있으면 만료 시간 적용)."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, stored_at = item
+                if self.ttl_seconds is None or time.time() - stored_at <= self.ttl_seconds:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """질문 임베딩을 LRU 캐시에 저장하는 임베딩 래퍼.
+
+    답변 캐시와 검색이 같은 질문을 임베딩하므로 API 호출은 질문당 한 번이면 된다.
+    """
+
+    def __init__(self, embedding: Embeddings = None, max_size: int = 1024, factory=None):
+        self._embedding = embedding
+        # factory가 있으면 내부 임베딩 클라이언트를 처음 사용할 때 프로세스마다 만든다
+        # (HTTP 커넥션 풀은 fork 후 공유하면 안 된다)
+        self.factory = factory
+        self._pid = None
+        self._lock = threading.Lock()
+        self.cache = LRUCache(max_size)
+
+    @property
+    def embedding(self) -> Embeddings:
+        if self.factory is not None and self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._embedding = self.factory()
+                    self._pid = os.getpid()
+        return self._embedding
+
+    def embed_documents(self, texts):
+        return self.embedding.embed_documents(texts)
+
+    def embed_query(self, text: str):
+        key = normalize_text(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embedding.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+    def embed_queries(self, texts: list) -> list:
+        """여러 질문을 캐시에 없는 것만 모아 한 번의 API 호출로 임베딩"""
+        keys = [normalize_text(text) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        missing = {}
+        for text, key, vector in zip(texts, keys, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            computed = dict(zip(missing, self.embedding.embed_documents(list(missing.values()))))
+            for key, vector in computed.items():
+                self.cache.put(key, vector)
+            vectors = [vector if vector is not None else computed[key] for key, vector in zip(keys, vectors)]
+        return vectors
+
+
+class VectorStoreHandle:
+    """프로세스당 한 번만 벡터 저장소를 여는 지연 로딩 핸들 (Chroma는 fork 이후 다시 열고, 메모리 매핑 인덱스는 공유한다).
+
+    backend가 "mmap"이면 Chroma 대신 로컬 디스크의 메모리 매핑 인덱스를 사용하며,
+    인덱스가 다시 만들어지면 refresh_interval마다 확인하여 새 인덱스로 바꾼다.
+    versions가 있으면 CURRENT 포인터가 가리키는 버전의 Chroma(또는 로컬 디스크의 같은 버전 mmap 인덱스)를 열고,
+    포인터가 바뀌면 새 버전으로 전환한다.
+    """
+
+    def __init__(self, db_directory: str, embedding: Embeddings, backend: str = "chroma",
+                 mmap_directory: str = None, refresh_interval: float = 5.0, versions=None):
+        self.db_directory = db_directory
+        self.embedding = embedding
+        self.backend = backend
+        self.mmap_directory = mmap_directory
+        self.versions = versions
+        self.refresh_interval = refresh_interval
+        self._store = None
+        self._pid = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        # 저장소를 새로 열 때마다 증가 (검색 결과 캐시 키에 포함)
+        self.generation = 0
+        self._duplicates = (None, {})
+
+    def _is_stale(self) -> bool:
+        # 읽기 전용 메모리 매핑은 fork 후에도 그대로 공유할 수 있지만 Chroma 클라이언트는 새로 연다
+        return self._store is None or (self._pid != os.getpid() and self.backend != "mmap")
+
+    def get(self):
+        refresh = self._needs_refresh()
+        if not self._is_stale() and not refresh:
+            return self._store
+        with self._lock:
+            if self._is_stale():
+                self._store = self._open()
+                self._pid = os.getpid()
+                self.generation += 1
+            elif refresh:
+                self._reload()
+        return self._store
+
+    def _mmap_path(self) -> str:
+        """현재 버전의 메모리 매핑 인덱스 디렉토리 (CURRENT가 없으면 mmap_directory)"""
+        if self.versions is None:
+            return self.mmap_directory
+        return self.versions.current_local_path(fallback=self.mmap_directory)
+
+    def _current_signature(self):
+        """인덱스가 새로 만들어졌는지 판단하는 값 (mmap 인덱스의 경로와 meta.json 수정 시각 또는 현재 버전 이름)"""
+        if self.backend != "mmap":
+            return self.versions.current_version() if self.versions is not None else None
+        from app.services.mmap_index import META_FILENAME
+        path = self._mmap_path()
+        try:
+            return path, os.stat(os.path.join(path, META_FILENAME)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _needs_refresh(self) -> bool:
+        if self.backend != "mmap" and self.versions is None:
+            return False
+        now = time.time()
+        if now - self._checked_at < self.refresh_interval:
+            return False
+        self._checked_at = now
+        signature = self._current_signature()
+        return signature is not None and signature != self._signature
+
+    def _reload(self):
+        try:
+            store = self._open()
+        except Exception as e:
+            # 교체 도중이면 기존 인덱스를 계속 사용
+            logger.warning(f"벡터 인덱스 갱신 실패, 기존 인덱스를 사용합니다: {e}")
+            return
+        self._store = store
+        self.generation += 1
+
+    def _open(self):
+        if self.backend == "mmap":
+            from app.services.mmap_index import MmapVectorIndex
+
+            signature = self._current_signature()
+            store = MmapVectorIndex.load(signature[0] if signature else self._mmap_path())
+            self._signature = signature
+            return store
+
+        from langchain_community.vectorstores import Chroma
+
+        if self._pid is not None and self._pid != os.getpid():
+            # 부모 프로세스에서 만든 chromadb 클라이언트 캐시는 자식에서 쓰지 않는다
+            try:
+                from chromadb.api.client import SharedSystemClient
+                SharedSystemClient.clear_system_cache()
+            except Exception:
+                pass
+
+        signature = self._current_signature()
+        db_directory = self.versions.current_path() if self.versions is not None else self.db_directory
+        if not os.path.exists(db_directory):
+            raise FileNotFoundError(f"벡터 DB 디렉토리가 존재하지 않습니다: {db_directory}")
+
+        started = time.perf_counter()
+        store = Chroma(persist_directory=db_directory, embedding_function=self.embedding)
+        self._signature = signature
+        logger.info(f"벡터 DB 로드 완료: {db_directory} ({(time.perf_counter() - started) * 1000:.1f}ms)")
+        return store
+
+    def canonical_ids(self, sources) -> list:
+        """sources 문서의 근접 중복 청크가 대신 가리키는 대표 청크 ID 목록
+
+        중복 청크는 대표 청크(다른 문서일 수 있음)만 저장되므로 문서 필터로 검색할 때 함께 찾아야 한다.
+        매니페스트는 저장소를 새로 열 때(버전 전환 포함)만 다시 읽는다.
+        """
+        generation, duplicates = self._duplicates
+        if generation != self.generation:
+            from app.services.index_manifest import IndexManifest
+
+            db_directory = self.versions.current_path() if self.versions is not None else self.db_directory
+            duplicates = {}
+            for name, entry in IndexManifest.load(db_directory).files.items():
+                canonical = sorted({chunk[2] for chunk in entry["chunks"] if len(chunk) == 3})
+                if canonical:
+                    duplicates[name] = canonical
+            self._duplicates = (self.generation, duplicates)
+        if isinstance(sources, str):
+            sources = [sources]
+        return sorted({vector_id for source in sources for vector_id in duplicates.get(source, ())})
+
+    def reset(self):
+        with self._lock:
+            self._store = None
+            self._pid = None
+
+
+class Retriever:
+    """벡터 DB 검색 결과를 (질문, k) 단위로 메모이즈하는 검색기.
+
+    역색인(lexical)이 있으면 BM25 결과가 충분히 확실한 질문은 임베딩/벡터 검색 없이 답하고,
+    그렇지 않으면 벡터 결과와 BM25 결과를 reciprocal-rank fusion으로 합친다.
+    """
+
+    def __init__(self, handle: VectorStoreHandle, embedding: Embeddings, cache_size: int = 1024,
+                 cache_ttl: float = 600, lexical=None, lexical_candidates: int = 20, rrf_k: int = 60,
+                 confident_coverage: float = 0.8, confident_margin: float = 1.5):
+        self.handle = handle
+        self.embedding = embedding
+        self.cache = LRUCache(cache_size, ttl_seconds=cache_ttl)
+        self.lexical = lexical
+        self.lexical_candidates = lexical_candidates
+        self.rrf_k = rrf_k
+        self.confident_coverage = confident_coverage
+        self.confident_margin = confident_margin
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "total_ms": 0.0, "last_ms": 0.0, "lexical_only": 0, "hybrid": 0, "vector_only": 0}
+
+    def _lexical_is_confident(self, hits: list) -> bool:
+        """질의 토큰을 대부분 포함하고 2위와 점수 차가 충분한 문서가 있으면 BM25만으로 충분하다고 판단"""
+        _, top_score, coverage = hits[0]
+        if coverage < self.confident_coverage:
+            return False
+        return len(hits) == 1 or top_score >= self.confident_margin * hits[1][1]
+
+    def retrieve(self, query: str, k: int = 3, where: dict = None) -> list:
+        """관련도 순으로 정렬된 문서 본문 목록 반환
+
+        where가 있으면 청크 메타데이터(source, page 등)가 일치하는 문서만 벡터 검색한다.
+        역색인에는 메타데이터가 없으므로 이때는 BM25를 사용하지 않는다.
+        """
+        try:
+            store = self.handle.get()
+        except Exception as e:
+            # 벡터 DB가 없어도 역색인만으로 답할 수 있으면 사용
+            if self.lexical is None:
+                raise
+            store, store_error = None, e
+        lexical_index = self.lexical.get() if self.lexical is not None and not where else None
+        where_key = tuple(sorted((key, str(value)) for key, value in where.items())) if where else None
+        key = (normalize_text(query), k, where_key, self.handle.generation, id(lexical_index))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        lexical_hits = lexical_index.search(query, max(k, self.lexical_candidates)) if lexical_index else []
+        if lexical_hits and self._lexical_is_confident(lexical_hits):
+            mode = "lexical_only"
+            passages = [lexical_index.documents[doc_index] for doc_index, _, _ in lexical_hits[:k]]
+        else:
+            if store is None:
+                raise store_error
+            vector = self.embedding.embed_query(query)
+            search_kwargs = self._filter_kwargs(store, where) if where else {}
+            documents = store.similarity_search_by_vector(vector, k=k * 2 if lexical_hits else k, **search_kwargs)
+            vector_passages = [doc.page_content for doc in documents]
+            if lexical_hits:
+                mode = "hybrid"
+                lexical_passages = [lexical_index.documents[doc_index] for doc_index, _, _ in lexical_hits]
+                passages = reciprocal_rank_fusion([vector_passages, lexical_passages], self.rrf_k)[:k]
+            else:
+                mode = "vector_only"
+                passages = vector_passages[:k]
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.cache.put(key, passages)
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["total_ms"] += elapsed_ms
+            self.stats["last_ms"] = elapsed_ms
+            self.stats[mode] += 1
+        logger.debug(f"문서 검색({mode}) {len(passages)}건 ({elapsed_ms:.1f}ms)")
+        return passages
+
+    def _filter_kwargs(self, store, where: dict) -> dict:
+        """메타데이터 필터 검색 인자. 문서(source)로만 거를 때는 그 문서의 근접 중복이 가리키는 대표 청크도 포함"""
+        canonical = []
+        if set(where) == {"source"}:
+            try:
+                canonical = self.handle.canonical_ids(where["source"])
+            except Exception as e:
+                logger.warning(f"근접 중복 청크 조회 실패, 문서의 저장된 청크만 검색합니다: {e}")
+        if self.handle.backend == "mmap":
+            return {"filter": where, "ids": canonical}
+        metadatas = store.get(ids=canonical, include=["metadatas"])["metadatas"] if canonical else None
+        return {"filter": chroma_where(where, metadatas)}
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["avg_ms"] = stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0
+        stats["cache_hits"] = self.cache.hits
+        stats["cache_misses"] = self.cache.misses
+        return stats
@@ -0,0 +1,53 @@
+from asgiref.wsgi import WsgiToAsgi
+from main import create_app
+from app.routes import async_routes
+from utils.logging_utils import bind_request_id, reset_request_id
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def create_asgi_app():
+    """답변 생성 요청은 이벤트 루프에서 비동기로 처리하고, 나머지 경로는 기존 Flask 앱으로 전달하는 ASGI 앱.
+
+    실행 예: uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+    """
+    flask_app = WsgiToAsgi(create_app())
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    logger.info("ASGI 서버 시작")
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await async_routes.shutdown()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] != "http":
+            return await flask_app(scope, receive, send)
+
+        # 요청 ID는 컨텍스트 변수로 설정하여 이 요청에서 만든 비동기 작업과 Flask 라우트에도 이어진다
+        request_id, token = bind_request_id(async_routes.get_header(scope, "X-Request-ID"))
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if not any(name.lower() == b"x-request-id" for name, _ in headers):
+                    headers.append((b"x-request-id", request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if await async_routes.route(scope, receive, send_with_request_id):
+                return
+            await flask_app(scope, receive, send_with_request_id)
+        finally:
+            reset_request_id(token)
+
+    return app
+
+
+app = create_asgi_app()
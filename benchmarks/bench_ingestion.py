@@ -0,0 +1,128 @@
+"""PDF 텍스트 추출(ParallelPageExtractor)과 인덱싱(VectorDBSetup) 처리량 벤치마크.
+
+합성 한글 PDF를 만들어 텍스트 추출 속도(페이지/초)와 임베딩 포함 인덱싱 속도(청크/초)를 잰다.
+임베딩은 로컬 OpenAI 대역 서버를 사용하므로 외부 네트워크 없이 실행된다.
+
+사용법:
+    python -m benchmarks.bench_ingestion --pdfs 20 --pages 30 --embedding-ms 80 --output ingest.json
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import finish_report
+from benchmarks.stub_servers import OpenAIStubHandler, StubServer
+from config.config import Config
+
+SENTENCES = [
+    "매장 운영 시간은 상권의 유동 인구와 주변 직장인의 점심 시간을 고려해 정하는 것이 좋습니다.",
+    "식자재 원가율은 메뉴별로 따로 계산하고 매달 단가 변동을 확인해야 합니다.",
+    "근로계약서에는 근무 시간, 휴게 시간, 임금 지급일을 반드시 적어야 합니다.",
+    "배달 앱 리뷰에는 빠르게 답글을 달고 불만 사항은 개선 내용을 함께 안내합니다.",
+    "부가가치세 신고 기간을 놓치지 않도록 매출 자료를 분기마다 정리해 두세요.",
+    "임대차 계약 갱신 요구권은 계약 만료 6개월 전부터 1개월 전까지 행사할 수 있습니다.",
+    "신메뉴는 소량으로 먼저 판매해 보고 반응을 확인한 뒤 정식 메뉴로 올립니다.",
+    "위생 점검에 대비해 냉장고 온도 기록표와 유통기한 관리 대장을 비치합니다.",
+]
+
+
+def generate_pdfs(directory: str, count: int, pages: int, seed: int = 0) -> int:
+    """무작위 한글 문단으로 채운 PDF 생성 (PyMuPDF 내장 한글 글꼴 사용). 생성한 페이지 수 반환"""
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for n in range(count):
+        with fitz.open() as doc:
+            for page_no in range(pages):
+                page = doc.new_page()
+                paragraphs = [" ".join(rng.choices(SENTENCES, k=rng.randint(3, 6))) for _ in range(rng.randint(3, 6))]
+                text = f"문서 {n} - {page_no + 1}쪽\n\n" + "\n\n".join(paragraphs)
+                page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontname="korea", fontsize=10)
+            doc.save(os.path.join(directory, f"synthetic_{n:04d}.pdf"))
+    return count * pages
+
+
+def bench_extract(pdf_dir: str, pages: int, workers: int) -> dict:
+    """파이프라인과 같은 방식으로 모든 PDF의 페이지 텍스트를 읽는 데 걸리는 시간"""
+    from app.services.ingestion_service import ParallelPageExtractor, discover_sources
+
+    sources = discover_sources(pdf_dir)
+    extractor = ParallelPageExtractor(workers)
+    started = time.perf_counter()
+    chars = 0
+    try:
+        extractor.schedule(sources)
+        for source in sources:
+            chars += sum(len(text) for text in extractor.iter_pages(source))
+    finally:
+        extractor.close()
+    elapsed = time.perf_counter() - started
+    return {"workers": workers, "chars": chars, "seconds": elapsed, "pages_per_sec": pages / elapsed if elapsed else 0.0}
+
+
+def bench_ingest(pdf_dir: str, db_dir: str, openai_url: str, cache_path: str = None, workers: int = 0) -> dict:
+    from langchain_openai import OpenAIEmbeddings
+    from app.services.db_service import VectorDBSetup
+    from app.services.embedding_service import BatchedEmbeddings
+
+    embedding = BatchedEmbeddings(
+        # 오프라인에서는 tiktoken 인코딩을 받을 수 없으므로 문자열 그대로 보낸다
+        OpenAIEmbeddings(openai_api_base=f"{openai_url}/v1", openai_api_key="bench", check_embedding_ctx_length=False),
+        cache_path=cache_path,
+        batch_size=Config.EMBEDDING_BATCH_SIZE,
+        concurrency=Config.EMBEDDING_CONCURRENCY,
+        max_retries=Config.EMBEDDING_MAX_RETRIES
+    )
+    setup = VectorDBSetup(
+        embedding=embedding,
+        batch_size=Config.INGEST_BATCH_SIZE,
+        max_pending_batches=Config.INGEST_MAX_PENDING_BATCHES,
+        dedupe_threshold=Config.DEDUPE_THRESHOLD if Config.DEDUPE_ENABLED else None,
+        extract_workers=workers
+    )
+    return setup.ingest(db_directory=db_dir, pdf_dir=pdf_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 추출/인덱싱 벤치마크")
+    parser.add_argument("--pdfs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20, help="PDF당 페이지 수")
+    parser.add_argument("--workers", type=int, default=Config.PDF_WORKERS or os.cpu_count() or 1,
+                        help="PDF 텍스트 추출 프로세스 수")
+    parser.add_argument("--embedding-ms", type=float, default=50, help="임베딩 요청당 대역 서버 지연")
+    parser.add_argument("--embedding-item-ms", type=float, default=0.5, help="임베딩 입력 1건당 추가 지연")
+    parser.add_argument("--embedding-cache", action="store_true", help="임베딩 캐시 사용 (두 번째 실행은 캐시 적중)")
+    parser.add_argument("--skip-ingest", action="store_true", help="PDF 텍스트 추출만 측정")
+    parser.add_argument("--workdir", help="PDF/벡터 DB를 만들 디렉토리 (기본은 임시 디렉토리)")
+    parser.add_argument("--output", help="결과를 JSON으로 저장")
+    parser.add_argument("--baseline", help="이전 결과 JSON과 비교")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        pdf_dir = os.path.join(workdir, "pdf")
+        started = time.perf_counter()
+        pages = generate_pdfs(pdf_dir, args.pdfs, args.pages)
+        report = {
+            "pdfs": args.pdfs,
+            "pages": pages,
+            "generate_seconds": time.perf_counter() - started,
+            "extract": bench_extract(pdf_dir, pages, args.workers)
+        }
+
+        if not args.skip_ingest:
+            stub = StubServer(OpenAIStubHandler, embedding_ms=args.embedding_ms,
+                              embedding_item_ms=args.embedding_item_ms)
+            with stub:
+                cache_path = os.path.join(workdir, "embedding_cache.sqlite3") if args.embedding_cache else None
+                report["ingest"] = bench_ingest(pdf_dir, os.path.join(workdir, "vector_db"), stub.url, cache_path,
+                                                args.workers)
+                report["openai_stub"] = stub.stats.snapshot()
+    finish_report("ingestion", report, args.output, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""/<questionId>/answers 부하 테스트.
+
+동시에 여러 요청을 보내 처리량, 지연 시간 백분위수, 오류율을 측정한다.
+--launch를 주면 OpenAI/게시판 대역 서버와 앱(gunicorn 또는 uvicorn)을 직접 띄우므로 외부 네트워크 없이 실행된다.
+
+사용법:
+    python -m benchmarks.bench_load --launch --requests 200 --concurrency 20 --wait
+    python -m benchmarks.bench_load --launch --mode stream --output stream.json --baseline before.json
+    python -m benchmarks.bench_load --url http://localhost:5000 --token <token>
+"""
+import argparse
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app.services.prompt_service import PROMPT_TEMPLATES
+from benchmarks.common import finish_report, summarize_latencies
+from benchmarks.stub_servers import BoardStubHandler, OpenAIStubHandler, StubServer
+
+QUESTIONS = [
+    "새로운 정식 메뉴에 반찬으로 수육을 내려고 하는데 퀄리티를 유지하는 방법이 궁금합니다.",
+    "배달 리뷰에 악성 댓글이 달렸는데 어떻게 대응해야 할까요?",
+    "아르바이트생 주휴수당 계산 방법을 알려주세요.",
+    "점심 장사 회전율을 높이려면 메뉴 구성을 어떻게 바꿔야 할까요?",
+    "상가 임대차 계약 갱신 때 확인해야 할 사항이 있을까요?",
+]
+EXTRA_DATA = {
+    "bossType": "STORE_OWNER",
+    "businessType": "건강식 전문점",
+    "location": "서울 서초구",
+    "customerType": "30~50대 직장인",
+    "storeInfo": "월매출 2500",
+    "budget": "10만"
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def launch_app(server: str, port: int, env: dict) -> subprocess.Popen:
+    if server == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--log-level", "warning"]
+    else:
+        env = dict(env, GUNICORN_BIND=f"127.0.0.1:{port}")
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning"]
+    return subprocess.Popen(command, env=env)
+
+
+def wait_until_live(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"앱 프로세스가 종료되었습니다 (exit code {process.returncode})")
+        try:
+            if requests.get(f"{base_url}/livez", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"앱이 {timeout}초 안에 시작되지 않았습니다: {base_url}")
+
+
+class LoadGenerator:
+    """스레드 풀로 동시 요청을 보내고 요청별 결과를 모으는 클래스."""
+
+    def __init__(self, base_url: str, token: str, mode: str = "answers", wait: bool = False,
+                 wait_timeout: float = 120, run_id: str = None):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.mode = mode
+        self.wait = wait
+        self.wait_timeout = wait_timeout
+        # 이전 실행의 중복 요청 기록과 겹치지 않도록 실행마다 다른 질문 ID 사용
+        self.run_id = run_id or str(int(time.time()))
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["Authorization"] = self.token
+        return session
+
+    def payload(self, n: int) -> dict:
+        categories = list(PROMPT_TEMPLATES)
+        return {
+            "id": n,
+            "content": f"{QUESTIONS[n % len(QUESTIONS)]} (부하 테스트 {self.run_id}-{n})",
+            "category": categories[n % len(categories)],
+            "extraData": EXTRA_DATA
+        }
+
+    def one(self, _=None) -> dict:
+        n = next(self._ids)
+        question_id = int(f"{self.run_id[-6:]}{n:06d}")
+        started = time.perf_counter()
+        try:
+            if self.mode == "stream":
+                return self._stream(question_id, n, started)
+            return self._answer(question_id, n, started)
+        except requests.RequestException as e:
+            return {"status": type(e).__name__, "ok": False, "latency_ms": (time.perf_counter() - started) * 1000}
+
+    def _answer(self, question_id: int, n: int, started: float) -> dict:
+        response = self.session().post(f"{self.base_url}/{question_id}/answers", json=self.payload(n), timeout=30)
+        result = {"status": response.status_code, "ok": response.status_code == 202,
+                  "latency_ms": (time.perf_counter() - started) * 1000}
+        if result["ok"] and self.wait:
+            job = self._wait_job(response.json()["statusUrl"])
+            result["job_status"] = job.get("status", "timeout")
+            result["ok"] = result["job_status"] == "succeeded"
+            result["end_to_end_ms"] = (time.perf_counter() - started) * 1000
+        return result
+
+    def _wait_job(self, status_url: str) -> dict:
+        deadline = time.time() + self.wait_timeout
+        while time.time() < deadline:
+            job = self.session().get(f"{self.base_url}{status_url}", timeout=10).json()
+            if job.get("status") in ("succeeded", "failed"):
+                return job
+            time.sleep(0.1)
+        return {}
+
+    def _stream(self, question_id: int, n: int, started: float) -> dict:
+        response = self.session().post(
+            f"{self.base_url}/{question_id}/answers/stream", json=self.payload(n), stream=True, timeout=120
+        )
+        result = {"status": response.status_code, "ok": response.status_code == 200}
+        first_token_ms = None
+        event = None
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    if event == "token" and first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                    elif event == "error":
+                        result["ok"] = False
+                        result["status"] = "sse_error"
+        result["latency_ms"] = (time.perf_counter() - started) * 1000
+        if first_token_ms is not None:
+            result["first_token_ms"] = first_token_ms
+        return result
+
+    def run(self, total: int, concurrency: int) -> dict:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(self.one, range(total)))
+        elapsed = time.perf_counter() - started
+
+        statuses = Counter(str(result.get("job_status") or result["status"]) for result in results)
+        errors = sum(1 for result in results if not result["ok"])
+        report = {
+            "mode": self.mode,
+            "requests": total,
+            "concurrency": concurrency,
+            "seconds": elapsed,
+            "throughput_rps": total / elapsed if elapsed else 0.0,
+            "error_rate": errors / total if total else 0.0,
+            "statuses": dict(statuses),
+            "latency": summarize_latencies(result["latency_ms"] for result in results)
+        }
+        for key in ("first_token_ms", "end_to_end_ms"):
+            values = [result[key] for result in results if key in result]
+            if values:
+                report[key[:-len("_ms")]] = summarize_latencies(values)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="답변 API 부하 테스트")
+    parser.add_argument("--url", help="대상 앱 주소 (생략하고 --launch 사용 가능)")
+    parser.add_argument("--token", default="Bearer load-test")
+    parser.add_argument("--mode", choices=["answers", "stream"], default="answers")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--wait", action="store_true", help="작업 완료까지 기다려 전체 처리 시간도 측정")
+    parser.add_argument("--launch", action="store_true", help="대역 서버와 앱을 직접 실행")
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn")
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--board-error-rate", type=float, default=0.0)
+    parser.add_argument("--retrieval", action="store_true", help="벡터 DB 검색과 답변 캐시도 사용 (--launch 시)")
+    parser.add_argument("--output", help="결과를 JSON으로 저장")
+    parser.add_argument("--baseline", help="이전 결과 JSON과 비교")
+    args = parser.parse_args()
+
+    if not args.launch:
+        if not args.url:
+            parser.error("--url 또는 --launch가 필요합니다.")
+        report = LoadGenerator(args.url, args.token, args.mode, args.wait).run(args.requests, args.concurrency)
+        return finish_report("load", report, args.output, args.baseline)
+
+    openai_stub = StubServer(OpenAIStubHandler, first_token_ms=args.first_token_ms, token_ms=args.token_ms,
+                             error_rate=args.openai_error_rate)
+    board_stub = StubServer(BoardStubHandler, error_rate=args.board_error_rate)
+    with openai_stub, board_stub, tempfile.TemporaryDirectory() as state_dir:
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY="load-test",
+            OPENAI_API_BASE=f"{openai_stub.url}/v1",
+            OPENAI_BASE_URL=f"{openai_stub.url}/v1",
+            TARGET_SERVER_URL=f"{board_stub.url}/questions",
+            STATE_DIR=state_dir,
+            ADMISSION_ENABLED="false",
+            DELIVERY_POLL_INTERVAL="0.5"
+        )
+        if not args.retrieval:
+            env.update(RETRIEVAL_ENABLED="false", ANSWER_CACHE_ENABLED="false")
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = launch_app(args.server, port, env)
+        try:
+            wait_until_live(base_url, process)
+            report = LoadGenerator(base_url, args.token, args.mode, args.wait).run(args.requests, args.concurrency)
+            # 전송이 끝날 때까지 잠시 기다린 뒤 콜백 수신 현황 기록
+            time.sleep(1)
+            report["server"] = args.server
+            report["openai_stub"] = openai_stub.stats.snapshot()
+            report["board_stub"] = board_stub.stats.snapshot()
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    finish_report("load", report, args.output, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
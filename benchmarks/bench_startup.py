@@ -0,0 +1,87 @@
+"""앱 임포트와 시작 시간 벤치마크.
+
+매번 새 인터프리터에서 main 임포트, create_app(), 사전 로드(warm_up) 시간을 재고,
+임포트 직후 이미 로드된 무거운 모듈과 -X importtime 기준으로 오래 걸린 모듈을 보여준다.
+
+사용법:
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import print_report, summarize_latencies
+
+# 요청을 처리할 때 처음 필요해지도록 지연 임포트하는 모듈
+HEAVY_MODULES = ["langchain_openai", "langchain_community", "chromadb", "tiktoken", "fitz", "openai"]
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+sample = {{
+    "import_ms": (imported - started) * 1000,
+    "heavy_loaded_after_import": [name for name in {heavy!r} if name in sys.modules],
+}}
+if {create_app!r}:
+    main.create_app(preload=True)
+    sample["create_app_ms"] = (time.perf_counter() - imported) * 1000
+print(json.dumps(sample))
+"""
+
+
+def run_child(code: str, env: dict, extra_args=()) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", code],
+        env=env, capture_output=True, text=True, check=True
+    )
+
+
+def top_imports(env: dict, top: int) -> list:
+    """-X importtime 출력에서 누적 임포트 시간이 긴 최상위 패키지"""
+    result = run_child("import main", env, ["-X", "importtime"])
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+            cumulative = int(cumulative)
+        except ValueError:
+            continue
+        package = name.split(".")[0]
+        totals[package] = max(totals.get(package, 0), cumulative)
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"module": name, "cumulative_ms": us / 1000} for name, us in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="앱 임포트/시작 시간 벤치마크")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="-X importtime 상위 모듈 수")
+    parser.add_argument("--import-only", action="store_true", help="create_app()과 사전 로드는 측정하지 않음")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    env.setdefault("OPENAI_API_KEY", "bench")
+
+    code = CHILD.format(heavy=HEAVY_MODULES, create_app=not args.import_only)
+    samples = [json.loads(run_child(code, env).stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "import": summarize_latencies(sample["import_ms"] for sample in samples),
+        "heavy_loaded_after_import": samples[-1]["heavy_loaded_after_import"],
+    }
+    if not args.import_only:
+        report["create_app_with_preload"] = summarize_latencies(sample["create_app_ms"] for sample in samples)
+    print_report("startup", report)
+    print_report("slowest imports", top_imports(env, args.top))
+
+
+if __name__ == "__main__":
+    main()
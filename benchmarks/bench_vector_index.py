@@ -0,0 +1,75 @@
+"""Chroma와 메모리 매핑 인덱스의 검색 지연 시간 비교 벤치마크.
+
+사용법:
+    python -m benchmarks.bench_vector_index --build --queries 200 --k 3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.index_versions import IndexVersions
+from app.services.mmap_index import MmapVectorIndex
+from benchmarks.common import print_report, summarize_latencies
+from config.config import Config
+
+
+def sample_queries(index: MmapVectorIndex, count: int, noise: float = 0.05, seed: int = 0):
+    """인덱스의 벡터에 잡음을 섞어 실제 질문과 비슷한 분포의 질의 벡터 생성"""
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(index), size=count)
+    queries = np.asarray(index.vectors[rows], dtype=np.float32)
+    queries += rng.normal(0, noise, size=queries.shape).astype(np.float32)
+    return queries
+
+
+def time_searches(search, queries, k: int) -> list:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        search(query.tolist(), k)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma vs 메모리 매핑 인덱스 검색 벤치마크")
+    # 기본값은 CURRENT 포인터가 가리키는 버전의 Chroma와 메모리 매핑 인덱스
+    versions = IndexVersions(Config.VECTOR_DB_PATH, local_root=Config.MMAP_INDEX_PATH)
+    parser.add_argument("--db", default=versions.current_path(), help="Chroma persist 디렉토리")
+    parser.add_argument("--index", default=versions.current_local_path(fallback=Config.MMAP_INDEX_PATH),
+                        help="메모리 매핑 인덱스 디렉토리")
+    parser.add_argument("--build", action="store_true",
+                        help="Chroma에서 임시 디렉토리로 인덱스를 새로 내보낸 뒤 측정 (사용 중인 인덱스는 건드리지 않음)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import Chroma
+    chroma = Chroma(persist_directory=args.db)
+
+    if args.build:
+        args.index = os.path.join(tempfile.mkdtemp(prefix="bench_mmap_"), "mmap_index")
+        print_report("index build", MmapVectorIndex.build_from_chroma(chroma._collection, args.index))
+
+    index = MmapVectorIndex.load(args.index)
+    if len(index) == 0:
+        print("인덱스가 비어 있습니다.")
+        return
+    queries = sample_queries(index, args.queries)
+
+    # 첫 호출의 로딩 비용은 제외
+    chroma.similarity_search_by_vector(queries[0].tolist(), k=args.k)
+    index.search(queries[0], args.k)
+
+    chroma_latencies = time_searches(lambda q, k: chroma.similarity_search_by_vector(q, k=k), queries, args.k)
+    mmap_latencies = time_searches(lambda q, k: index.similarity_search_by_vector(q, k=k), queries, args.k)
+
+    print_report("chroma", summarize_latencies(chroma_latencies))
+    print_report("mmap", summarize_latencies(mmap_latencies))
+
+
+if __name__ == "__main__":
+    main()
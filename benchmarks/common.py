@@ -0,0 +1,71 @@
+import json
+import math
+
+
+def percentile(values, pct: float) -> float:
+    """정렬 후 선형 보간으로 백분위수 계산"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(latencies_ms) -> dict:
+    """지연 시간(ms) 목록의 요약 통계"""
+    latencies_ms = list(latencies_ms)
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": sum(latencies_ms) / len(latencies_ms) if latencies_ms else 0.0,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "max_ms": max(latencies_ms) if latencies_ms else 0.0
+    }
+
+
+def print_report(title: str, report: dict):
+    print(f"== {title}")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def _flatten(report, prefix: str = "") -> dict:
+    values = {}
+    if isinstance(report, dict):
+        for key, value in report.items():
+            values.update(_flatten(value, f"{prefix}{key}."))
+    elif isinstance(report, (int, float)) and not isinstance(report, bool):
+        values[prefix[:-1]] = report
+    return values
+
+
+def save_report(path: str, report: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def compare_reports(baseline: dict, current: dict) -> dict:
+    """두 실행 결과의 숫자 항목별 변화율(%) (회귀 비교용)"""
+    before, after = _flatten(baseline), _flatten(current)
+    changes = {}
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        changes[key] = {
+            "baseline": old,
+            "current": new,
+            "change_pct": (new - old) / old * 100 if old else None
+        }
+    return changes
+
+
+def finish_report(title: str, report: dict, output: str = None, baseline: str = None):
+    """결과 출력, 저장(output), 이전 결과(baseline)와 비교"""
+    print_report(title, report)
+    if output:
+        save_report(output, report)
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            print_report(f"{title} vs {baseline}", compare_reports(json.load(f), report))
@@ -0,0 +1,277 @@
+"""오프라인 벤치마크용 OpenAI / 게시판 콜백 서버 대역.
+
+OpenAI 대역은 /v1/chat/completions(스트리밍 포함)와 /v1/embeddings를 흉내 내며 지연 시간과
+오류 비율을 설정할 수 있다. 게시판 대역은 POST .../<id>/answers 콜백을 받아 기록한다.
+두 서버 모두 GET /stats로 요청 수를 돌려준다.
+
+사용법:
+    python -m benchmarks.stub_servers --openai-port 8100 --board-port 8200 --first-token-ms 300
+
+앱을 대역에 연결하려면:
+    OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_BASE_URL=http://127.0.0.1:8100/v1 \\
+    TARGET_SERVER_URL=http://127.0.0.1:8200/questions gunicorn -c gunicorn.conf.py
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER_TEXT = (
+    "말씀하신 상황에서는 먼저 재료 보관 방법과 조리 시간을 점검해 보시는 것이 좋습니다. "
+    "수육은 삶은 뒤 육수에 담가 두면 촉촉함이 오래 유지되고, 주문이 들어오면 짧게 데워 내면 됩니다. "
+    "원가와 인력 상황에 따라 반조리 제품을 함께 검토해 보시고, 자세한 내용은 전문가와 상담해 보시길 권합니다."
+)
+ANSWER_PATH = re.compile(r".*/(\d+)/answers$")
+
+
+class StubServer:
+    """백그라운드 스레드에서 실행되는 HTTP 서버 (with 문 또는 start/stop으로 사용)."""
+
+    def __init__(self, handler_class, host: str = "127.0.0.1", port: int = 0, **options):
+        handler = type(handler_class.__name__, (handler_class,), {"options": options, "stats": _Stats()})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.stats = handler.stats
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def incr(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    options = {}
+    stats = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body or b"null")
+
+    def send_json(self, status: int, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def maybe_fail(self, kind: str) -> bool:
+        """설정한 비율로 오류 응답 (429와 500을 번갈아)"""
+        if random.random() >= self.options.get("error_rate", 0.0):
+            return False
+        status = random.choice((429, 500))
+        self.stats.incr(f"{kind}_error_{status}")
+        self.send_json(status, {"error": {"message": "stub error", "type": "server_error", "code": status}})
+        return True
+
+    def do_GET(self):
+        if self.path == "/stats":
+            return self.send_json(200, self.stats.snapshot())
+        self.send_json(404, {"error": "not found"})
+
+
+def fake_embedding(item, dimensions: int) -> list:
+    """입력마다 항상 같은 단위 벡터 (문자열 또는 토큰 ID 목록 모두 허용)"""
+    seed = hashlib.sha256(json.dumps(item, ensure_ascii=False).encode("utf-8")).digest()
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class OpenAIStubHandler(_Handler):
+    """OpenAI chat/embedding API 대역.
+
+    options: first_token_ms, token_ms, embedding_ms, embedding_item_ms, dimensions, error_rate
+    """
+
+    def do_POST(self):
+        body = self.read_json() or {}
+        if self.path.endswith("/chat/completions"):
+            if self.maybe_fail("chat"):
+                return
+            return self.chat(body)
+        if self.path.endswith("/embeddings"):
+            if self.maybe_fail("embeddings"):
+                return
+            return self.embeddings(body)
+        self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def chat(self, body: dict):
+        model = body.get("model", "gpt-4")
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in body.get("messages", []))
+        tokens = re.findall(r"\S+\s*", ANSWER_TEXT)
+        first_token = self.options.get("first_token_ms", 300) / 1000
+        per_token = self.options.get("token_ms", 20) / 1000
+        created = int(time.time())
+        completion_id = f"chatcmpl-stub-{created}"
+
+        if not body.get("stream"):
+            self.stats.incr("chat")
+            time.sleep(first_token + per_token * len(tokens))
+            return self.send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(tokens),
+                    "total_tokens": prompt_tokens + len(tokens)
+                }
+            })
+
+        self.stats.incr("chat_stream")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        time.sleep(first_token)
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(per_token)
+            delta = {"role": "assistant", "content": token} if index == 0 else {"content": token}
+            self._send_event({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+            })
+        self._send_event({
+            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        })
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_event(self, chunk: dict):
+        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def embeddings(self, body: dict):
+        items = body.get("input")
+        if isinstance(items, str) or (items and isinstance(items[0], int)):
+            items = [items]
+        items = items or []
+        self.stats.incr("embeddings")
+        self.stats.incr("embedding_items", len(items))
+        time.sleep(self.options.get("embedding_ms", 50) / 1000
+                   + self.options.get("embedding_item_ms", 0.5) / 1000 * len(items))
+
+        dimensions = body.get("dimensions") or self.options.get("dimensions", 1536)
+        data = []
+        for index, item in enumerate(items):
+            vector = fake_embedding(item, dimensions)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        tokens = sum(len(item) for item in items)
+        self.send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+
+class BoardStubHandler(_Handler):
+    """게시판 답변 콜백 서버 대역 (POST .../<id>/answers). options: latency_ms, error_rate"""
+
+    def do_POST(self):
+        match = ANSWER_PATH.match(self.path)
+        if match is None:
+            return self.send_json(404, {"error": "not found"})
+        body = self.read_json() or {}
+        time.sleep(self.options.get("latency_ms", 20) / 1000)
+        if random.random() < self.options.get("error_rate", 0.0):
+            self.stats.incr("answers_error_503")
+            return self.send_json(503, {"error": "stub unavailable"})
+        self.stats.incr("answers")
+        if not body.get("answer"):
+            self.stats.incr("answers_empty")
+        self.send_json(200, {"questionId": int(match.group(1)), "received": True})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI / 게시판 콜백 서버 대역 실행")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--openai-port", type=int, default=8100)
+    parser.add_argument("--board-port", type=int, default=8200)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--embedding-ms", type=float, default=50)
+    parser.add_argument("--embedding-item-ms", type=float, default=0.5)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--board-latency-ms", type=float, default=20)
+    parser.add_argument("--board-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    openai_stub = StubServer(
+        OpenAIStubHandler, args.host, args.openai_port,
+        first_token_ms=args.first_token_ms, token_ms=args.token_ms, embedding_ms=args.embedding_ms,
+        embedding_item_ms=args.embedding_item_ms, dimensions=args.dimensions, error_rate=args.openai_error_rate
+    )
+    board_stub = StubServer(
+        BoardStubHandler, args.host, args.board_port,
+        latency_ms=args.board_latency_ms, error_rate=args.board_error_rate
+    )
+    with openai_stub, board_stub:
+        print(f"OpenAI 대역: {openai_stub.url}/v1")
+        print(f"게시판 대역: {board_stub.url}/questions")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
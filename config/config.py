@@ -4,15 +4,157 @@ import os
 load_dotenv()
 
 class Config:
-    '''
-    VECTOR_DB_PATH = 'data/vector_db'
-    TXT_DIR_PATH = 'data/txt'
-    PDF_DIR_PATH = 'data/pdf'
-    '''
+    VECTOR_DB_PATH = os.getenv('VECTOR_DB_PATH', 'data/vector_db')
+    TXT_DIR_PATH = os.getenv('TXT_DIR_PATH', 'data/txt')
+    PDF_DIR_PATH = os.getenv('PDF_DIR_PATH', 'data/pdf')
+    # PDF 추출 프로세스 수 (0이면 CPU 코어 수)
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', '0'))
     BASE_TARGET_URL = os.getenv('TARGET_SERVER_URL', 'https://dev.teacherforboss.store/board/teacher/questions')
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     DEBUG_MODE = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
 
+    # 로깅 설정 (큐 기반 비동기 출력, json 또는 text 형식)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    LOG_MAX_MESSAGE_CHARS = int(os.getenv('LOG_MAX_MESSAGE_CHARS', '2000'))
+    # 로거별 초당 기록 수 제한 (ERROR 이상은 제한하지 않음, 0이면 제한 없음)
+    LOG_RATE_PER_SECOND = float(os.getenv('LOG_RATE_PER_SECOND', '20'))
+    LOG_RATE_BURST = int(os.getenv('LOG_RATE_BURST', '100'))
+    # INFO 이하 요청 로그를 남길 요청 비율 (1이면 모두 기록)
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+
+    # 런타임 상태(작업 기록 등)를 저장하는 디렉토리
+    STATE_DIR = os.getenv('STATE_DIR', 'data/state')
+
+    # 답변 생성 작업 워커 풀 설정
+    ANSWER_WORKERS = int(os.getenv('ANSWER_WORKERS', '8'))
+    ANSWER_QUEUE_SIZE = int(os.getenv('ANSWER_QUEUE_SIZE', '100'))
+    JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(STATE_DIR, 'jobs.sqlite3'))
+    JOB_TTL_SECONDS = int(os.getenv('JOB_TTL_SECONDS', '86400'))
+    # 대기/실행 중인 작업의 생존 시각과 중복 요청 선점을 갱신하는 주기 (IDEMPOTENCY_PENDING_TIMEOUT보다 충분히 짧게)
+    JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '60'))
+    # 이 시간 동안 생존 시각이 갱신되지 않은 작업은 워커가 죽은 것으로 보고 실패로 회수
+    JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '300'))
+
+    # 답변 전송(outbox) 설정
+    DELIVERY_DB_PATH = os.getenv('DELIVERY_DB_PATH', os.path.join(STATE_DIR, 'outbox.sqlite3'))
+    DELIVERY_POOL_SIZE = int(os.getenv('DELIVERY_POOL_SIZE', '10'))
+    DELIVERY_TIMEOUT = float(os.getenv('DELIVERY_TIMEOUT', '30'))
+    DELIVERY_MAX_ATTEMPTS = int(os.getenv('DELIVERY_MAX_ATTEMPTS', '10'))
+    DELIVERY_BACKOFF_BASE = float(os.getenv('DELIVERY_BACKOFF_BASE', '1'))
+    DELIVERY_BACKOFF_MAX = float(os.getenv('DELIVERY_BACKOFF_MAX', '300'))
+    DELIVERY_BATCH_SIZE = int(os.getenv('DELIVERY_BATCH_SIZE', '20'))
+    DELIVERY_POLL_INTERVAL = float(os.getenv('DELIVERY_POLL_INTERVAL', '5'))
+
+    # 답변 캐시 설정 (ANSWER_CACHE_PATH가 비어 있으면 메모리에만 저장)
+    ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'true').lower() == 'true'
+    ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.95'))
+    ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '86400'))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '1000'))
+    ANSWER_CACHE_PATH = os.getenv('ANSWER_CACHE_PATH', os.path.join(STATE_DIR, 'answer_cache.sqlite3'))
+
+    # 프롬프트 토큰 예산 (전체 입력 / 참고 문서)
+    PROMPT_MAX_TOKENS = int(os.getenv('PROMPT_MAX_TOKENS', '3000'))
+    PROMPT_CONTEXT_TOKENS = int(os.getenv('PROMPT_CONTEXT_TOKENS', '1500'))
+
+    # 벡터 DB 검색(RAG) 설정
+    RETRIEVAL_ENABLED = os.getenv('RETRIEVAL_ENABLED', 'true').lower() == 'true'
+    RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '3'))
+    RETRIEVAL_CACHE_SIZE = int(os.getenv('RETRIEVAL_CACHE_SIZE', '1024'))
+    RETRIEVAL_CACHE_TTL = float(os.getenv('RETRIEVAL_CACHE_TTL', '600'))
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '1024'))
+    # 검색 백엔드: chroma 또는 mmap (로컬 디스크의 메모리 매핑 인덱스)
+    RETRIEVAL_BACKEND = os.getenv('RETRIEVAL_BACKEND', 'chroma')
+    # 재구축할 때 버전마다 MMAP_INDEX_PATH/<버전> (로컬 디스크)에 생성하고 벡터 DB의 CURRENT 포인터로 함께 전환한다.
+    # CURRENT 포인터가 없으면(이전 방식) 이 경로의 인덱스를 바로 사용
+    MMAP_INDEX_PATH = os.getenv('MMAP_INDEX_PATH', 'data/mmap_index')
+
+    # BM25 역색인 + 벡터 하이브리드 검색 설정
+    HYBRID_ENABLED = os.getenv('HYBRID_ENABLED', 'true').lower() == 'true'
+    LEXICAL_INDEX_PATH = os.getenv('LEXICAL_INDEX_PATH', 'data/lexical_index.json')
+    LEXICAL_CANDIDATES = int(os.getenv('LEXICAL_CANDIDATES', '20'))
+    LEXICAL_CONFIDENT_COVERAGE = float(os.getenv('LEXICAL_CONFIDENT_COVERAGE', '0.8'))
+    LEXICAL_CONFIDENT_MARGIN = float(os.getenv('LEXICAL_CONFIDENT_MARGIN', '1.5'))
+    RRF_K = int(os.getenv('RRF_K', '60'))
+
+    # 인덱싱 시 임베딩 배치/동시성/캐시 설정
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '100'))
+    EMBEDDING_CONCURRENCY = int(os.getenv('EMBEDDING_CONCURRENCY', '4'))
+    EMBEDDING_MAX_RETRIES = int(os.getenv('EMBEDDING_MAX_RETRIES', '6'))
+    EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(STATE_DIR, 'embedding_cache.sqlite3'))
+
+    # 스트리밍 인덱싱 파이프라인 설정 (메모리 사용량은 배치 크기 x 대기 배치 수에 비례)
+    INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '256'))
+    INGEST_MAX_PENDING_BATCHES = int(os.getenv('INGEST_MAX_PENDING_BATCHES', '2'))
+
+    # 임베딩 전 근접 중복 청크 제거 (MinHash로 추정한 Jaccard 유사도가 임계값 이상이면 대표 청크만 저장)
+    DEDUPE_ENABLED = os.getenv('DEDUPE_ENABLED', 'true').lower() == 'true'
+    DEDUPE_THRESHOLD = float(os.getenv('DEDUPE_THRESHOLD', '0.9'))
+
+    # 스캔 페이지 OCR 설정 (텍스트가 OCR_MIN_CHARS자 미만이고 이미지가 있는 페이지만 OCR, 워커 0이면 CPU 코어 수)
+    OCR_ENABLED = os.getenv('OCR_ENABLED', 'false').lower() == 'true'
+    OCR_ENGINE = os.getenv('OCR_ENGINE', 'easyocr')
+    OCR_LANGUAGES = os.getenv('OCR_LANGUAGES', 'ko,en')
+    OCR_MIN_CHARS = int(os.getenv('OCR_MIN_CHARS', '20'))
+    OCR_WORKERS = int(os.getenv('OCR_WORKERS', '0'))
+    OCR_ZOOM = float(os.getenv('OCR_ZOOM', '2.0'))
+    OCR_CACHE_PATH = os.getenv('OCR_CACHE_PATH', os.path.join(STATE_DIR, 'ocr_cache.sqlite3'))
+
+    # 벡터 DB 재구축 설정 (VECTOR_DB_PATH/versions 아래 버전별로 만들고 CURRENT 파일로 전환)
+    INDEX_KEEP_VERSIONS = int(os.getenv('INDEX_KEEP_VERSIONS', '2'))
+    REBUILD_PROGRESS_INTERVAL = float(os.getenv('REBUILD_PROGRESS_INTERVAL', '2'))
+
+    # 상태 프로브 설정 (시스템 자원 / 의존성 검사 주기, 초)
+    HEALTH_SAMPLE_INTERVAL = float(os.getenv('HEALTH_SAMPLE_INTERVAL', '5'))
+    HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', '30'))
+    HEALTH_DISK_PATH = os.getenv('HEALTH_DISK_PATH', '/')
+
+    # 지표 설정 (워커별 지표 파일을 모아 /metrics에서 합산, 비어 있으면 현재 워커 값만 내보낸다)
+    METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(STATE_DIR, 'metrics'))
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+    # 요청 수락 제어 (호출자별 토큰 버킷, 전체 동시 LLM 호출 수, 대기열 과부하 시 거절)
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_DB_PATH = os.getenv('ADMISSION_DB_PATH', os.path.join(STATE_DIR, 'admission.sqlite3'))
+    RATE_LIMIT_PER_MINUTE = float(os.getenv('RATE_LIMIT_PER_MINUTE', '30'))
+    RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '10'))
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+    # 202로 접수한 답변 작업이 슬롯을 기다리는 최대 시간 (0이면 슬롯이 날 때까지 대기)
+    LLM_SLOT_TIMEOUT = float(os.getenv('LLM_SLOT_TIMEOUT', '0'))
+    LLM_STREAM_SLOT_TIMEOUT = float(os.getenv('LLM_STREAM_SLOT_TIMEOUT', '5'))
+    LLM_SLOT_LEASE = float(os.getenv('LLM_SLOT_LEASE', '300'))
+    ADMISSION_MAX_QUEUE_DEPTH = int(os.getenv('ADMISSION_MAX_QUEUE_DEPTH', '50'))
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '5'))
+
+    # 중복 요청 처리 (같은 질문 ID + 본문은 한 번만 답변 생성, 완료된 답변은 TTL 동안 재사용)
+    IDEMPOTENCY_DB_PATH = os.getenv('IDEMPOTENCY_DB_PATH', os.path.join(STATE_DIR, 'idempotency.sqlite3'))
+    IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', '86400'))
+    IDEMPOTENCY_PENDING_TIMEOUT = float(os.getenv('IDEMPOTENCY_PENDING_TIMEOUT', '600'))
+    IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', '120'))
+
+    # 일괄 답변 요청 설정 (요청당 최대 질문 수 / 동시에 답변을 생성할 질문 수)
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '100'))
+    BATCH_PARALLELISM = int(os.getenv('BATCH_PARALLELISM', '4'))
+
+    # 모델 라우팅 (카테고리와 질문 복잡도별 모델/최대 토큰, 지연 시 백업 모델로 헤지, 실패 시 대체)
+    MODEL_ROUTING_ENABLED = os.getenv('MODEL_ROUTING_ENABLED', 'true').lower() == 'true'
+    MODEL_PRIMARY = os.getenv('MODEL_PRIMARY', 'gpt-4')
+    MODEL_FAST = os.getenv('MODEL_FAST', 'gpt-3.5-turbo')
+    # 카테고리별 경로 재정의 (JSON, 예: {"세무": {"simple": {"model": "gpt-4", "max_tokens": 1500}}})
+    MODEL_ROUTES = os.getenv('MODEL_ROUTES', '')
+    MODEL_COMPLEX_TOKENS = int(os.getenv('MODEL_COMPLEX_TOKENS', '150'))
+    # 헤지 기준 시간 = MODEL_HEDGE_AFTER(연결과 첫 토큰까지) + 최대 답변 토큰 x MODEL_HEDGE_SECONDS_PER_TOKEN
+    # (세무/직원관리 경로는 기본적으로 헤지하지 않는다)
+    MODEL_HEDGE_AFTER = float(os.getenv('MODEL_HEDGE_AFTER', '10'))
+    MODEL_HEDGE_SECONDS_PER_TOKEN = float(os.getenv('MODEL_HEDGE_SECONDS_PER_TOKEN', '0.02'))
+    MODEL_REQUEST_TIMEOUT = float(os.getenv('MODEL_REQUEST_TIMEOUT', '90'))
+    MODEL_HEDGE_WORKERS = int(os.getenv('MODEL_HEDGE_WORKERS', '16'))
+
+    # ASGI(비동기) 모드 설정 (워커 하나가 동시에 처리할 답변 작업 수 / 종료 시 대기 시간)
+    ASYNC_MAX_PENDING = int(os.getenv('ASYNC_MAX_PENDING', '500'))
+    ASYNC_SHUTDOWN_TIMEOUT = float(os.getenv('ASYNC_SHUTDOWN_TIMEOUT', '30'))
+
     @staticmethod
     def init_app(app):
         if not Config.OPENAI_API_KEY:
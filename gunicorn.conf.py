@@ -0,0 +1,48 @@
+"""gunicorn 설정.
+
+실행: gunicorn -c gunicorn.conf.py
+
+preload_app이 켜져 있으면 마스터 프로세스가 앱을 한 번만 임포트하고 프롬프트, 토크나이저, 역색인,
+메모리 매핑 인덱스를 미리 로드한 뒤 워커를 fork한다. 워커들은 이 상태를 copy-on-write로 공유하므로
+워커 시작이 빠르고 메모리 사용량도 줄어든다. OpenAI/Chroma 클라이언트와 백그라운드 스레드는
+fork 후 각 워커에서 새로 만든다.
+"""
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+wsgi_app = "main:create_app(preload=True)" if preload_app else "main:create_app()"
+
+
+def when_ready(server):
+    # 미리 로드한 객체를 GC 대상에서 제외해 워커에서 GC가 공유 페이지를 건드려 복사되지 않도록 한다
+    if preload_app:
+        gc.freeze()
+        server.log.info(f"사전 로드 객체 {gc.get_freeze_count()}개 고정")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from utils import lifecycle
+
+        lifecycle.start_background()
+
+
+def worker_exit(server, worker):
+    # 마지막 기록 이후에 센 지표도 남기고 종료
+    from app.services.metrics_service import registry
+
+    registry.flush()
+
+
+def child_exit(server, worker):
+    # 종료된 워커의 지표 파일을 합계 파일에 합쳐 파일이 쌓이지 않도록 한다
+    from app.services.metrics_service import registry
+
+    try:
+        registry.compact()
+    except Exception as e:
+        server.log.warning(f"종료된 워커 지표 합치기 실패: {e}")
@@ -4,17 +4,26 @@ from config.config import Config
 from app.routes.qa_routes import qa_bp
 from app.routes.setup_routes import setup_bp
 from app.routes.health_routes import health_bp
+from app.routes.metrics_routes import metrics_bp
+from app.middleware.request_id import register_request_id
 from utils.error_handlers import register_error_handlers
-import logging
+from utils import lifecycle
+from utils.logging_utils import setup_logging
 
-def create_app():
+def create_app(preload: bool = False):
+    """Flask 앱 생성.
+
+    preload=True는 gunicorn --preload용으로, 마스터 프로세스에서 읽기 전용 상태만 미리 로드하고
+    백그라운드 스레드는 fork 후 각 워커에서 시작한다 (gunicorn.conf.py의 post_fork 참고).
+    """
     app = Flask(__name__)
     
     # CORS 설정
     CORS(app)
     
-    # 로깅 설정
-    logging.basicConfig(level=logging.INFO)
+    # 로깅 설정 (요청 스레드는 큐에 넣기만 하고 출력은 리스너 스레드가 담당)
+    setup_logging(Config)
+    register_request_id(app)
     
     # 설정 초기화
     Config.init_app(app)
@@ -23,9 +32,15 @@ def create_app():
     app.register_blueprint(qa_bp)
     app.register_blueprint(setup_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
     
     # 에러 핸들러 등록
     register_error_handlers(app)
+
+    if preload:
+        lifecycle.warm_up()
+    else:
+        lifecycle.start_background()
     
     return app
 
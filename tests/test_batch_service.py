@@ -0,0 +1,101 @@
+import threading
+import time
+
+from app.services.batch_service import BatchAnswerer
+from app.services.idempotency_service import IdempotencyStore
+
+
+class FakeQAService:
+    def __init__(self):
+        self.prefetched = None
+
+    def prefetch_embeddings(self, contents):
+        self.prefetched = contents
+
+    def qacall(self, category, content, extra_data):
+        if content == "실패":
+            raise RuntimeError("LLM 오류")
+        return f"{content} 답변"
+
+
+class FakeSender:
+    def __init__(self):
+        self.calls = []
+
+    def submit_many(self, entries):
+        self.calls.append(entries)
+        return [100 + n for n in range(len(entries))]
+
+
+class FakeIdempotency:
+    pending_timeout = 600
+
+    def __init__(self):
+        self.completed, self.released, self.refreshed = [], [], []
+
+    def refresh(self, keys, owner):
+        self.refreshed.append(keys)
+
+    def complete(self, key, owner, result):
+        self.completed.append(key)
+
+    def release(self, key, owner):
+        self.released.append(key)
+
+
+class FakeStore:
+    def __init__(self):
+        self.progress = []
+
+    def set_progress(self, job_id, progress):
+        self.progress.append(progress)
+
+
+def make_items(contents):
+    return [
+        {"index": n, "questionId": n, "id": n, "category": "노하우", "content": content, "extraData": None, "key": f"k{n}"}
+        for n, content in enumerate(contents)
+    ]
+
+
+def test_batch_reports_partial_results_and_delivers_in_chunks():
+    qa, sender, idempotency, store = FakeQAService(), FakeSender(), FakeIdempotency(), FakeStore()
+    answerer = BatchAnswerer(qa, sender, idempotency, store, url_for=lambda qid: f"/q/{qid}/answers",
+                             parallelism=2, delivery_chunk=2)
+
+    result = answerer.run("job", make_items(["a", "실패", "b", "c"]), "token")
+
+    assert qa.prefetched == ["a", "실패", "b", "c"]
+    assert (result["succeeded"], result["failed"]) == (3, 1)
+    assert [item["status"] for item in result["items"]] == ["succeeded", "failed", "succeeded", "succeeded"]
+    assert result["items"][0]["answer"] == "a 답변"
+    assert idempotency.released == ["k1"]
+    assert sorted(idempotency.completed) == ["k0", "k2", "k3"]
+    # 3건을 2건 + 1건으로 나눠 outbox에 저장
+    assert sorted(len(call) for call in sender.calls) == [1, 2]
+    assert store.progress[-1]["done"] == 4
+    assert all("answer" not in item for item in store.progress[-1]["items"])
+
+
+def test_long_batch_keeps_reservations_of_unanswered_items(tmp_path):
+    idempotency = IdempotencyStore(str(tmp_path / "idempotency.sqlite3"), pending_timeout=0.3)
+    for n in range(2):
+        idempotency.reserve(f"k{n}", "job")
+    release = threading.Event()
+
+    class SlowQAService(FakeQAService):
+        def qacall(self, category, content, extra_data):
+            if content == "느림":
+                release.wait(5)
+            return super().qacall(category, content, extra_data)
+
+    answerer = BatchAnswerer(SlowQAService(), FakeSender(), idempotency, FakeStore(), url_for=str,
+                             parallelism=2, delivery_chunk=1, refresh_interval=0.05)
+    thread = threading.Thread(target=answerer.run, args=("job", make_items(["a", "느림"]), "token"))
+    thread.start()
+    # 선점 만료 시간이 지나도 답변 중인 질문은 다른 요청이 가져가지 못한다
+    time.sleep(0.5)
+    assert idempotency.reserve("k1", "retry")[0] is False
+    release.set()
+    thread.join()
+    assert idempotency.get("k1")["status"] == "done"
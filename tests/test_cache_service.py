@@ -0,0 +1,67 @@
+import time
+
+from app.services.cache_service import SemanticAnswerCache, profile_key
+
+VECTORS = {
+    "부가세 신고 기한은?": [1.0, 0.0, 0.0],
+    "부가세 신고 기한이 언제예요?": [0.98, 0.2, 0.0],
+    "부가세 신고는 어디서 하나요?": [0.8, 0.6, 0.0],
+    "주휴수당 계산 방법": [0.0, 0.0, 1.0],
+}
+
+
+def embed(text):
+    return VECTORS[" ".join(text.split())]
+
+
+def make_cache(**options):
+    return SemanticAnswerCache(embed, similarity_threshold=0.95, **options)
+
+
+def test_exact_and_semantic_hits_respect_threshold_and_profile():
+    cache = make_cache()
+    cache.put("세무", "부가세 신고 기한은?", {"region": "서울"}, "1월 25일")
+
+    # 공백/대소문자만 다른 질문과 빈 extra_data 값은 같은 키로 취급
+    assert profile_key("세무", {"region": "서울", "memo": ""}) == profile_key("세무", {"region": "서울"})
+    assert cache.get("세무", "부가세  신고 기한은?", {"region": "서울", "memo": None}) == "1월 25일"
+    assert cache.get("세무", "부가세 신고 기한이 언제예요?", {"region": "서울"}) == "1월 25일"
+    assert cache.get("세무", "부가세 신고는 어디서 하나요?", {"region": "서울"}) is None
+    assert cache.get("세무", "부가세 신고 기한은?", {"region": "부산"}) is None
+
+    stats = cache.get_stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_ttl_expiry_and_lru_eviction():
+    cache = make_cache(ttl_seconds=0.1, max_entries=2)
+    cache.put("세무", "부가세 신고 기한은?", None, "a")
+    time.sleep(0.15)
+    assert cache.get("세무", "부가세 신고 기한은?", None) is None
+    assert cache.get_stats()["expired"] == 1
+
+    cache = make_cache(max_entries=2)
+    cache.put("세무", "부가세 신고 기한은?", None, "a")
+    cache.put("세무", "부가세 신고는 어디서 하나요?", None, "b")
+    # 최근에 조회한 항목은 남고 가장 오래 쓰지 않은 항목이 밀려난다
+    assert cache.get("세무", "부가세 신고 기한은?", None) == "a"
+    cache.put("직원관리", "주휴수당 계산 방법", None, "c")
+    assert cache.get("세무", "부가세 신고는 어디서 하나요?", None) is None
+    assert cache.get("세무", "부가세 신고 기한은?", None) == "a"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_sqlite_persistence_is_shared_between_instances(tmp_path):
+    db_path = str(tmp_path / "answer_cache.sqlite3")
+    writer = make_cache(db_path=db_path)
+    reader = make_cache(db_path=db_path)
+    writer.put("세무", "부가세 신고 기한은?", None, "1월 25일")
+
+    # 다른 워커가 저장한 답변은 디스크에서 찾는다
+    assert reader.get("세무", "부가세 신고 기한은?", None) == "1월 25일"
+    # 새로 시작한 인스턴스는 저장된 벡터로 유사 질문도 찾는다
+    restarted = make_cache(db_path=db_path)
+    assert restarted.get("세무", "부가세 신고 기한이 언제예요?", None) == "1월 25일"
+
+    expired = make_cache(db_path=db_path, ttl_seconds=0)
+    assert expired.get("세무", "부가세 신고 기한은?", None) is None
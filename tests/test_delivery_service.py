@@ -0,0 +1,80 @@
+import time
+
+from app.services import delivery_service
+from app.services.delivery_service import DeliveryOutbox, DeliverySender
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ""
+
+    def json(self):
+        return {"ok": self.status_code < 300}
+
+
+class FakeSession:
+    def __init__(self, *status_codes):
+        self.status_codes = list(status_codes)
+        self.posted = []
+
+    def post(self, url, headers, json, timeout):
+        self.posted.append(json)
+        return FakeResponse(self.status_codes.pop(0))
+
+
+def make_outbox(tmp_path):
+    return DeliveryOutbox(str(tmp_path / "outbox.sqlite3"))
+
+
+def test_enqueue_coalesces_pending_answers_for_same_question(tmp_path):
+    outbox = make_outbox(tmp_path)
+    first = outbox.enqueue(1, "http://a", "t", {"answer": "old"})
+    assert outbox.enqueue(1, "http://a", "t", {"answer": "new"}) == first
+    [item] = outbox.claim_due(10, lease_seconds=30)
+    assert item["payload"] == {"answer": "new"}
+
+    # 전송 중인 항목은 덮어쓰지 않고 새 항목으로 저장한다
+    assert outbox.enqueue(1, "http://a", "t", {"answer": "newer"}) != first
+
+
+def test_lease_blocks_other_workers_and_renew_detects_takeover(tmp_path):
+    outbox = make_outbox(tmp_path)
+    outbox.enqueue_many([(question_id, "http://a", None, {}) for question_id in range(3)])
+    items = outbox.claim_due(10, lease_seconds=0.2)
+    assert len(items) == 3
+    assert outbox.claim_due(10, lease_seconds=0.2) == []
+
+    # 임대가 끝났어도 아무도 가져가지 않았으면 연장할 수 있다
+    time.sleep(0.25)
+    assert outbox.renew(items[0], lease_seconds=30)
+    taken = outbox.claim_due(10, lease_seconds=30)
+    assert sorted(item["id"] for item in taken) == sorted(item["id"] for item in items[1:])
+    # 다른 워커가 다시 임대한 항목은 연장하지 못하므로 두 번 보내지 않는다
+    assert not outbox.renew(items[1], lease_seconds=30)
+
+
+def test_sender_skips_taken_items_and_retries_with_backoff(tmp_path, monkeypatch):
+    outbox = make_outbox(tmp_path)
+    session = FakeSession(503, 200)
+    monkeypatch.setattr(delivery_service, "get_http_session", lambda pool_size: session)
+    sender = DeliverySender(outbox, timeout=0.1, max_attempts=2, backoff_base=0.01)
+
+    item_id = outbox.enqueue(1, "http://a", None, {"answer": "a"})
+    [item] = outbox.claim_due(10, lease_seconds=0.1)
+    time.sleep(0.15)
+    [other] = outbox.claim_due(10, lease_seconds=30)
+    sender._deliver(item)
+    assert session.posted == []
+
+    sender._deliver(other)
+    state = outbox.get(item_id)
+    assert (state["status"], state["attempts"], state["lastError"]) == ("pending", 1, "HTTP 503")
+
+    time.sleep(0.02)
+    [retry] = outbox.claim_due(10, lease_seconds=30)
+    sender._deliver(retry)
+    state = outbox.get(item_id)
+    assert (state["status"], state["attempts"]) == ("delivered", 2)
+    assert state["response"] == {"statusCode": 200, "response": {"ok": True}}
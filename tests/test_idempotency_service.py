@@ -0,0 +1,42 @@
+import threading
+
+from app.services.idempotency_service import IdempotencyStore, request_key
+
+
+def test_request_key_ignores_extra_data_key_order():
+    first = request_key(1, 10, "세무", "부가세 신고", {"a": 1, "b": 2})
+    second = request_key(1, 10, "세무", "부가세 신고", {"b": 2, "a": 1})
+
+    assert first == second
+    assert first != request_key(2, 10, "세무", "부가세 신고", {"a": 1, "b": 2})
+
+
+def test_concurrent_duplicates_have_single_owner(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.sqlite3"))
+    results = []
+
+    def reserve(owner):
+        results.append(store.reserve("q", owner)[0])
+
+    threads = [threading.Thread(target=reserve, args=(f"job-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1
+
+
+def test_completed_result_is_returned_and_failure_releases(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.sqlite3"))
+    assert store.reserve("done", "job-1") == (True, None)
+    store.complete("done", "job-1", {"answer": "답변", "outboxId": 3})
+
+    reserved, record = store.reserve("done", "job-2")
+    assert not reserved
+    assert record["status"] == "done"
+    assert record["result"] == {"answer": "답변", "outboxId": 3}
+
+    store.reserve("failed", "job-3")
+    store.release("failed", "job-3")
+    assert store.reserve("failed", "job-4") == (True, None)
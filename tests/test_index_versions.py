@@ -0,0 +1,80 @@
+import os
+
+from app.services.index_versions import IndexVersions
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_without_pointer_uses_legacy_root(tmp_path):
+    versions = IndexVersions(str(tmp_path))
+
+    assert versions.current_version() is None
+    assert versions.current_path() == str(tmp_path)
+
+
+def test_activate_switches_pointer_and_copies_current(tmp_path):
+    _write(tmp_path / "chroma.sqlite3", "v0")
+    versions = IndexVersions(str(tmp_path))
+
+    version, path = versions.create_version()
+    assert versions.current_path() == str(tmp_path)
+    assert not os.path.exists(os.path.join(path, "versions"))
+
+    versions.activate(version)
+    assert versions.current_version() == version
+    with open(os.path.join(versions.current_path(), "chroma.sqlite3"), encoding="utf-8") as f:
+        assert f.read() == "v0"
+
+
+def test_gc_keeps_current_previous_and_in_progress(tmp_path):
+    versions = IndexVersions(str(tmp_path), keep=2)
+    names = []
+    for _ in range(3):
+        version, _ = versions.create_version(copy_current=False)
+        versions.activate(version)
+        names.append(version)
+    building, _ = versions.create_version(copy_current=False)
+
+    removed = versions.gc()
+
+    assert removed == [names[0]]
+    assert sorted(os.listdir(versions.versions_dir)) == sorted([names[1], names[2], building])
+
+
+def test_auxiliary_indexes_follow_current_version(tmp_path):
+    versions = IndexVersions(str(tmp_path))
+    assert versions.current_file("lexical_index.json", fallback="legacy.json") == "legacy.json"
+
+    version, path = versions.create_version(copy_current=False)
+    _write(os.path.join(path, "lexical_index.json"), "{}")
+    os.makedirs(os.path.join(path, "mmap_index"))
+    versions.activate(version)
+    assert versions.current_file("lexical_index.json") == os.path.join(path, "lexical_index.json")
+
+    # 보조 인덱스는 새 버전에서 다시 만들므로 복사하지 않는다
+    _, new_path = versions.create_version()
+    assert sorted(os.listdir(new_path)) == [".building"]
+
+
+def test_local_indexes_follow_current_version_and_gc(tmp_path):
+    local_root = str(tmp_path / "local")
+    versions = IndexVersions(str(tmp_path / "db"), keep=1, local_root=local_root)
+    assert versions.current_local_path(fallback="legacy") == "legacy"
+
+    names = []
+    for _ in range(2):
+        version, _ = versions.create_version(copy_current=False)
+        os.makedirs(versions.local_path(version))
+        versions.activate(version)
+        names.append(version)
+    assert versions.current_local_path() == os.path.join(local_root, names[1])
+
+    discarded, _ = versions.create_version(copy_current=False)
+    os.makedirs(versions.local_path(discarded))
+    versions.discard(discarded)
+
+    assert versions.gc() == [names[0]]
+    assert os.listdir(local_root) == [names[1]]
@@ -0,0 +1,116 @@
+import pytest
+
+from app.services.index_manifest import IndexManifest
+from app.services.ingestion_service import IngestionPipeline, IngestionSource, ParallelPageExtractor, discover_sources
+
+
+class FakeStore:
+    def __init__(self):
+        self.documents = {}
+
+    def get(self):
+        return {"ids": list(self.documents)}
+
+    def add_texts(self, texts, metadatas, ids):
+        self.documents.update(zip(ids, texts))
+
+    def delete(self, ids):
+        for vector_id in ids:
+            self.documents.pop(vector_id, None)
+
+    def persist(self):
+        pass
+
+
+class FailingSplitter:
+    def split_text(self, text):
+        if "고장" in text:
+            raise ValueError("분할 실패")
+        return [line for line in text.split("\n") if line]
+
+
+class FakePipeline(IngestionPipeline):
+    def __init__(self, store):
+        super().__init__(embedding=None, batch_size=1)
+        self.store = store
+
+    def text_splitter(self):
+        return FailingSplitter()
+
+    def open_store(self, db_directory):
+        return self.store
+
+
+def test_failed_source_leaves_no_vectors_or_manifest_entry(tmp_path):
+    txt_dir = tmp_path / "txt"
+    txt_dir.mkdir()
+    (txt_dir / "ok.txt").write_text("첫 줄\n둘째 줄", encoding="utf-8")
+    (txt_dir / "bad.txt").write_text("먼저 저장되는 줄\n다음 줄\f고장 난 쪽", encoding="utf-8")
+    store = FakeStore()
+    db_dir = str(tmp_path / "db")
+
+    result = FakePipeline(store).run(db_dir, txt_dir=str(txt_dir))
+
+    assert (result["success"], result["failed"], result["added"]) == (False, 1, 2)
+    assert sorted(store.documents.values()) == ["둘째 줄", "첫 줄"]
+    assert IndexManifest.load(db_dir).get_file("bad.txt") is None
+
+
+def test_parallel_extractor_streams_pages_in_order(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    pdf_dir = tmp_path / "pdf"
+    pdf_dir.mkdir()
+    for n in range(3):
+        with fitz.open() as doc:
+            for page_no in range(2):
+                doc.new_page().insert_text((72, 72), f"doc {n} page {page_no}")
+            doc.save(str(pdf_dir / f"{n}.pdf"))
+
+    sources = discover_sources(str(pdf_dir))
+    extractor = ParallelPageExtractor(workers=2, lookahead=2)
+    try:
+        extractor.schedule(sources)
+        pages = [list(extractor.iter_pages(source)) for source in sources]
+    finally:
+        extractor.close()
+    assert pages == [[f"doc {n} page 0", f"doc {n} page 1"] for n in range(3)]
+
+
+def test_changed_chunk_settings_rebuild_all_vectors(tmp_path):
+    txt_dir = tmp_path / "txt"
+    txt_dir.mkdir()
+    (txt_dir / "ok.txt").write_text("첫 줄\n둘째 줄", encoding="utf-8")
+    store = FakeStore()
+    db_dir = str(tmp_path / "db")
+    assert FakePipeline(store).run(db_dir, txt_dir=str(txt_dir))["added"] == 2
+
+    pipeline = FakePipeline(store)
+    assert pipeline.run(db_dir, txt_dir=str(txt_dir))["added"] == 0
+    pipeline.chunk_size = 500
+    result = pipeline.run(db_dir, txt_dir=str(txt_dir))
+    assert (result["added"], len(store.documents)) == (2, 2)
+    assert IndexManifest.load(db_dir).settings["chunk_size"] == 500
+
+
+def test_source_with_failed_ocr_pages_is_reprocessed_next_run(tmp_path, monkeypatch):
+    txt_dir = tmp_path / "txt"
+    txt_dir.mkdir()
+    (txt_dir / "scan.txt").write_text("첫 줄\n둘째 줄", encoding="utf-8")
+    store = FakeStore()
+    db_dir = str(tmp_path / "db")
+    original = IngestionSource.iter_pages
+
+    def iter_pages_with_failed_ocr(self, ocr=None):
+        yield from original(self, ocr)
+        self.ocr_failed_pages = [0]
+
+    monkeypatch.setattr(IngestionSource, "iter_pages", iter_pages_with_failed_ocr)
+    result = FakePipeline(store).run(db_dir, txt_dir=str(txt_dir))
+    assert (result["success"], result["added"], result["ocr_retry"]) == (True, 2, 1)
+    assert IndexManifest.load(db_dir).get_file("scan.txt")["hash"] == ""
+
+    # 다음 실행에서 다시 읽되 이미 저장된 청크는 재사용한다
+    monkeypatch.setattr(IngestionSource, "iter_pages", original)
+    result = FakePipeline(store).run(db_dir, txt_dir=str(txt_dir))
+    assert (result["added"], result["skipped"], result["ocr_retry"]) == (0, 2, 0)
+    assert IndexManifest.load(db_dir).get_file("scan.txt")["hash"]
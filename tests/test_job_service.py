@@ -0,0 +1,29 @@
+import threading
+import time
+
+from app.services.idempotency_service import IdempotencyStore
+from app.services.job_service import JobQueue, JobStore
+
+
+def test_heartbeat_keeps_long_job_reserved_and_reclaims_orphans(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    idempotency = IdempotencyStore(str(tmp_path / "idempotency.sqlite3"), pending_timeout=0.3)
+    job_queue = JobQueue(store, num_workers=1, heartbeat_interval=0.1, lease_seconds=0.3)
+
+    # 다른 워커가 등록한 뒤 죽어 아무도 갱신하지 않는 작업
+    store.create("orphan", "answer")
+    assert idempotency.reserve("key", "job")[0]
+    release = threading.Event()
+    job_queue.submit("answer", release.wait, 5, job_id="job",
+                     on_heartbeat=lambda: idempotency.refresh(["key"], "job"))
+
+    # 선점 만료 시간보다 오래 실행되어도 재시도가 키를 가져가지 못한다
+    time.sleep(0.6)
+    assert not idempotency.reserve("key", "retry")[0]
+    assert store.get("job")["status"] == "running"
+    orphan = store.get("orphan")
+    assert (orphan["status"], orphan["error"]) == ("failed", "작업을 처리하던 워커가 종료되었습니다.")
+
+    release.set()
+    time.sleep(0.1)
+    assert store.get("job")["status"] == "succeeded"
@@ -0,0 +1,49 @@
+import os
+
+from app.services.index_versions import LEXICAL_INDEX_FILENAME, IndexVersions
+from app.services.lexical_index import BM25Index, LexicalIndexHandle, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_uses_hangul_bigrams():
+    assert tokenize("부가세 VAT") == ["부가", "가세", "vat"]
+
+
+def test_bm25_matches_compound_word_with_particle():
+    index = BM25Index.build(
+        ["a", "b", "c"],
+        ["근로계약서는 서면으로 작성해야 합니다", "부가세 신고 기한", "매장 인테리어 비용"]
+    )
+
+    doc_index, _, coverage = index.search("근로계약서 작성", k=1)[0]
+    assert index.ids[doc_index] == "a"
+    assert coverage == 1.0
+
+
+def test_bm25_round_trip(tmp_path):
+    index = BM25Index.build(["a", "b"], ["부가세 환급", "종합소득세 신고"])
+    path = tmp_path / "lexical_index.json"
+    index.save(str(path))
+
+    loaded = BM25Index.load(str(path))
+    assert loaded.search("부가세") == index.search("부가세")
+
+
+def test_handle_reads_index_of_current_version(tmp_path):
+    versions = IndexVersions(str(tmp_path / "db"))
+    handle = LexicalIndexHandle(str(tmp_path / "legacy.json"), refresh_interval=0, versions=versions)
+    assert handle.get() is None
+
+    for ids in (["a"], ["b"]):
+        version, path = versions.create_version(copy_current=False)
+        BM25Index.build(ids, ["부가세 환급"]).save(os.path.join(path, LEXICAL_INDEX_FILENAME))
+        versions.activate(version)
+        assert handle.get().ids == ids
+
+    # 새 버전에 역색인이 없으면 이전 버전의 역색인을 쓰지 않고 벡터 검색만 사용
+    version, _ = versions.create_version(copy_current=False)
+    versions.activate(version)
+    assert handle.get() is None
+
+
+def test_reciprocal_rank_fusion_prefers_items_in_both_lists():
+    assert reciprocal_rank_fusion([["x", "y", "z"], ["z", "x"]])[0] == "x"
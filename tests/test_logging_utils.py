@@ -0,0 +1,61 @@
+import json
+import logging
+
+from utils.logging_utils import (
+    AsyncQueueHandler, JsonFormatter, RateLimitFilter, RedactingFilter, RequestContextFilter,
+    bind_request_id, redact, reset_request_id
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def make_record(message, *args, name="test", level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, message, args, None)
+
+
+def test_redact_tokens_and_keys():
+    assert redact("Authorization 헤더: Bearer abc.def-123") == "Authorization 헤더: Bearer [REDACTED]"
+    assert redact("{'Authorization': 'Bearer xyz', 'Host': 'a'}") == "{'Authorization': '[REDACTED]', 'Host': 'a'}"
+    assert redact("key=sk-abcdefghijklmnop") == "key=sk-[REDACTED]"
+    assert "eyJ" not in redact("token eyJhbGciOi.eyJzdWIiOjF9.c2ln")
+
+
+def test_rate_limit_reports_suppressed_records():
+    limiter = RateLimitFilter(rate_per_second=0.001, burst=2)
+    assert [limiter.filter(make_record("x")) for _ in range(4)] == [True, True, False, False]
+    assert limiter.filter(make_record("x", level=logging.ERROR))
+    # 다른 로거는 따로 제한
+    assert limiter.filter(make_record("x", name="other"))
+
+    limiter._buckets["test"] = (1, limiter._buckets["test"][1], 2)
+    record = make_record("x")
+    assert limiter.filter(record) and record.suppressed == 2
+
+
+def test_handler_writes_redacted_json_with_request_id():
+    output = ListHandler()
+    output.setFormatter(JsonFormatter())
+    handler = AsyncQueueHandler([output], max_queue_size=10)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(RedactingFilter(max_chars=40))
+
+    request_id, token = bind_request_id("req-1")
+    try:
+        handler.handle(make_record("Authorization: %s", "Bearer secret-token"))
+        handler.handle(make_record("답변 " * 50))
+    finally:
+        reset_request_id(token)
+    handler.stop()
+
+    first, second = (json.loads(line) for line in output.lines)
+    assert first["message"] == "Authorization: [REDACTED]"
+    assert first["request_id"] == request_id == "req-1"
+    assert second["message"].endswith("자 생략)")
+    assert handler.get_stats()["dropped"] == 0
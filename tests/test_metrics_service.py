@@ -0,0 +1,57 @@
+import json
+import os
+
+from app.services.metrics_service import MetricsRegistry
+
+
+def test_render_merges_worker_files(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    counter = registry.counter("llm_tokens_total", "doc", ["type"])
+    histogram = registry.histogram("stage_seconds", "doc", ["stage"], buckets=(0.1, 1.0))
+    counter.inc(10, type="prompt")
+    histogram.observe(0.05, stage="llm")
+
+    # 이미 종료된 다른 워커가 남긴 파일
+    other = {"pid": 999999999, "metrics": {
+        "llm_tokens_total": {json.dumps(["prompt"]): 5.0},
+        "stage_seconds": {json.dumps(["llm"]): [0.0, 1.0, 0.0, 0.5, 1.0]}
+    }}
+    with open(os.path.join(tmp_path, "metrics-999999999.json"), "w", encoding="utf-8") as f:
+        json.dump(other, f)
+
+    text = registry.render()
+    assert 'llm_tokens_total{type="prompt"} 15' in text
+    assert 'stage_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="llm",le="1"} 2' in text
+    assert 'stage_seconds_count{stage="llm"} 2' in text
+
+
+def test_gauges_skip_exited_workers(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    gauge = registry.gauge("job_queue_depth", "doc", ["queue"])
+    gauge.set(2, queue="answer")
+    with open(os.path.join(tmp_path, "metrics-999999999.json"), "w", encoding="utf-8") as f:
+        json.dump({"pid": 999999999, "metrics": {"job_queue_depth": {json.dumps(["answer"]): 7.0}}}, f)
+
+    assert 'job_queue_depth{queue="answer"} 2' in registry.render()
+
+
+def test_exited_worker_files_are_folded_into_aggregate(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    counter = registry.counter("llm_tokens_total", "doc", ["type"])
+    gauge = registry.gauge("job_queue_depth", "doc", ["queue"])
+    counter.inc(1, type="prompt")
+    for instance, tokens in (("a", 5.0), ("b", 7.0)):
+        with open(os.path.join(tmp_path, f"metrics-999999999-{instance}.json"), "w", encoding="utf-8") as f:
+            json.dump({"pid": 999999999, "instance": instance, "updated_at": 0, "metrics": {
+                "llm_tokens_total": {json.dumps(["prompt"]): tokens},
+                "job_queue_depth": {json.dumps(["answer"]): 3.0}
+            }}, f)
+
+    assert 'llm_tokens_total{type="prompt"} 13' in registry.render()
+    assert sorted(os.listdir(tmp_path)) == [".compact.lock", "aggregate.json"]
+    # 합친 뒤에도 카운터는 줄어들지 않고 종료된 워커의 게이지는 버린다
+    gauge.set(1, queue="answer")
+    text = registry.render()
+    assert 'llm_tokens_total{type="prompt"} 13' in text
+    assert 'job_queue_depth{queue="answer"} 1' in text
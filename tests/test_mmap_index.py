@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services.mmap_index import MmapVectorIndex
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def count(self):
+        return len(self.rows)
+
+    def get(self, include, limit, offset):
+        page = self.rows[offset:offset + limit]
+        return {
+            "ids": [row[0] for row in page],
+            "documents": [row[1] for row in page],
+            "embeddings": [row[2] for row in page],
+            "metadatas": [{"source": row[0]} for row in page],
+        }
+
+
+def test_build_publishes_complete_directory_once(tmp_path):
+    out_dir = str(tmp_path / "mmap_index" / "v1")
+    collection = FakeCollection([("a", "부가세", [3.0, 4.0]), ("b", "원천세", [0.0, 1.0])])
+    result = MmapVectorIndex.build_from_chroma(collection, out_dir)
+    assert (result["count"], result["path"]) == (2, out_dir)
+    assert os.listdir(tmp_path / "mmap_index") == ["v1"]
+
+    index = MmapVectorIndex.load(out_dir)
+    assert [index.document(row) for row, _ in index.search([0.0, 1.0], k=2)] == ["원천세", "부가세"]
+    index.close()
+
+    # 버전 디렉토리는 새로 만들 때만 쓰며 읽고 있는 인덱스를 덮어쓰지 않는다
+    with pytest.raises(FileExistsError):
+        MmapVectorIndex.build_from_chroma(FakeCollection([]), out_dir)
@@ -0,0 +1,115 @@
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import model_router
+from app.services.model_router import ModelRouter
+
+# 기본 모델을 쓰고 빠른 모델로 헤지하는 경로의 질문
+COMPLEX_QUESTION = "부가세 신고 절차와 세금 계산 방법을 비교해 주세요?"
+
+
+class FakeChain:
+    def __init__(self, model, delay=0.0, error=None):
+        self.model = model
+        self.delay = delay
+        self.error = error
+
+    def invoke(self, inputs):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f"{self.model} 답변"
+
+
+@contextmanager
+def fake_callback():
+    yield SimpleNamespace(total_cost=0.0, prompt_tokens=0, completion_tokens=0)
+
+
+def make_router(monkeypatch, chains):
+    monkeypatch.setattr(model_router, "get_openai_callback", fake_callback)
+    router = ModelRouter(primary="big", fast="small", hedge_after=0.05, hedge_seconds_per_token=0)
+    router.client = lambda model, max_tokens: model
+    return router, lambda llm: chains[llm]
+
+
+def test_route_by_category_and_complexity():
+    router = ModelRouter(primary="big", fast="small", complex_tokens=50)
+    simple = router.route("노하우", "수육을 촉촉하게 유지하는 팁이 있을까요?")
+    assert (simple.model, simple.backup, simple.hedge_after) == ("small", "big", None)
+
+    complex_route = router.route("노하우", COMPLEX_QUESTION)
+    assert complex_route.name == "노하우:complex"
+    assert (complex_route.model, complex_route.backup) == ("big", "small")
+    # 헤지 기준 시간은 최대 답변 길이(3000토큰)에 비례해 늘어난다
+    assert complex_route.hedge_after == pytest.approx(10 + 3000 * 0.02)
+
+    # 세무는 짧은 질문도 기본 모델을 사용하고 빠른 모델로 헤지하지 않는다
+    tax = router.route("세무", "간이과세가 뭔가요?")
+    assert (tax.model, tax.backup, tax.hedge_after) == ("big", "small", None)
+
+    routes = ModelRouter.load_routes('{"세무": {"simple": {"max_tokens": 1500}}}')
+    assert routes["세무"]["simple"] == {"tier": "primary", "max_tokens": 1500, "hedge_after": None}
+
+
+def test_hedge_wins_when_primary_is_slow(monkeypatch):
+    router, chain_for = make_router(monkeypatch, {"big": FakeChain("big", delay=0.5), "small": FakeChain("small")})
+    route = router.route("노하우", COMPLEX_QUESTION)
+    usages = []
+
+    started = time.perf_counter()
+    answer = router.invoke(route, chain_for, {}, on_usage=lambda model, cb: usages.append(model))
+    assert answer == "small 답변"
+    assert time.perf_counter() - started < 0.4
+    assert usages == ["small"]
+
+
+def test_fallback_on_error_and_raise_when_all_fail(monkeypatch):
+    router, chain_for = make_router(monkeypatch, {
+        "big": FakeChain("big", error=TimeoutError("timeout")),
+        "small": FakeChain("small")
+    })
+    assert router.invoke(router.route("세무", "간이과세가 뭔가요?"), chain_for, {}) == "small 답변"
+
+    router, chain_for = make_router(monkeypatch, {
+        "big": FakeChain("big", error=TimeoutError("timeout")),
+        "small": FakeChain("small", error=ValueError("bad"))
+    })
+    with pytest.raises(Exception):
+        router.invoke(router.route("세무", "간이과세가 뭔가요?"), chain_for, {})
+
+
+class FakeSlots:
+    def __init__(self, free):
+        self.free = free
+        self.held = set()
+
+    def try_acquire_slot(self):
+        if self.free <= len(self.held):
+            return None
+        slot_id = f"slot-{len(self.held)}"
+        self.held.add(slot_id)
+        return slot_id
+
+    def release_slot(self, slot_id):
+        self.held.discard(slot_id)
+
+
+def test_hedge_needs_free_slot_and_loser_keeps_it(monkeypatch):
+    chains = {"big": FakeChain("big", delay=0.3), "small": FakeChain("small")}
+    router, chain_for = make_router(monkeypatch, chains)
+    route = router.route("노하우", COMPLEX_QUESTION)
+
+    # 남은 슬롯이 없으면 헤지하지 않고 기본 모델을 기다린다
+    router.slots = FakeSlots(free=0)
+    assert router.invoke(route, chain_for, {}) == "big 답변"
+
+    # 헤지가 이기면 아직 실행 중인 기본 호출이 끝날 때까지 헤지 슬롯을 유지한다
+    router.slots = FakeSlots(free=1)
+    assert router.invoke(route, chain_for, {}) == "small 답변"
+    assert router.slots.held == {"slot-0"}
+    time.sleep(0.4)
+    assert router.slots.held == set()
@@ -0,0 +1,98 @@
+from app.services.ingestion_service import IngestionPipeline
+from app.services.near_duplicates import NearDuplicateIndex, estimate_similarity, minhash_signature
+from app.services.retrieval_service import VectorStoreHandle, chroma_where
+
+BOILERPLATE = "본 자료는 소상공인 교육용으로 제작되었으며 무단 복제 및 배포를 금합니다. 문의는 고객센터로 연락해 주세요."
+
+
+class FakeStore:
+    def __init__(self):
+        self.documents = {}
+
+    def get(self):
+        return {"ids": list(self.documents)}
+
+    def add_texts(self, texts, metadatas, ids):
+        for vector_id, text, metadata in zip(ids, texts, metadatas):
+            self.documents[vector_id] = (text, metadata)
+
+    def delete(self, ids):
+        for vector_id in ids:
+            self.documents.pop(vector_id, None)
+
+    def persist(self):
+        pass
+
+
+class FakeSplitter:
+    def split_text(self, text):
+        return [line for line in text.split("\n") if line]
+
+
+class FakePipeline(IngestionPipeline):
+    def __init__(self, store):
+        super().__init__(embedding=None, batch_size=2, dedupe_threshold=0.9)
+        self.store = store
+
+    def text_splitter(self):
+        return FakeSplitter()
+
+    def open_store(self, db_directory):
+        return self.store
+
+
+def test_signature_estimates_similarity(tmp_path):
+    a = minhash_signature(BOILERPLATE)
+    assert estimate_similarity(a, minhash_signature(BOILERPLATE.replace("고객센터", "고객 센터"))) >= 0.8
+    assert estimate_similarity(a, minhash_signature("부가가치세 신고 기간을 놓치지 않도록 매출 자료를 정리하세요.")) < 0.2
+
+    index = NearDuplicateIndex(threshold=0.9)
+    index.add("a", a)
+    assert index.find(minhash_signature(BOILERPLATE)) == "a"
+    index.save(str(tmp_path))
+    assert NearDuplicateIndex.load(str(tmp_path), valid_ids=["b"]).find(a) is None
+    assert NearDuplicateIndex.load(str(tmp_path)).find(a) == "a"
+
+
+def test_pipeline_stores_metadata_and_skips_repeated_chunks(tmp_path):
+    txt_dir = tmp_path / "txt"
+    txt_dir.mkdir()
+    (txt_dir / "a.txt").write_text(f"수육 보관 방법\n{BOILERPLATE}\f둘째 쪽 내용", encoding="utf-8")
+    (txt_dir / "b.txt").write_text(f"{BOILERPLATE}\n근로계약서 작성 요령", encoding="utf-8")
+    store = FakeStore()
+    db_dir = str(tmp_path / "db")
+
+    result = FakePipeline(store).run(db_dir, txt_dir=str(txt_dir))
+    assert (result["added"], result["duplicates"]) == (4, 1)
+    metadatas = [metadata for _, metadata in store.documents.values()]
+    assert {"source": "a.txt", "page": 2, "start": 0, "end": 7} in metadatas
+    assert {"source": "a.txt", "page": 1, "start": 9, "end": 9 + len(BOILERPLATE)} in metadatas
+
+    # 대표 청크를 가진 문서가 삭제되면 중복으로 건너뛰었던 문서를 다시 처리하여 저장한다
+    (txt_dir / "a.txt").unlink()
+    result = FakePipeline(store).run(db_dir, txt_dir=str(txt_dir))
+    assert sorted(text for text, _ in store.documents.values()) == sorted([BOILERPLATE, "근로계약서 작성 요령"])
+    assert result["success"]
+
+
+def test_source_filter_includes_canonical_chunks_of_duplicates(tmp_path):
+    txt_dir = tmp_path / "txt"
+    txt_dir.mkdir()
+    (txt_dir / "a.txt").write_text(f"수육 보관 방법\n{BOILERPLATE}", encoding="utf-8")
+    (txt_dir / "b.txt").write_text(f"{BOILERPLATE}\n근로계약서 작성 요령", encoding="utf-8")
+    store = FakeStore()
+    db_dir = str(tmp_path / "db")
+    FakePipeline(store).run(db_dir, txt_dir=str(txt_dir))
+
+    [canonical] = [vector_id for vector_id, (text, _) in store.documents.items() if text == BOILERPLATE]
+    handle = VectorStoreHandle(db_dir, embedding=None)
+    assert handle.canonical_ids("b.txt") == [canonical]
+    assert handle.canonical_ids(["a.txt"]) == []
+
+    # b.txt의 중복 청크는 a.txt에 저장된 대표 청크의 위치로 함께 찾는다
+    _, metadata = store.documents[canonical]
+    assert chroma_where({"source": "b.txt"}, [metadata]) == {"$or": [
+        {"source": "b.txt"},
+        {"$and": [{"source": "a.txt"}, {"page": 1}, {"start": metadata["start"]}]}
+    ]}
+    assert chroma_where({"source": "b.txt"}) == {"source": "b.txt"}
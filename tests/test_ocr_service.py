@@ -0,0 +1,46 @@
+import pytest
+
+from app.services.ocr_service import OCRCache, OCRStage, StubOCREngine, create_engine
+
+
+def test_create_engine_by_name_and_path(tmp_path):
+    assert isinstance(create_engine("stub"), StubOCREngine)
+    engine = create_engine("app.services.ocr_service:StubOCREngine", text="스캔")
+    assert engine.recognize(b"image") == engine.recognize(b"image")
+    assert engine.recognize(b"image").startswith("스캔 ")
+    with pytest.raises(ValueError):
+        create_engine("unknown")
+
+    cache = OCRCache(str(tmp_path / "ocr.sqlite3"))
+    assert cache.get("stub:OCR", "hash") is None
+    cache.put("stub:OCR", "hash", "페이지 텍스트")
+    assert cache.get("stub:OCR", "hash") == "페이지 텍스트"
+
+
+def test_only_image_pages_are_ocred_and_cached(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    from app.services.pdf_extraction import iter_page_texts
+
+    pdf_path = str(tmp_path / "scan.pdf")
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), "text layer page with enough characters")
+        pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 32, 32), False)
+        pixmap.clear_with(128)
+        doc.new_page().insert_image(fitz.Rect(72, 72, 272, 272), pixmap=pixmap)
+        doc.new_page()
+        doc.save(pdf_path)
+
+    cache_path = str(tmp_path / "ocr.sqlite3")
+    with OCRStage(engine="stub", workers=1, cache_path=cache_path) as ocr:
+        pages = list(iter_page_texts(pdf_path, ocr))
+        assert pages[0] == "text layer page with enough characters"
+        assert pages[1].startswith("OCR ")
+        # 이미지도 텍스트도 없는 빈 페이지는 OCR하지 않는다
+        assert pages[2] == ""
+    # recognized는 완료 콜백에서 세므로 풀을 닫은 뒤 확인
+    assert ocr.get_stats() == {"pages": 1, "cached": 0, "recognized": 1, "failed": 0}
+
+    with OCRStage(engine="stub", workers=1, cache_path=cache_path) as ocr:
+        assert list(iter_page_texts(pdf_path, ocr)) == pages
+        assert ocr.get_stats()["cached"] == 1
+        assert ocr._executor is None
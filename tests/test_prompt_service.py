@@ -0,0 +1,30 @@
+from app.services.prompt_service import PromptRegistry, TokenBudgeter
+
+
+def test_build_inputs_keeps_profile_order():
+    registry = PromptRegistry(TokenBudgeter())
+    inputs = registry.build_inputs("세무", "부가세 신고는 언제 하나요?", {
+        "salesScale": "월 3천",
+        "taxBookKeepingStatus": "간편장부",
+        "unknown": "무시"
+    })
+
+    assert inputs["profile"] == "- 세무 기장 상태: 간편장부\n- 매출 규모: 월 3천\n"
+    assert inputs["context"] == ""
+
+
+def test_render_does_not_interpret_braces_in_question():
+    registry = PromptRegistry(TokenBudgeter())
+    inputs = registry.build_inputs("기타", "{user_input} 그대로 나오나요?", None)
+
+    assert registry.render("기타", inputs).endswith("질문: {user_input} 그대로 나오나요?")
+
+
+def test_context_is_trimmed_to_budget():
+    budgeter = TokenBudgeter()
+    registry = PromptRegistry(budgeter, max_prompt_tokens=3000, max_context_tokens=50)
+    passages = ["근로계약서는 반드시 서면으로 작성해야 합니다. " * 20, "주휴수당 지급 기준"]
+    inputs = registry.build_inputs("직원관리", "근로계약서 작성법", {}, passages)
+
+    context = inputs["context"][len("참고 정보:\n"):]
+    assert 0 < budgeter.count(context.strip()) <= 50
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from app.middleware.rate_limit import AdmissionController, ConcurrencyLimitError
+
+
+def make_controller(tmp_path, **options):
+    return AdmissionController(str(tmp_path / "admission.sqlite3"), **options)
+
+
+def test_token_bucket_allows_burst_then_refills(tmp_path):
+    controller = make_controller(tmp_path, rate_per_minute=60, burst=2)
+    assert controller.try_acquire("a") == (True, 0.0)
+    assert controller.try_acquire("a") == (True, 0.0)
+    allowed, retry_after = controller.try_acquire("a")
+    assert not allowed and 0 < retry_after <= 1.0
+    # 호출자별로 버킷이 따로 있다
+    assert controller.try_acquire("b")[0]
+
+    time.sleep(1.1)
+    assert controller.try_acquire("a")[0]
+
+
+def test_cost_larger_than_burst_is_charged_as_debt(tmp_path):
+    controller = make_controller(tmp_path, rate_per_minute=60, burst=2)
+    assert controller.try_acquire("a", cost=5) == (True, 0.0)
+    # 빚(-3)을 갚고 토큰 하나가 생길 때까지 약 4초를 기다려야 한다
+    allowed, retry_after = controller.try_acquire("a")
+    assert not allowed and 3.5 < retry_after <= 4.0
+
+
+def test_slot_lease_limit_release_and_expiry(tmp_path):
+    controller = make_controller(tmp_path, max_inflight=2, slot_lease_seconds=0.2)
+    first, second = controller.try_acquire_slot(), controller.try_acquire_slot()
+    assert first and second
+    assert controller.try_acquire_slot() is None
+    assert controller.inflight() == 2
+
+    controller.release_slot(first)
+    third = controller.try_acquire_slot()
+    assert third is not None
+
+    # 반납되지 않은 슬롯은 만료 시간이 지나면 회수된다
+    time.sleep(0.25)
+    assert controller.inflight() == 0
+    assert controller.try_acquire_slot() is not None
+
+
+def test_llm_slot_timeout_and_unbounded_wait(tmp_path):
+    controller = make_controller(tmp_path, max_inflight=1)
+    held = controller.try_acquire_slot()
+
+    with pytest.raises(ConcurrencyLimitError):
+        with controller.llm_slot(timeout=0.1):
+            pass
+
+    # timeout이 없으면 슬롯이 반납될 때까지 기다렸다가 실행한다
+    threading.Timer(0.3, controller.release_slot, args=(held,)).start()
+    started = time.time()
+    with controller.llm_slot():
+        assert controller.inflight() == 1
+    assert time.time() - started >= 0.25
+    assert controller.inflight() == 0
+
+
+def test_limit_sheds_on_queue_depth_and_rate(tmp_path):
+    controller = make_controller(tmp_path, rate_per_minute=1, burst=1, max_queue_depth=3, shed_retry_after=7)
+    depth = [0]
+    view = controller.limit(queue_depth=lambda: depth[0])(lambda token: "ok")
+
+    with Flask(__name__).app_context():
+        assert view(token="t") == "ok"
+        _, status, headers = view(token="t")
+        assert status == 429 and int(headers["Retry-After"]) >= 1
+
+        # 일괄 요청은 질문 수만큼 차감하여 다음 요청은 그만큼 더 기다린다
+        batch = controller.limit(cost=lambda: 3)(lambda token: "ok")
+        assert batch(token="batch") == "ok"
+        _, status, headers = view(token="batch")
+        assert status == 429 and int(headers["Retry-After"]) > 60
+
+        depth[0] = 3
+        _, status, headers = view(token="other")
+        assert (status, headers["Retry-After"]) == (429, "7")
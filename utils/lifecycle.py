@@ -0,0 +1,46 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# gunicorn --preload 사용 시 마스터 프로세스에서 한 번 실행하는 준비 작업 (읽기 전용 상태 로드)
+_warm_up_hooks = []
+# 요청을 처리하는 프로세스(워커)에서 실행하는 작업 (백그라운드 스레드 시작 등)
+_start_hooks = []
+
+
+def on_warm_up(func):
+    """fork 전에 미리 로드해 워커들이 copy-on-write로 공유할 상태 등록"""
+    _warm_up_hooks.append(func)
+    return func
+
+
+def on_start(func):
+    """워커 프로세스에서 시작할 백그라운드 작업 등록 (스레드는 fork 후에 만들어야 한다)"""
+    _start_hooks.append(func)
+    return func
+
+
+def _run(hooks: list, stage: str) -> dict:
+    timings = {}
+    for func in hooks:
+        name = getattr(func, "__qualname__", repr(func))
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"{stage} 작업 실패: {name}, 오류 내용: {e}")
+        timings[name] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def warm_up() -> dict:
+    """등록된 준비 작업을 실행하고 작업별 소요 시간(ms) 반환"""
+    timings = _run(_warm_up_hooks, "사전 로드")
+    logger.info(f"사전 로드 완료: {sum(timings.values()):.1f}ms")
+    return timings
+
+
+def start_background() -> dict:
+    """등록된 백그라운드 작업을 시작하고 작업별 소요 시간(ms) 반환"""
+    return _run(_start_hooks, "백그라운드 시작")
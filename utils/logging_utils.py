@@ -0,0 +1,237 @@
+"""큐 기반 비동기 로깅 설정.
+
+요청 스레드는 로그 기록을 메모리 큐에 넣기만 하고, 리스너 스레드가 포맷과 출력을 맡는다.
+큐에 넣기 전에 요청 ID를 붙이고, 토큰 같은 비밀 값을 가리고, 긴 메시지를 자르고,
+로거별 초당 기록 수를 제한하므로 부하가 몰려도 로그 I/O가 응답 시간을 늘리거나 저장 공간을 채우지 않는다.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from config.config import Config
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+SECRET_PATTERNS = [
+    # "Authorization: Bearer ...", {'authorization': '...'}, api_key=... 형태의 값
+    (re.compile(r"(?i)((?:authorization|api[_-]?key|password|secret|token)['\"]?\s*[:=]\s*['\"]?)"
+                r"(?:(?:bearer|basic)\s+)?[^'\"\s,}]+"), r"\1[REDACTED]"),
+    (re.compile(r"(?i)\b(bearer|basic)\s+[A-Za-z0-9\-._~+/]+=*"), r"\1 [REDACTED]"),
+    (re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]*"), "[REDACTED_JWT]"),
+    (re.compile(r"\bsk-[A-Za-z0-9_\-]{8,}"), "sk-[REDACTED]"),
+]
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def bind_request_id(value: str = None) -> tuple:
+    """현재 컨텍스트에 요청 ID를 설정하고 (요청 ID, 복원 토큰) 반환 (없거나 형식이 맞지 않으면 새로 생성)"""
+    if not value or not REQUEST_ID_PATTERN.fullmatch(value):
+        value = uuid.uuid4().hex
+    return value, _request_id.set(value)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def truncate(text: str, max_chars: int) -> str:
+    if max_chars and len(text) > max_chars:
+        return f"{text[:max_chars]}...({len(text) - max_chars}자 생략)"
+    return text
+
+
+class RequestContextFilter(logging.Filter):
+    """기록한 스레드의 요청 ID를 붙인다 (큐에 넣기 전에 실행되어야 한다)"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """INFO 이하 기록을 요청 ID 단위로 표본 추출 (한 요청의 기록은 모두 남기거나 모두 버린다)"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.threshold = int(max(0.0, min(rate, 1.0)) * 10000)
+
+    def filter(self, record):
+        if self.threshold >= 10000 or record.levelno > logging.INFO:
+            return True
+        request_id = getattr(record, "request_id", "-")
+        if request_id == "-":
+            return True
+        return zlib.crc32(request_id.encode()) % 10000 < self.threshold
+
+
+class RateLimitFilter(logging.Filter):
+    """로거별 토큰 버킷으로 초당 기록 수를 제한 (ERROR 이상은 항상 통과)
+
+    버려진 기록 수는 다음으로 통과하는 기록의 suppressed 필드에 남긴다.
+    """
+
+    def __init__(self, rate_per_second: float = 20, burst: int = 100):
+        super().__init__()
+        self.rate = rate_per_second
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno >= logging.ERROR:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(record.name, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[record.name] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class RedactingFilter(logging.Filter):
+    """메시지와 예외 내용을 미리 문자열로 만들고 비밀 값을 가린 뒤 길이를 제한한다"""
+
+    def __init__(self, max_chars: int = 2000):
+        super().__init__()
+        self.max_chars = max_chars
+        self._formatter = logging.Formatter()
+
+    def filter(self, record):
+        record.msg = truncate(redact(record.getMessage()), self.max_chars)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = truncate(redact(self._formatter.formatException(record.exc_info)), self.max_chars * 4)
+            record.exc_info = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """기록 하나를 JSON 한 줄로 출력"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "pid": record.process,
+            "thread": record.threadName
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """기록을 크기 제한 큐에 넣고 리스너 스레드가 실제 핸들러로 출력하는 핸들러.
+
+    큐가 가득 차면 요청 스레드를 막지 않고 기록을 버린다 (버린 수는 get_stats로 확인).
+    리스너 스레드는 fork 이후 자식 프로세스에서 다시 시작한다.
+    """
+
+    def __init__(self, handlers: list, max_queue_size: int = 10000):
+        super().__init__(queue.Queue(maxsize=max_queue_size))
+        self.handlers = handlers
+        self.max_queue_size = max_queue_size
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # fork 이전 프로세스의 큐에 남은 기록과 리스너 스레드는 이어받지 않는다
+            self.queue = queue.Queue(maxsize=self.max_queue_size)
+            self._listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # 메시지와 예외 문자열은 필터에서 이미 만들어 두었다
+        return record
+
+    def enqueue(self, record):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def get_stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
+
+    def stop(self):
+        """큐에 남은 기록을 모두 출력하고 리스너 스레드 종료"""
+        with self._start_lock:
+            listener, pid = self._listener, self._pid
+            self._listener, self._pid = None, None
+        if listener is not None and pid == os.getpid():
+            listener.stop()
+
+
+_handler = None
+
+
+def setup_logging(config=Config) -> AsyncQueueHandler:
+    """루트 로거를 큐 기반 핸들러로 설정 (여러 번 호출해도 한 번만 설정)"""
+    global _handler
+    root = logging.getLogger()
+    if _handler is not None and _handler in root.handlers:
+        return _handler
+
+    stream = logging.StreamHandler(sys.stderr)
+    if config.LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+
+    handler = AsyncQueueHandler([stream], max_queue_size=config.LOG_QUEUE_SIZE)
+    # 버릴 기록은 문자열로 만들기 전에 거른다
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(config.LOG_SAMPLE_RATE))
+    handler.addFilter(RateLimitFilter(config.LOG_RATE_PER_SECOND, config.LOG_RATE_BURST))
+    handler.addFilter(RedactingFilter(config.LOG_MAX_MESSAGE_CHARS))
+
+    # basicConfig로 붙은 동기 출력 핸들러는 제거 (테스트의 로그 캡처 핸들러 등 하위 클래스는 유지)
+    for existing in list(root.handlers):
+        if type(existing) is logging.StreamHandler:
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(config.LOG_LEVEL.upper())
+    atexit.register(handler.stop)
+    _handler = handler
+    return handler
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalSQLite:
+    """스레드/프로세스별 SQLite 커넥션을 관리하는 클래스.
+
+    gunicorn 워커들이 같은 파일을 공유하므로 WAL 모드를 사용하고,
+    fork 이후에는 부모 프로세스의 커넥션을 재사용하지 않고 새로 연결한다.
+    """
+
+    def __init__(self, db_path: str, timeout: float = 30):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn